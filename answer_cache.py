@@ -0,0 +1,179 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from config import ANSWER_CACHE_SIZE, ANSWER_CACHE_THRESHOLD
+from intents import normalize_query
+from metrics import ANSWER_CACHE
+
+# Ten sam podział na słowa co w indeksie TF-IDF (słowa ≥ 2 znaki)
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+# Słowa pomijane w kluczu (po normalizacji: małe litery, bez polskich znaków). Zaimki i przysłówki
+# pytające (kto, co, jak, jaki, który, kiedy, gdzie, ile, what, which…) zostają — zmieniają sens pytania,
+# więc "kto wygra" i "co wygra" nie dzielą odpowiedzi.
+STOPWORDS = frozenset({
+    "aby", "albo", "ale", "bo", "by", "byl", "byla", "bylo", "bedzie", "beda", "czy", "dla", "do",
+    "go", "ich", "jest", "jestem", "je", "jej", "jego", "juz",
+    "ma", "maja", "mi", "mnie", "moze", "mozesz", "na", "nad", "nam",
+    "o", "od", "oraz", "po", "pod", "podaj", "powiedz", "prosze", "przez", "przy", "sa", "sie", "tak",
+    "tam", "te", "ten", "to", "tu", "we", "wiesz", "za", "ze",
+    "about", "an", "and", "are", "be", "can", "do", "does", "is", "it", "me", "of", "on", "or",
+    "please", "tell", "the", "there", "to", "will", "you",
+})
+
+
+def query_terms(query: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(normalize_query(query)) if t not in STOPWORDS]
+
+
+class _Answer:
+    __slots__ = ("text", "deps", "vector")
+
+    def __init__(self, text: str, deps: Dict[str, Any], vector: Dict[str, float]):
+        self.text = text
+        self.deps = deps
+        self.vector = vector
+
+
+# Cache odpowiedzi /ask w obrębie zakresu (intencji). Klucz to posortowany zbiór słów pytania
+# bez słów pomijanych; gdy klucza brak, szukamy najbliższego wcześniejszego pytania (kosinus
+# wektorów tf*idf, idf z indeksu RAG) — tylko wśród wpisów ze wspólnym słowem.
+# query=None: odpowiedź zależy tylko od zakresu (jeden wpis). Każdy wpis pamięta źródła, z których
+# powstał (nazwa -> wartość); nieaktualny, gdy `probe(nazwa)` zwraca coś innego. Limit wpisów: LRU.
+# lookup/put wołane z wątków (probe i weigh mogą wczytać indeks) — stan chroniony blokadą.
+class AnswerCache:
+    def __init__(
+        self,
+        probe: Callable[[str], Any],
+        weigh: Callable[[List[str]], List[float]],
+        max_entries: int = ANSWER_CACHE_SIZE,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+    ):
+        self.probe = probe
+        self.weigh = weigh
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], _Answer]" = OrderedDict()
+        self._postings: Dict[Tuple[str, str], Set[Tuple[str, Optional[str]]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(scope: str, terms: Optional[List[str]]) -> Tuple[str, Optional[str]]:
+        return scope, (None if terms is None else " ".join(sorted(set(terms))))
+
+    def _vector(self, terms: List[str]) -> Dict[str, float]:
+        counts = Counter(terms)
+        weights = dict(zip(counts, self.weigh(list(counts))))
+        vec = {t: n * weights[t] for t, n in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {t: w / norm for t, w in vec.items()}
+
+    def _fresh(self, entry: _Answer) -> bool:
+        for name, used in entry.deps.items():
+            current = self.probe(name)
+            if current is used:
+                continue
+            # Ta sama treść w nowym obiekcie (np. wczytana z magazynu) — nadal aktualna
+            if current is None or current != used:
+                return False
+            entry.deps[name] = current
+        return True
+
+    def _similar(self, scope: str, terms: List[str]) -> Optional[Tuple[str, Optional[str]]]:
+        candidates: Set[Tuple[str, Optional[str]]] = set()
+        for t in set(terms):
+            candidates |= self._postings.get((scope, t), set())
+        if not candidates:
+            return None
+        vec = self._vector(terms)
+        best, best_score = None, self.threshold
+        for key in candidates:
+            other = self._entries[key].vector
+            score = sum(w * other.get(t, 0.0) for t, w in vec.items())
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def lookup(self, scope: str, query: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            return self._lookup(scope, query)
+
+    def _lookup(self, scope: str, query: Optional[str]) -> Optional[str]:
+        terms = None if query is None else query_terms(query)
+        if terms == []:
+            ANSWER_CACHE.inc(result="skip")
+            return None
+        key = self._key(scope, terms)
+        result = "exact"
+        if key not in self._entries:
+            key = self._similar(scope, terms) if terms else None
+            result = "similar"
+            if key is None:
+                ANSWER_CACHE.inc(result="miss")
+                return None
+        entry = self._entries[key]
+        if not self._fresh(entry):
+            self._drop(key)
+            ANSWER_CACHE.inc(result="stale")
+            return None
+        self._entries.move_to_end(key)
+        ANSWER_CACHE.inc(result=result)
+        return entry.text
+
+    def put(self, scope: str, query: Optional[str], text: str, deps: Dict[str, Any]) -> None:
+        # deps: wartości źródeł użyte do zbudowania odpowiedzi (nie bieżące — mogły się już zmienić)
+        terms = None if query is None else query_terms(query)
+        if terms == [] or self.max_entries <= 0:
+            return
+        key = self._key(scope, terms)
+        vector = self._vector(terms) if terms else {}
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = _Answer(text, dict(deps), vector)
+            for t in set(terms or ()):
+                self._postings.setdefault((scope, t), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, scope: Optional[str] = None) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if scope is None or k[0] == scope]:
+                self._drop(key)
+
+    def _drop(self, key: Tuple[str, Optional[str]]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for t in entry.vector:
+            keys = self._postings.get((key[0], t))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[(key[0], t)]
+
+
+def _probe(name: str) -> Any:
+    # Bieżąca wersja źródła: numer wersji indeksu RAG albo świeża wartość z cache scrapingu
+    if name == "rag":
+        from rag import get_index
+        return get_index().version
+    from web import cached_source
+    return cached_source(name)
+
+def _weigh(terms: List[str]) -> List[float]:
+    from rag import get_index
+    return get_index().term_idf(terms)
+
+_answer_cache: Optional[AnswerCache] = None
+
+def get_answer_cache() -> AnswerCache:
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(_probe, _weigh)
+    return _answer_cache
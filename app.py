@@ -1,8 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
+from config import INGEST_INTERVAL, SCHEDULER_ENABLED, STARTUP_WARMUP
+from http_client import close_client
+from ingest import run_ingestion_loop
+from metrics import MetricsMiddleware
 from routes import router
+from scheduler import get_scheduler
+from shared_state import get_election
+from warmup import warm_up
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    # Przy stanie współdzielonym najpierw wybór lidera — od niego zależy, kto odświeża dane
+    election = get_election()
+    if election is not None:
+        await election.start()
+    # Ciężkie składniki (SDK LLM, indeks RAG, bs4) nie są ładowane przy imporcie — rozgrzewka
+    # przed pierwszym żądaniem albo w tle, gdy serwer już przyjmuje ruch
+    if STARTUP_WARMUP == "blocking":
+        await asyncio.to_thread(warm_up)
+    elif STARTUP_WARMUP == "background":
+        tasks.append(asyncio.create_task(asyncio.to_thread(warm_up)))
+    if INGEST_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_ingestion_loop()))
+    # Dane i prognozy liczone z wyprzedzeniem; handlery czytają gotowe wpisy cache
+    if SCHEDULER_ENABLED:
+        get_scheduler().start()
+    yield
+    if SCHEDULER_ENABLED:
+        await get_scheduler().stop()
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if election is not None:
+        await election.stop()
+    await close_client()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 app.include_router(router)
 
 if __name__ == "__main__":
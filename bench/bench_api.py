@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from stubs import FIXTURES, StubServer
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Scenariusze obciążenia: nazwa -> (metoda, ścieżka, treść JSON). Każda intencja /ask osobno.
+SCENARIOS: List[Tuple[str, str, str, Optional[Dict]]] = [
+    ("participants", "GET", "/participants", None),
+    ("jury", "GET", "/jury", None),
+    ("history", "GET", "/history", None),
+    ("predict_winner", "GET", "/predict_winner", None),
+    ("ask:participants", "POST", "/ask", {"query": "lista uczestników"}),
+    ("ask:jury", "POST", "/ask", {"query": "kto jest w jury?"}),
+    ("ask:history", "POST", "/ask", {"query": "historia konkursu"}),
+    ("ask:winner", "POST", "/ask", {"query": "kto wygra konkurs?"}),
+    ("ask:rag", "POST", "/ask", {"query": "jakie są nagrody?"}),
+    ("ask:video", "POST", "/ask", {"query": "nagrania youtube z finału"}),
+]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    # Najbliższa ranga — bez interpolacji, stabilne przy małych próbkach
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+def summarize(latencies: List[float], errors: int, wall: float) -> Dict:
+    n = len(latencies)
+    return {
+        "requests": n,
+        "errors": errors,
+        "rps": n / wall if wall > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+# --- aplikacja na lokalnych zaślepkach ----------------------------------------
+
+def app_env(stub: StubServer, cold: bool, shared_path: str = "") -> Dict[str, str]:
+    # Wszystkie źródła zewnętrzne wskazują na stub; harmonogram i ingestia wyłączone,
+    # żeby praca w tle nie zaburzała pomiaru
+    env = dict(os.environ)
+    env.update({
+        "PADEREWSKI_BASE_URL": f"{stub.url}/pages/history.html",
+        "PARTICIPANTS_URL": f"{stub.url}/pages/participants.html",
+        "JURY_URL": f"{stub.url}/pages/jury.html",
+        "YOUTUBE_API_KEY": "stub",
+        "YOUTUBE_API_BASE": f"{stub.url}/youtube/v3",
+        "YOUTUBE_QUOTA_PATH": "",
+        "YOUTUBE_CACHE_DIR": "",
+        "LLM_PROVIDER": "anthropic",
+        "ANTHROPIC_API_KEY": "stub",
+        "ANTHROPIC_BASE_URL": stub.url,
+        "PREDICTION_CACHE_DIR": "",
+        "HTTP_CACHE_DIR": "",
+        "RAG_INDEX_DIR": "",
+        "SCHEDULER_ENABLED": "0",
+        "INGEST_INTERVAL": "0",
+        "SHARED_STATE_PATH": shared_path,
+    })
+    if cold:
+        # Bez cache danych i prognoz: każde żądanie idzie do stubu (i do LLM)
+        for name in ("PARTICIPANTS_CACHE_TTL", "JURY_CACHE_TTL", "HISTORY_CACHE_TTL", "YOUTUBE_CACHE_TTL", "PREDICTION_CACHE_TTL"):
+            env[name] = "0"
+    return env
+
+def start_app(port: int, workers: int, env: Dict[str, str]) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+async def wait_ready(base: str, proc: subprocess.Popen, timeout: float = 30.0) -> float:
+    start = time.perf_counter()
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"aplikacja zakończyła się kodem {proc.returncode}")
+            try:
+                if (await client.get(f"{base}/metrics", timeout=1.0)).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.05)
+    raise RuntimeError("aplikacja nie odpowiada")
+
+
+# --- generator obciążenia -----------------------------------------------------
+
+async def drive(client: httpx.AsyncClient, base: str, method: str, path: str, body: Optional[Dict],
+                requests: int, concurrency: int) -> Dict:
+    # `concurrency` pętli pobiera kolejne numery żądań ze wspólnego licznika
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in counter:
+            t = time.perf_counter()
+            try:
+                resp = await client.request(method, base + path, json=body)
+                await resp.aread()
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - t)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+async def load_test(args, base: str) -> Dict[str, Dict]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        for name, method, path, body in SCENARIOS:
+            if args.only and name not in args.only:
+                continue
+            # Rozgrzewka: pierwsze żądanie wypełnia cache i indeksy, nie trafia do wyników
+            for _ in range(args.warmup):
+                await client.request(method, base + path, json=body)
+            results[name] = await drive(client, base, method, path, body, args.requests, args.concurrency)
+            r = results[name]
+            print(f"{name:<18}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errors']:>8}")
+    return results
+
+
+# --- mikrobenchmarki ----------------------------------------------------------
+
+def timeit(fn, repeat: int) -> Dict:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return {
+        "calls": repeat,
+        "mean_us": sum(samples) / len(samples) * 1e6,
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+    }
+
+def micro_benchmarks(repeat: int) -> Dict[str, Dict]:
+    import web
+    from answer_cache import get_answer_cache
+    from rag import generate_response, get_index, retrieve_relevant_docs
+    from utils.html import iter_text_blocks, make_soup, select_container
+    from utils.text import safe_parse_llm_json
+
+    with open(os.path.join(FIXTURES, "participants.html"), encoding="utf-8") as f:
+        html = f.read()
+    text = "\n".join(iter_text_blocks(select_container(make_soup(html))))
+    llm_reply = "```json\n" + StubServer.llm_answer("Uczestnicy:\nAnna Nowak\nJan Kowalski\nEwa Wiśniewska") + ",\n```"
+    question = "jakie są nagrody w finale?"
+    answers = get_answer_cache()
+    answers.put("rag", question, generate_response(question, retrieve_relevant_docs(question)), {"rag": get_index().version})
+
+    def parse_uncached():
+        # Bez pamięci wyników parsowania — mierzymy samo parsowanie strony
+        web._parse_memo.clear()
+        web.parse_names_from_html(html)
+
+    cases = {
+        "extract_names": lambda: web.extract_names(text),
+        "parse_names_from_html": parse_uncached,
+        "parse_names_from_html:memo": lambda: web.parse_names_from_html(html),
+        "retrieve_relevant_docs": lambda: retrieve_relevant_docs(question),
+        "answer_cache:exact": lambda: answers.lookup("rag", "Jakie są nagrody w finale"),
+        "answer_cache:similar": lambda: answers.lookup("rag", "nagrody w finale konkursu"),
+        "safe_parse_llm_json": lambda: safe_parse_llm_json(llm_reply),
+    }
+    results = {}
+    for name, fn in cases.items():
+        results[name] = r = timeit(fn, repeat)
+        print(f"{name:<28}{r['mean_us']:>12.1f}{r['p50_us']:>12.1f}{r['p99_us']:>12.1f}")
+    return results
+
+
+# --- zapis i porównanie wyników -----------------------------------------------
+
+def save(report: Dict, path: str) -> str:
+    if not path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(RESULTS_DIR, f"api-{stamp}-{report['revision']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    # Regresja: opóźnienie wyższe albo RPS niższy o więcej niż `tolerance` (ułamek)
+    regressions = []
+    print(f"\nporównanie z {baseline.get('revision', '?')} ({baseline.get('created', '?')}):")
+    for section, keys in (("endpoints", ("p50_ms", "p95_ms", "p99_ms", "rps")), ("micro", ("mean_us", "p99_us"))):
+        for name, now in report.get(section, {}).items():
+            then = baseline.get(section, {}).get(name)
+            if not then:
+                continue
+            cells = []
+            for key in keys:
+                old, new = then.get(key, 0.0), now.get(key, 0.0)
+                if not old:
+                    continue
+                change = (new - old) / old
+                worse = -change if key == "rps" else change
+                flag = " !" if worse > tolerance else ""
+                if flag:
+                    regressions.append(f"{section}/{name}/{key}")
+                cells.append(f"{key} {change:+.0%}{flag}")
+            print(f"  {name:<28}" + "  ".join(cells))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Obciążenie API (RPS, p50/p95/p99) na lokalnych zaślepkach i mikrobenchmarki")
+    ap.add_argument("--requests", type=int, default=500, help="żądań na scenariusz")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--workers", type=int, default=1, help="procesy uvicorn")
+    ap.add_argument("--shared", action="store_true", help="stan współdzielony przez procesy (SQLite w katalogu tymczasowym)")
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--only", nargs="*", help="tylko wybrane scenariusze (np. participants ask:rag)")
+    ap.add_argument("--cold", action="store_true", help="TTL cache danych i prognoz = 0")
+    ap.add_argument("--upstream-latency", type=float, default=0.02, help="opóźnienie stron i YouTube (s)")
+    ap.add_argument("--llm-latency", type=float, default=0.3, help="opóźnienie odpowiedzi LLM (s)")
+    ap.add_argument("--micro-repeat", type=int, default=2000)
+    ap.add_argument("--skip-load", action="store_true")
+    ap.add_argument("--skip-micro", action="store_true")
+    ap.add_argument("--out", default="", help="plik wyników (domyślnie bench/results/api-<czas>-<rewizja>.json)")
+    ap.add_argument("--compare", default="", help="poprzedni plik wyników do porównania")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="próg regresji (ułamek)")
+    args = ap.parse_args()
+
+    report = {
+        "revision": git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: getattr(args, k) for k in ("requests", "concurrency", "workers", "shared", "cold", "upstream_latency", "llm_latency")},
+        "endpoints": {},
+        "micro": {},
+    }
+    if not args.skip_load:
+        shared_dir = tempfile.mkdtemp(prefix="bench_shared_") if args.shared else ""
+        with StubServer(latency=args.upstream_latency, llm_latency=args.llm_latency) as stub:
+            port = free_port()
+            shared_path = os.path.join(shared_dir, "state.db") if shared_dir else ""
+            proc = start_app(port, args.workers, app_env(stub, args.cold, shared_path))
+            try:
+                base = f"http://127.0.0.1:{port}"
+                report["startup_s"] = asyncio.run(wait_ready(base, proc))
+                print(f"start aplikacji: {report['startup_s']:.2f} s, {args.workers} proces(y), współbieżność {args.concurrency}")
+                print(f"{'scenariusz':<18}{'RPS':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'błędy':>8}")
+                report["endpoints"] = asyncio.run(load_test(args, base))
+            finally:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+            report["upstream_calls"] = dict(stub.stats)
+            print(f"wywołania stubu: {dict(stub.stats)}")
+        if shared_dir:
+            shutil.rmtree(shared_dir, ignore_errors=True)
+    if not args.skip_micro:
+        print(f"\n{'funkcja':<28}{'średnio µs':>12}{'p50 µs':>12}{'p99 µs':>12}")
+        report["micro"] = micro_benchmarks(args.micro_repeat)
+
+    print(f"\nwyniki: {save(report, args.out)}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"regresje powyżej {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
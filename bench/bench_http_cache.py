@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web
+from http_cache import HttpCache, set_http_cache
+from http_client import close_client
+from stubs import FIXTURES, StubServer
+
+PAGE = os.path.join(FIXTURES, "participants.html")
+
+async def load(url: str):
+    t = time.perf_counter()
+    html = await web.fetch_html(url)
+    names = await asyncio.to_thread(web.parse_names_from_html, html)
+    return time.perf_counter() - t, len(names)
+
+async def run(args, stub: StubServer, directory: str):
+    url = f"{stub.url}/pages/participants.html"
+    print(f"{'scenariusz':<44}{'czas ms':>10}{'200':>6}{'304':>6}")
+
+    def row(label, seconds):
+        print(f"{label:<44}{seconds * 1000:>10.2f}{stub.stats['page_200']:>6}{stub.stats['page_304']:>6}")
+
+    set_http_cache(None)
+    web._parse_memo.clear()
+    row("bez cache (pobranie + parsowanie)", (await load(url))[0])
+
+    set_http_cache(HttpCache(directory, compress=args.compress))
+    web._parse_memo.clear()
+    row("cache pusty: 200, zapis na dysk", (await load(url))[0])
+    # Restart procesu: nowy obiekt cache na tym samym katalogu, pusta pamięć parsowania
+    set_http_cache(HttpCache(directory, compress=args.compress))
+    web._parse_memo.clear()
+    row("po restarcie: 304, treść z dysku + parsowanie", (await load(url))[0])
+    row("kolejne: 304, wynik parsowania z pamięci", (await load(url))[0])
+
+    cache = HttpCache(directory, compress=args.compress)
+    raw = os.path.getsize(PAGE)
+    print(f"rozmiar na dysku: {cache.total_bytes()} B (strona {raw} B, gzip={'tak' if args.compress else 'nie'})")
+
+    small = HttpCache(tempfile.mkdtemp(prefix="bench_http_lru_"), max_bytes=cache.total_bytes() * 3)
+    with open(PAGE, encoding="utf-8") as f:
+        html = f.read()
+    for i in range(10):
+        small.store(f"https://example.org/{i}", html, None, None)
+    kept = [i for i in range(10) if small.lookup(f"https://example.org/{i}")]
+    print(f"LRU z limitem 3 wpisów: zachowane {kept}, {small.total_bytes()} B")
+    shutil.rmtree(small.directory, ignore_errors=True)
+    await close_client()
+
+def main():
+    ap = argparse.ArgumentParser(description="Trwały cache HTTP: 200 vs 304 po restarcie, kompresja, LRU")
+    ap.add_argument("--latency", type=float, default=0.05, help="opóźnienie stubu (s)")
+    ap.add_argument("--no-compress", dest="compress", action="store_false")
+    args = ap.parse_args()
+    directory = tempfile.mkdtemp(prefix="bench_http_cache_")
+    try:
+        with StubServer(latency=args.latency) as stub:
+            asyncio.run(run(args, stub, directory))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
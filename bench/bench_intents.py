@@ -0,0 +1,55 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import IntentRouter
+
+LABELLED = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intents_labelled.jsonl")
+
+# Poprzednie listy słów z ask() i liniowe skanowanie `any(k in q ...)`
+LEGACY = [
+    ("participants", ["uczestnicy", "uczestnik", "biorą udział", "bierze udział", "lista uczestników", "kto bierze udzial", "kto bierze udział"]),
+    ("jury", ["jury", "juror", "jurorzy", "lista jury"]),
+    ("history", ["historia", "przeszłe edycje", "archiwum", "historyczne"]),
+    ("winner", ["kto wygra", "zwycięzca", "winner", "kto będzie najlepszy", "kto bedzie najlepszy"]),
+]
+
+def legacy_classify(query: str) -> str:
+    q = query.lower().strip()
+    for intent, keywords in LEGACY:
+        if any(k in q for k in keywords):
+            return intent
+    any(k in q for k in ["youtube", "wideo", "video", "film"])
+    return "rag"
+
+def load_labelled():
+    with open(LABELLED, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def main():
+    ap = argparse.ArgumentParser(description="Szybkość i trafność klasyfikacji intencji /ask")
+    ap.add_argument("--repeat", type=int, default=2000)
+    args = ap.parse_args()
+    rows = load_labelled()
+    router = IntentRouter()
+    queries = [r["query"] for r in rows]
+    variants = (("legacy", legacy_classify), ("router", lambda q: router.classify(q).intent))
+    print(f"{'wariant':<10}{'µs/zapytanie':>14}{'trafność':>12}")
+    for label, fn in variants:
+        correct = sum(fn(r["query"]) == r["intent"] for r in rows)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            for q in queries:
+                fn(q)
+        per_query = (time.perf_counter() - t0) / (args.repeat * len(queries))
+        print(f"{label:<10}{per_query * 1e6:>14.2f}{correct / len(rows):>11.1%}")
+    misses = [(r["query"], r["intent"], router.classify(r["query"]).intent) for r in rows if router.classify(r["query"]).intent != r["intent"]]
+    for q, want, got in misses:
+        print(f"  pomyłka: {q!r} oczekiwano={want} jest={got}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from utils.html import html_parser, iter_text_blocks, make_soup, select_container
+from web import extract_names
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LEGACY_SELECTORS = ["ul", "ol", "li", "p", "h2", "h3", "a", "span", "strong", ".wp-block-list li"]
+
+# Poprzednia implementacja: html.parser + osobne select() dla każdego selektora
+def legacy_text(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    container = soup.select_one(".entry-content") or soup.select_one("article") or soup
+    text_chunks = []
+    for sel in LEGACY_SELECTORS:
+        for el in container.select(sel):
+            t = el.get_text(" ", strip=True)
+            if t:
+                text_chunks.append(t)
+    return "\n".join(text_chunks)
+
+# Poprzednia wersja extract_names: kompilacja wzorca i blacklisty przy każdym wywołaniu, dwa przebiegi
+def legacy_extract_names(text: str):
+    pattern = r"\b([A-ZŁŚĆŹŻ][a-ząćęłńóśźż]+(?:\s[A-Z][a-ząćęłńóśźż]+){0,3})\b"
+    candidates = re.findall(pattern, text)
+    blacklist = {"Schedule", "Jury", "Prizes", "Repertoire", "International", "Ignacy", "Paderewski", "Konkurs", "Międzynarodowy"}
+    cleaned = [c for c in candidates if c not in blacklist and len(c.split()) >= 2]
+    seen = set()
+    return [c for c in cleaned if not (c in seen or seen.add(c))]
+
+def single_pass_text(html: str) -> str:
+    return "\n".join(iter_text_blocks(select_container(make_soup(html))))
+
+def measure(fn, html: str, repeat: int):
+    fn(html)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = fn(html)
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    t0 = time.perf_counter()
+    names = extract_names(text)
+    regex_time = time.perf_counter() - t0
+    return elapsed, peak, len(text), regex_time, len(names)
+
+def main():
+    ap = argparse.ArgumentParser(description="Czas i pamięć parsowania stron uczestników/jury")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--archive-pages", type=int, default=500, help="ile stron skleić w syntetyczne archiwum")
+    args = ap.parse_args()
+    print(f"parser: {html_parser()}")
+    print(f"{'fixture':<20}{'wariant':<14}{'parse ms':>10}{'peak KiB':>10}{'tekst zn.':>11}{'regex ms':>10}{'nazwiska':>10}")
+    for fname in sorted(os.listdir(FIXTURES)):
+        if not fname.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURES, fname), encoding="utf-8") as f:
+            html = f.read()
+        for label, fn in (("legacy", legacy_text), ("single-pass", single_pass_text)):
+            elapsed, peak, chars, regex_time, n = measure(fn, html, args.repeat)
+            print(f"{fname:<20}{label:<14}{elapsed * 1000:>10.2f}{peak / 1024:>10.0f}{chars:>11}{regex_time * 1000:>10.2f}{n:>10}")
+
+    # Duża strona archiwalna: jeden sklejony string vs strumień fragmentów
+    with open(os.path.join(FIXTURES, "participants.html"), encoding="utf-8") as f:
+        blocks = list(iter_text_blocks(select_container(make_soup(f.read())))) * args.archive_pages
+    print(f"\narchiwum: {len(blocks)} fragmentów")
+    variants = (
+        ("legacy (join)", lambda: legacy_extract_names("\n".join(blocks))),
+        ("extractor (join)", lambda: extract_names("\n".join(blocks))),
+        ("extractor (chunks)", lambda: extract_names(iter(blocks))),
+    )
+    for label, fn in variants:
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<22}{elapsed * 1000:>10.1f} ms{peak / 1024:>10.0f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from vector_index import VectorIndex
+
+WORDS = (
+    "piano competition paderewski chopin mozart concerto sonata etude stage final semi jury prize winner "
+    "bydgoszcz poland november recital orchestra philharmonic pianist repertoire program award edition "
+    "history archive biography laureate performance variation nocturne polonaise mazurka ballade scherzo "
+    "prelude fugue bach beethoven liszt schumann brahms rachmaninoff debussy ravel prokofiev herdzin"
+).split()
+
+def synthetic_chunks(n: int, words_per_chunk: int, seed: int = 7):
+    # Słownik Zipfa: kilkadziesiąt częstych słów + długi ogon rzadkich tokenów
+    rng = np.random.default_rng(seed)
+    tail = 50_000
+    ranks = np.arange(1, len(WORDS) + tail + 1)
+    probs = 1.0 / ranks
+    probs /= probs.sum()
+    vocab = WORDS + [f"w{i}" for i in range(tail)]
+    batch = 10_000
+    for start in range(0, n, batch):
+        size = min(batch, n - start)
+        ids = rng.choice(len(vocab), size=(size, words_per_chunk), p=probs)
+        yield [" ".join(vocab[j] for j in row) for row in ids]
+
+def percentile_ms(samples, p):
+    return float(np.percentile(samples, p) * 1000)
+
+def run(n: int, queries: int, words: int, top_k: int):
+    directory = tempfile.mkdtemp(prefix="bench_rag_")
+    try:
+        index = VectorIndex(directory)
+        t0 = time.perf_counter()
+        for chunk in synthetic_chunks(n, words):
+            index.add(chunk)
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        loaded = VectorIndex(directory)
+        load = time.perf_counter() - t0
+
+        rng = np.random.default_rng(1)
+        qs = [" ".join(rng.choice(WORDS, size=4)) for _ in range(queries)]
+        loaded.search(qs[0], top_k)  # idf i normy liczone przy pierwszym zapytaniu
+        lat, lat_sort = [], []
+        for q in qs:
+            t = time.perf_counter()
+            loaded.search(q, top_k)
+            lat.append(time.perf_counter() - t)
+            # Dla porównania: pełne sortowanie jak w poprzedniej wersji rag.py
+            t = time.perf_counter()
+            sims = loaded.scores(loaded.transform([q]))[:, 0]
+            np.argsort(sims)[-top_k:][::-1]
+            lat_sort.append(time.perf_counter() - t)
+
+        t0 = time.perf_counter()
+        loaded.add(next(synthetic_chunks(1_000, words, seed=99)))
+        incremental = time.perf_counter() - t0
+        print(
+            f"{n:>9} {build:>9.2f} {load * 1000:>9.1f} {incremental * 1000:>10.1f} "
+            f"{percentile_ms(lat, 50):>8.2f} {percentile_ms(lat, 95):>8.2f} "
+            f"{percentile_ms(lat_sort, 50):>10.2f} {len(loaded.vocab):>8}"
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    ap = argparse.ArgumentParser(description="Budowa i zapytania indeksu RAG przy rosnącej liczbie fragmentów")
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--words", type=int, default=40, help="słów na fragment")
+    ap.add_argument("--top-k", type=int, default=3)
+    args = ap.parse_args()
+    print(f"{'chunks':>9} {'build s':>9} {'load ms':>9} {'+1k ms':>10} {'p50 ms':>8} {'p95 ms':>8} {'sort p50':>10} {'vocab':>8}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        run(n, args.queries, args.words, args.top_k)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from bench_api import app_env, free_port, start_app, wait_ready
+from stubs import StubServer
+
+HEAVY = ("anthropic", "openai", "numpy", "scipy", "bs4", "lxml", "httpx")
+
+
+def import_profile(env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    # python -X importtime: "import time: self [us] | cumulative | imported package" na stderr
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, env=env,
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "import app nie powiódł się")
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def print_profile(rows: List[Tuple[str, int, int]], top: int) -> None:
+    # Czas własny zsumowany po pakietach najwyższego poziomu + najwolniejsze moduły łącznie
+    packages: Dict[str, int] = {}
+    for name, self_us, _ in rows:
+        pkg = name.strip().split(".")[0]
+        packages[pkg] = packages.get(pkg, 0) + self_us
+    total = sum(self_us for _, self_us, _ in rows)
+    print(f"import app: {total / 1000:.1f} ms łącznie, {len(rows)} modułów")
+    print(f"\n{'pakiet':<28}{'ms':>10}{'udział':>10}")
+    for pkg, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{pkg:<28}{us / 1000:>10.1f}{us / total:>10.1%}")
+    loaded = [h for h in HEAVY if h in packages]
+    print(f"\nciężkie pakiety ładowane przy imporcie: {', '.join(loaded) if loaded else 'brak'}")
+    print(f"\n{'moduł (łącznie z zależnościami)':<48}{'ms':>10}")
+    top_level = [r for r in rows if not r[0].startswith("  ")]
+    for name, _, cumulative in sorted(top_level, key=lambda r: -r[2])[:top]:
+        print(f"{name.strip():<48}{cumulative / 1000:>10.1f}")
+
+def import_wall(env: Dict[str, str], repeat: int) -> float:
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip()))
+    return statistics.median(samples)
+
+async def first_requests(base: str, proc: subprocess.Popen) -> Tuple[float, float]:
+    # Od uruchomienia procesu do pierwszej odpowiedzi i czas pierwszego pytania RAG (indeks, jeśli leniwie)
+    ready = await wait_ready(base, proc)
+    async with httpx.AsyncClient(timeout=30) as client:
+        t = time.perf_counter()
+        resp = await client.post(f"{base}/ask", json={"query": "jakie są nagrody?"})
+        resp.raise_for_status()
+        first_ask = time.perf_counter() - t
+    return ready, first_ask
+
+def startup(stub: StubServer, mode: str, repeat: int) -> Tuple[float, float]:
+    env = dict(app_env(stub, cold=False), STARTUP_WARMUP=mode)
+    readies, asks = [], []
+    for _ in range(repeat):
+        port = free_port()
+        proc = start_app(port, 1, env)
+        try:
+            ready, first_ask = asyncio.run(first_requests(f"http://127.0.0.1:{port}", proc))
+            readies.append(ready)
+            asks.append(first_ask)
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return statistics.median(readies), statistics.median(asks)
+
+def main():
+    ap = argparse.ArgumentParser(description="Profil importu aplikacji i czas zimnego startu wg trybu rozgrzewki")
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--modes", default="off,background,blocking", help="wartości STARTUP_WARMUP do porównania")
+    args = ap.parse_args()
+    with StubServer() as stub:
+        env = app_env(stub, cold=False)
+        print_profile(import_profile(env), args.top)
+        print(f"\nimport app (mediana z {args.repeat}): {import_wall(env, args.repeat) * 1000:.1f} ms")
+        print(f"\n{'STARTUP_WARMUP':<16}{'do 1. odpowiedzi ms':>22}{'1. /ask (RAG) ms':>20}")
+        for mode in args.modes.split(","):
+            ready, first_ask = startup(stub, mode.strip(), args.repeat)
+            print(f"{mode:<16}{ready * 1000:>22.1f}{first_ask * 1000:>20.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import close_client
+from stubs import StubServer
+from youtube import QuotaTracker, YouTubeClient
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:9.2f} ms"
+
+async def run(args, stub: StubServer):
+    quota = QuotaTracker(daily_limit=args.quota, path="")
+    client = YouTubeClient(api_key="stub", base_url=f"{stub.url}/youtube/v3", quota=quota, ttl=args.ttl, stale_ttl=0, cache_dir="", max_qps=0)
+    query = "Paderewski Piano Competition 2025"
+
+    t = time.perf_counter()
+    await client.search(query)
+    print(f"{'pierwsze wyszukiwanie':<40}{ms(time.perf_counter() - t)}  limit: {quota.used}")
+
+    t = time.perf_counter()
+    for _ in range(args.repeat):
+        await client.search(query)
+    print(f"{f'{args.repeat}x z cache (na wywołanie)':<40}{ms((time.perf_counter() - t) / args.repeat)}  limit: {quota.used}")
+
+    before = stub.stats["search_200"]
+    t = time.perf_counter()
+    await asyncio.gather(*(client.search("finał konkursu") for _ in range(args.concurrency)))
+    print(f"{f'{args.concurrency} równoległych identycznych':<40}{ms(time.perf_counter() - t)}  wywołań API: {stub.stats['search_200'] - before}")
+
+    before = sum(v for k, v in stub.stats.items() if k.startswith("search"))
+    t = time.perf_counter()
+    first = await client.search("etap I", max_results=5)
+    lazy_calls = sum(v for k, v in stub.stats.items() if k.startswith("search")) - before
+    videos = [v async for v in client.iter_videos("etap I", page_size=5)]
+    all_calls = sum(v for k, v in stub.stats.items() if k.startswith("search")) - before
+    print(f"{'paginacja: 5 wyników / wszystkie':<40}{ms(time.perf_counter() - t)}  stron: {lazy_calls} / {all_calls} ({len(first)}/{len(videos)} filmów)")
+
+    await asyncio.sleep(args.ttl + 0.05)
+    t = time.perf_counter()
+    await client.search(query)
+    print(f"{'po wygaśnięciu TTL (If-None-Match)':<40}{ms(time.perf_counter() - t)}  304: {stub.stats['search_304']}")
+
+    small = YouTubeClient(api_key="stub", base_url=f"{stub.url}/youtube/v3", quota=QuotaTracker(daily_limit=200, path=""), ttl=60, stale_ttl=0, cache_dir="", max_qps=0)
+    results = [await small.search(f"q{i}") for i in range(2)]
+    try:
+        await small.search("q-limit")
+        blocked = "nie"
+    except Exception as e:
+        blocked = type(e).__name__
+    print(f"{'limit 200 jednostek, 3 zapytania':<40}  wyniki: {[len(r) for r in results]}  trzecie: {blocked}")
+    await close_client()
+
+def main():
+    ap = argparse.ArgumentParser(description="Klient YouTube na lokalnym stubie: cache, limit, paginacja, ETag")
+    ap.add_argument("--latency", type=float, default=0.08, help="opóźnienie stubu (s)")
+    ap.add_argument("--repeat", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--ttl", type=float, default=0.5)
+    ap.add_argument("--quota", type=int, default=10000)
+    args = ap.parse_args()
+    with StubServer(latency=args.latency) as stub:
+        asyncio.run(run(args, stub))
+        print(f"statystyki stubu: {dict(stub.stats)}")
+
+if __name__ == "__main__":
+    main()
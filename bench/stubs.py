@@ -0,0 +1,280 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Lokalny serwer zastępujący usługi zewnętrzne w benchmarkach i testach ręcznych:
+#   /youtube/v3/search  — search.list z paginacją (pageToken), ETag/304 i limitem jednostek
+#   /pages/<plik>       — strony z bench/fixtures z ETag i Last-Modified
+#   POST /v1/messages   — Anthropic Messages API (zwykła odpowiedź i strumień SSE) z prognozą
+#                         z trzech pierwszych nazwisk z promptu; z `tools` odpowiada blokiem
+#                         tool_use, a powtórzony prefiks z cache_control liczy jako odczyt z cache
+# Ustaw YOUTUBE_API_BASE=http://127.0.0.1:<port>/youtube/v3, aby aplikacja pytała stub,
+# a ANTHROPIC_BASE_URL=http://127.0.0.1:<port> (i dowolny ANTHROPIC_API_KEY) dla LLM.
+class StubServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 videos_per_query: int = 23, quota_limit: int = 0, search_cost: int = 100,
+                 llm_latency: float = 0.0, llm_chunk_size: int = 24, llm_chunk_delay: float = 0.0):
+        self.latency = latency
+        self.llm_latency = llm_latency
+        self.llm_chunk_size = llm_chunk_size
+        self.llm_chunk_delay = llm_chunk_delay
+        self.videos_per_query = videos_per_query
+        self.quota_limit = quota_limit
+        self.search_cost = search_cost
+        self.quota_used = 0
+        self.cached_prefixes: set = set()
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def search_body(self, query: str, page_size: int, page_token: str) -> dict:
+        offset = int(page_token[1:]) if page_token.startswith("p") else 0
+        end = min(self.videos_per_query, offset + page_size)
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:8]
+        items = [
+            {"id": {"kind": "youtube#video", "videoId": f"{digest}{i:03d}"}, "snippet": {"title": f"{query} — nagranie {i + 1}"}}
+            for i in range(offset, end)
+        ]
+        body = {"kind": "youtube#searchListResponse", "items": items}
+        if end < self.videos_per_query:
+            body["nextPageToken"] = f"p{end}"
+        return body
+
+    @staticmethod
+    def llm_answer(user_text: str) -> str:
+        # Nazwiska to linie po nagłówku "Uczestnicy:" w treści promptu
+        _, _, tail = user_text.partition("Uczestnicy:")
+        names = [line.strip() for line in tail.splitlines() if line.strip()][:3] or ["Anna Nowak"]
+        probs = (0.35, 0.25, 0.15)
+        body = {
+            "top_candidates": [
+                {"name": n, "probability": p, "rationale": f"Stub: pozycja {i + 1} na liście."}
+                for i, (n, p) in enumerate(zip(names, probs))
+            ],
+            "note": "Odpowiedź lokalnego stubu.",
+        }
+        return json.dumps(body, ensure_ascii=False)
+
+    def llm_usage(self, req: dict, user_text: str, text: str) -> dict:
+        # Prefiks do ostatniego bloku z cache_control (narzędzia → system → wiadomości):
+        # pierwszy raz zapis do cache, kolejne razy odczyt
+        blocks = [req.get("tools") or []]
+        marked = 0
+        for block in (req.get("system") if isinstance(req.get("system"), list) else [req.get("system") or ""]):
+            blocks.append(block)
+            if isinstance(block, dict) and block.get("cache_control"):
+                marked = len(blocks)
+        for m in req.get("messages", []):
+            for block in (m.get("content") if isinstance(m.get("content"), list) else [m.get("content") or ""]):
+                blocks.append(block)
+                if isinstance(block, dict) and block.get("cache_control"):
+                    marked = len(blocks)
+        total = len(json.dumps(blocks, ensure_ascii=False)) // 4
+        usage = {"input_tokens": total, "output_tokens": len(text) // 4,
+                 "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+        if marked:
+            raw = json.dumps(blocks[:marked], ensure_ascii=False, sort_keys=True)
+            prefix_tokens = len(raw) // 4
+            digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+            with self._lock:
+                hit = digest in self.cached_prefixes
+                self.cached_prefixes.add(digest)
+            usage["input_tokens"] = max(0, total - prefix_tokens)
+            usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = prefix_tokens
+            self.count("llm_cache_hit" if hit else "llm_cache_write")
+        return usage
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", headers=None):
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                parts = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                if parts.path == "/youtube/v3/search":
+                    return self._search(params)
+                if parts.path.startswith("/pages/"):
+                    return self._page(parts.path[len("/pages/"):])
+                server.count("404")
+                self._send(404, b"not found")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if urlsplit(self.path).path != "/v1/messages":
+                    server.count("404")
+                    return self._send(404, b"not found")
+                try:
+                    req = json.loads(raw or b"{}")
+                except ValueError:
+                    return self._send(400, b"bad json")
+                if server.llm_latency:
+                    time.sleep(server.llm_latency)
+                user_text = "".join(
+                    block.get("text", "") if isinstance(block, dict) else str(block)
+                    for m in req.get("messages", [])
+                    for block in (m.get("content") if isinstance(m.get("content"), list) else [m.get("content") or ""])
+                )
+                text = server.llm_answer(user_text)
+                usage = server.llm_usage(req, user_text, text)
+                tool = (req.get("tool_choice") or {}).get("name") if req.get("tools") else None
+                if req.get("stream"):
+                    server.count("llm_stream")
+                    return self._messages_stream(req.get("model", ""), text, usage, tool)
+                server.count("llm_200")
+                if tool:
+                    content = [{"type": "tool_use", "id": "toolu_stub", "name": tool, "input": json.loads(text)}]
+                else:
+                    content = [{"type": "text", "text": text}]
+                body = {
+                    "id": "msg_stub", "type": "message", "role": "assistant", "model": req.get("model", ""),
+                    "content": content,
+                    "stop_reason": "tool_use" if tool else "end_turn", "stop_sequence": None, "usage": usage,
+                }
+                self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"), {"Content-Type": "application/json"})
+
+            def _messages_stream(self, model, text, usage, tool=None):
+                # Zdarzenia jak w API Anthropic; treść w kawałkach (chunked), z opcjonalną przerwą
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def event(name, data):
+                    frame = f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(frame):x}\r\n".encode() + frame + b"\r\n")
+                    self.wfile.flush()
+
+                message = {
+                    "id": "msg_stub", "type": "message", "role": "assistant", "model": model, "content": [],
+                    "stop_reason": None, "stop_sequence": None, "usage": dict(usage, output_tokens=1),
+                }
+                event("message_start", {"type": "message_start", "message": message})
+                if tool:
+                    block = {"type": "tool_use", "id": "toolu_stub", "name": tool, "input": {}}
+                else:
+                    block = {"type": "text", "text": ""}
+                event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": block})
+                step = max(1, server.llm_chunk_size)
+                for i in range(0, len(text), step):
+                    if server.llm_chunk_delay:
+                        time.sleep(server.llm_chunk_delay)
+                    if tool:
+                        delta = {"type": "input_json_delta", "partial_json": text[i:i + step]}
+                    else:
+                        delta = {"type": "text_delta", "text": text[i:i + step]}
+                    event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": delta})
+                event("content_block_stop", {"type": "content_block_stop", "index": 0})
+                event("message_delta", {
+                    "type": "message_delta", "delta": {"stop_reason": "tool_use" if tool else "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": usage["output_tokens"]},
+                })
+                event("message_stop", {"type": "message_stop"})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def _search(self, params):
+                with server._lock:
+                    over = server.quota_limit and server.quota_used + server.search_cost > server.quota_limit
+                    if not over:
+                        server.quota_used += server.search_cost
+                if over:
+                    server.count("search_403")
+                    body = {"error": {"code": 403, "errors": [{"reason": "quotaExceeded"}]}}
+                    return self._send(403, json.dumps(body).encode(), {"Content-Type": "application/json"})
+                body = server.search_body(params.get("q", ""), int(params.get("maxResults", 5)), params.get("pageToken", ""))
+                raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                etag = '"' + hashlib.sha1(raw).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    server.count("search_304")
+                    return self._send(304, headers={"ETag": etag})
+                server.count("search_200")
+                self._send(200, raw, {"Content-Type": "application/json; charset=utf-8", "ETag": etag})
+
+            def _page(self, name):
+                path = os.path.join(FIXTURES, os.path.basename(name))
+                if not os.path.isfile(path):
+                    server.count("404")
+                    return self._send(404, b"not found")
+                with open(path, "rb") as f:
+                    raw = f.read()
+                etag = '"' + hashlib.sha1(raw).hexdigest()[:16] + '"'
+                modified = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(os.path.getmtime(path)))
+                headers = {"ETag": etag, "Last-Modified": modified}
+                if self.headers.get("If-None-Match") == etag:
+                    server.count("page_304")
+                    return self._send(304, headers=headers)
+                server.count("page_200")
+                self._send(200, raw, dict(headers, **{"Content-Type": "text/html; charset=utf-8"}))
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Lokalny stub YouTube API, stron konkursu i Anthropic API")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--latency", type=float, default=0.0, help="sztuczne opóźnienie odpowiedzi (s)")
+    ap.add_argument("--quota", type=int, default=0, help="limit jednostek YouTube (0 = bez limitu)")
+    ap.add_argument("--llm-latency", type=float, default=0.0, help="opóźnienie odpowiedzi LLM (s)")
+    args = ap.parse_args()
+    stub = StubServer(port=args.port, latency=args.latency, quota_limit=args.quota, llm_latency=args.llm_latency).start()
+    print(f"stub: {stub.url}  (YOUTUBE_API_BASE={stub.url}/youtube/v3, ANTHROPIC_BASE_URL={stub.url}, "
+          f"strony: {stub.url}/pages/participants.html)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from config import SHARED_CLAIM_TTL, SHARED_POLL_INTERVAL
+from metrics import CACHE_REQUESTS, SHARED_LOADS
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "written_at", "ttl")
+
+    def __init__(self, value: Any, ttl: float, age: float = 0.0):
+        self.value = value
+        self.stored_at = time.monotonic() - age
+        # Czas zapisu (zegar ścienny) — porównywany z wpisami w magazynie współdzielonym
+        self.written_at = time.time() - age
+        self.ttl = ttl
+
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+
+# Trwały magazyn JSON (plik na klucz) — wpisy przeżywają restart procesu
+class JsonFileStore:
+    shared = False
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha256(str(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def load(self, key: Hashable, newer_than: float = 0.0) -> Optional[Tuple[Any, float]]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                record = json.load(f)
+            stored_at = float(record["stored_at"])
+            return (record["value"], stored_at) if stored_at > newer_than else None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, key: Hashable, value: Any) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": str(key), "stored_at": time.time(), "value": value}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+# Cache z TTL per klucz i trybem stale-while-revalidate: świeży wpis wraca od razu,
+# przeterminowany (młodszy niż ttl + stale_ttl) też, a w tle rusza jedno odświeżenie.
+# Równoległe ładowania tego samego klucza są sklejane w jedno wywołanie loadera.
+# Ze współdzielonym magazynem (store.shared) także między procesami: przeterminowany wpis
+# najpierw szukany jest w magazynie (mógł go odświeżyć inny proces), a loader woła tylko
+# proces, który zajmie klucz — pozostali czekają na jego zapis.
+class TTLCache:
+    def __init__(self, name: str, stale_ttl: float = 0.0, store: Optional[JsonFileStore] = None):
+        self.name = name
+        self.stale_ttl = stale_ttl
+        self.store = store
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+
+    async def get(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float,
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        if ttl <= 0:
+            CACHE_REQUESTS.inc(cache=self.name, result="bypass")
+            return await loader()
+        entry = await self._current(key, ttl)
+        if entry is not None:
+            age = entry.age()
+            if age < entry.ttl:
+                CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                return entry.value
+            if age < entry.ttl + self.stale_ttl:
+                CACHE_REQUESTS.inc(cache=self.name, result="stale")
+                self._start(key, loader, ttl, cache_if)
+                return entry.value
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        # shield: anulowanie jednego klienta nie przerywa wspólnego ładowania
+        return await asyncio.shield(self._start(key, loader, ttl, cache_if))
+
+    async def lookup(self, key: Hashable, ttl: float) -> Any:
+        # Tylko świeży wpis (pamięć lub magazyn), bez ładowania
+        entry = await self._current(key, ttl)
+        if entry is not None and entry.age() < entry.ttl:
+            return entry.value
+        return None
+
+    async def remaining(self, key: Hashable, ttl: float) -> float:
+        # Ile sekund wpis pozostanie świeży (0, gdy brak lub przeterminowany)
+        entry = await self._current(key, ttl)
+        return max(0.0, entry.ttl - entry.age()) if entry is not None else 0.0
+
+    def fresh(self, key: Hashable) -> Any:
+        # Świeży wpis tylko z pamięci — synchronicznie, bez zaglądania do magazynu
+        entry = self._entries.get(key)
+        if entry is not None and entry.age() < entry.ttl:
+            return entry.value
+        return None
+
+    async def refresh(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float,
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> bool:
+        # Wymuszone przeładowanie niezależnie od wieku wpisu (np. z harmonogramu);
+        # True, gdy zapisano nową wartość. Dołącza do trwającego ładowania tego klucza.
+        before = self._entries.get(key)
+        await asyncio.shield(self._start(key, loader, ttl, cache_if))
+        return self._entries.get(key) is not before
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._entries[key] = _Entry(value, ttl)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.save, key, value)
+
+    def peek(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def _current(self, key, ttl) -> Optional[_Entry]:
+        # Wpis z pamięci; z magazynu, gdy w pamięci brak albo (magazyn współdzielony) wpis wygasł.
+        # Odczyt magazynu (SQLite, plik JSON) w wątku — nie blokuje pętli zdarzeń.
+        entry = self._entries.get(key)
+        if self.store is None:
+            return entry
+        if entry is None:
+            return await self._from_store(key, ttl)
+        if self.store.shared and entry.age() >= entry.ttl:
+            return await self._from_store(key, ttl, entry.written_at) or entry
+        return entry
+
+    async def _from_store(self, key, ttl, newer_than: float = 0.0) -> Optional[_Entry]:
+        record = await asyncio.to_thread(self.store.load, key, newer_than)
+        if record is None:
+            return None
+        value, stored_at = record
+        age = max(0.0, time.time() - stored_at)
+        if age >= ttl + self.stale_ttl:
+            return None
+        entry = self._entries[key] = _Entry(value, ttl, age=age)
+        return entry
+
+    def _start(self, key, loader, ttl, cache_if) -> asyncio.Task:
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._run(key, loader, ttl, cache_if))
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return task
+
+    def _finish(self, key, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # Błąd odświeżenia w tle nie może zostać "nieodebrany"
+        if not task.cancelled():
+            task.exception()
+
+    async def _claim_shared(self, key, ttl) -> Tuple[Optional[_Entry], bool]:
+        # (wpis zapisany przez inny proces, None) albo (None, czy zajęliśmy klucz).
+        # Po SHARED_CLAIM_TTL bez wyniku ładujemy sami — zajmujący mógł paść albo dostać pusty wynik.
+        known = self._entries.get(key)
+        since = known.written_at if known is not None else 0.0
+        loop = asyncio.get_running_loop()
+        give_up = loop.time() + SHARED_CLAIM_TTL
+        while True:
+            if await asyncio.to_thread(self.store.claim, key, SHARED_CLAIM_TTL):
+                # Poprzedni zajmujący mógł właśnie zapisać wynik i zwolnić klucz
+                entry = await self._from_store(key, ttl, since)
+                if entry is not None and entry.age() < entry.ttl:
+                    await asyncio.to_thread(self.store.release, key)
+                    SHARED_LOADS.inc(cache=self.name, result="peer")
+                    return entry, False
+                SHARED_LOADS.inc(cache=self.name, result="claimed")
+                return None, True
+            await asyncio.sleep(SHARED_POLL_INTERVAL)
+            entry = await self._from_store(key, ttl, since)
+            if entry is not None and entry.age() < entry.ttl:
+                SHARED_LOADS.inc(cache=self.name, result="peer")
+                return entry, False
+            if loop.time() >= give_up:
+                SHARED_LOADS.inc(cache=self.name, result="timeout")
+                return None, False
+
+    async def _run(self, key, loader, ttl, cache_if) -> Any:
+        claimed = False
+        if self.store is not None and self.store.shared:
+            entry, claimed = await self._claim_shared(key, ttl)
+            if entry is not None:
+                return entry.value
+        try:
+            value = await loader()
+            if cache_if is None or cache_if(value):
+                await self.set(key, value, ttl)
+                return value
+        finally:
+            # Zwolnienie po zapisie — czekający od razu widzą nową wartość
+            if claimed:
+                await asyncio.to_thread(self.store.release, key)
+        # Nie nadpisujemy dobrych (choć starych) danych pustym wynikiem
+        stale = self._entries.get(key)
+        return stale.value if stale is not None else value
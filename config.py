@@ -1,4 +1,6 @@
+import importlib.util
 import os
+import threading
 from typing import Dict
 
 try:
@@ -7,16 +9,6 @@ try:
 except Exception:
     pass
 
-try:
-    from anthropic import Anthropic
-except Exception:
-    Anthropic = None
-
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None
-
 # Podstawowe ustawienia
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY", "")
 PADEREWSKI_BASE_URL = os.getenv("PADEREWSKI_BASE_URL", "https://paderewskicompetition.pl/")
@@ -26,23 +18,175 @@ PARTICIPANTS_URL = os.getenv(
 )
 JURY_URL = os.getenv("JURY_URL", "https://paderewskicompetition.pl/jury/")
 
+# Klient HTTP (współdzielona pula połączeń, sekundy)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "12"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "6"))
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "PaderewskiAI/1.0 (+https://paderewskicompetition.pl/)")
+YOUTUBE_TIMEOUT = float(os.getenv("YOUTUBE_TIMEOUT", "8"))
+# Trwały cache stron (walidatory + treść; puste = wyłączony), limit rozmiaru w bajtach, kompresja gzip
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "")
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+HTTP_CACHE_COMPRESS = os.getenv("HTTP_CACHE_COMPRESS", "1") not in ("0", "false", "False", "")
+
+# YouTube Data API: limit dzienny w jednostkach (search.list = 100), cache wyników per zapytanie,
+# maks. zapytań na sekundę. Katalog cache i plik stanu limitu opcjonalne (przeżywają restart).
+YOUTUBE_API_BASE = os.getenv("YOUTUBE_API_BASE", "https://www.googleapis.com/youtube/v3")
+YOUTUBE_DEFAULT_QUERY = os.getenv("YOUTUBE_DEFAULT_QUERY", "Paderewski Piano Competition 2025")
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+YOUTUBE_SEARCH_COST = int(os.getenv("YOUTUBE_SEARCH_COST", "100"))
+YOUTUBE_MAX_QPS = float(os.getenv("YOUTUBE_MAX_QPS", "2"))
+YOUTUBE_CACHE_STALE_TTL = float(os.getenv("YOUTUBE_CACHE_STALE_TTL", "86400"))
+YOUTUBE_CACHE_DIR = os.getenv("YOUTUBE_CACHE_DIR", "")
+YOUTUBE_QUOTA_PATH = os.getenv("YOUTUBE_QUOTA_PATH", "")
+
+# Parser HTML dla BeautifulSoup ("lxml", "html.parser"); puste = lxml jeśli zainstalowany
+HTML_PARSER = os.getenv("HTML_PARSER", "")
+
+# Indeks RAG: katalog na dysku (puste = tylko w pamięci) i limit segmentów przed scaleniem
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", "")
+RAG_MAX_SEGMENTS = int(os.getenv("RAG_MAX_SEGMENTS", "16"))
+# Zapytania wektoryzowane razem w /ask/batch (ogranicza gęstą macierz n_docs x nq)
+RAG_BATCH_CHUNK = int(os.getenv("RAG_BATCH_CHUNK", "256"))
+
+# Ingestia stron do indeksu RAG (w tle; INGEST_INTERVAL 0 wyłącza)
+INGEST_URLS = [u.strip() for u in os.getenv("INGEST_URLS", ",".join([PADEREWSKI_BASE_URL, PARTICIPANTS_URL, JURY_URL])).split(",") if u.strip()]
+INGEST_INTERVAL = float(os.getenv("INGEST_INTERVAL", "3600"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "800"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "150"))
+INGEST_STATE_PATH = os.getenv(
+    "INGEST_STATE_PATH",
+    os.path.join(RAG_INDEX_DIR, "ingest_state.json") if RAG_INDEX_DIR else "",
+)
+
+# Dziennik zmian list uczestników/jury (liczba wpisów dla ?since=)
+PEOPLE_CHANGELOG_MAX = int(os.getenv("PEOPLE_CHANGELOG_MAX", "1000"))
+
+# Gotowe odpowiedzi list (/participants, /jury, /history) i strony głównej: Cache-Control (sekundy),
+# minimalny rozmiar treści (bajty), od którego trzymamy warianty gzip/brotli
+RESPONSE_MAX_AGE = int(os.getenv("RESPONSE_MAX_AGE", "60"))
+RESPONSE_STALE_WHILE_REVALIDATE = int(os.getenv("RESPONSE_STALE_WHILE_REVALIDATE", "600"))
+INDEX_MAX_AGE = int(os.getenv("INDEX_MAX_AGE", "3600"))
+SNAPSHOT_MIN_COMPRESS = int(os.getenv("SNAPSHOT_MIN_COMPRESS", "512"))
+
+# Router intencji /ask: minimalne podobieństwo do przykładów, gdy brak słowa kluczowego
+INTENT_NN_THRESHOLD = float(os.getenv("INTENT_NN_THRESHOLD", "0.45"))
+# Cache odpowiedzi /ask: liczba wpisów (LRU) i minimalne podobieństwo kosinusowe parafrazy
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.8"))
+# Maksymalna liczba pytań w jednym POST /ask/batch
+ASK_BATCH_MAX = int(os.getenv("ASK_BATCH_MAX", "1000"))
+
+# Cache wyników scrapowania (sekundy; TTL 0 wyłącza cache)
+PARTICIPANTS_CACHE_TTL = float(os.getenv("PARTICIPANTS_CACHE_TTL", "900"))
+JURY_CACHE_TTL = float(os.getenv("JURY_CACHE_TTL", "3600"))
+HISTORY_CACHE_TTL = float(os.getenv("HISTORY_CACHE_TTL", "21600"))
+YOUTUBE_CACHE_TTL = float(os.getenv("YOUTUBE_CACHE_TTL", "3600"))
+SCRAPE_CACHE_STALE_TTL = float(os.getenv("SCRAPE_CACHE_STALE_TTL", "86400"))
+# Łączny limit czasu równoległego sprawdzania adresów zapasowych
+FALLBACK_PROBE_DEADLINE = float(os.getenv("FALLBACK_PROBE_DEADLINE", "15"))
+
+# Stan współdzielony przez procesy uvicorn --workers N (SQLite w trybie WAL; puste = każdy proces osobno).
+# Listy, historia i prognozy trafiają do bazy; odświeża je jeden wybrany proces (lider, dzierżawa
+# SHARED_LEASE_TTL sekund), reszta czyta. Ładowanie brakującego wpisu zajmuje klucz na SHARED_CLAIM_TTL,
+# pozostali co SHARED_POLL_INTERVAL sprawdzają, czy wynik już jest.
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "")
+SHARED_LEASE_TTL = float(os.getenv("SHARED_LEASE_TTL", "30"))
+SHARED_CLAIM_TTL = float(os.getenv("SHARED_CLAIM_TTL", "30"))
+SHARED_POLL_INTERVAL = float(os.getenv("SHARED_POLL_INTERVAL", "0.2"))
+SHARED_MMAP_BYTES = int(os.getenv("SHARED_MMAP_BYTES", str(64 * 1024 * 1024)))
+
+# Harmonogram odświeżania w tle (sekundy). Poza dniami etapów zadanie odświeża dane co TTL
+# swojego cache; w dni etapów (daty z harmonogramu konkursu, czas polski) najwyżej co
+# SCHEDULER_STAGE_INTERVAL. Po błędzie ponowienie z wykładniczym odstępem.
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") not in ("0", "false", "False", "")
+SCHEDULER_STAGE_DAYS = os.getenv(
+    "SCHEDULER_STAGE_DAYS",
+    "2025-11-10/2025-11-13,2025-11-14/2025-11-16,2025-11-18/2025-11-19,2025-11-21/2025-11-22",
+)
+SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE", "Europe/Warsaw")
+SCHEDULER_STAGE_INTERVAL = float(os.getenv("SCHEDULER_STAGE_INTERVAL", "300"))
+SCHEDULER_PREDICTION_INTERVAL = float(os.getenv("SCHEDULER_PREDICTION_INTERVAL", "3600"))
+SCHEDULER_RETRY_BASE = float(os.getenv("SCHEDULER_RETRY_BASE", "30"))
+SCHEDULER_RETRY_MAX = float(os.getenv("SCHEDULER_RETRY_MAX", "1800"))
+
 # LLM
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "anthropic")  # "anthropic" lub "openai"
 LLM_MODEL = os.getenv("LLM_MODEL", "claude-sonnet-4-5-20250929")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 
-anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY) if (ANTHROPIC_API_KEY and Anthropic) else None
-openai_client = OpenAI(api_key=OPENAI_API_KEY) if (OPENAI_API_KEY and OpenAI) else None
+# Wywołania LLM: limit czasu próby, termin łączny, ponowienia i równoległość (sekundy)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+# Budowa promptu: limit tokenów wejścia (długa lista uczestników jest przycinana), znaki na token
+# w szacunku bez tokenizera, limit tokenów odpowiedzi prognozy, znaczniki cache promptu (Anthropic)
+# i liczba ostatnich wywołań pokazywanych w /debug_llm
+LLM_PROMPT_MAX_TOKENS = int(os.getenv("LLM_PROMPT_MAX_TOKENS", "8000"))
+LLM_CHARS_PER_TOKEN = float(os.getenv("LLM_CHARS_PER_TOKEN", "3.0"))
+LLM_PREDICTION_MAX_TOKENS = int(os.getenv("LLM_PREDICTION_MAX_TOKENS", "600"))
+LLM_PROMPT_CACHE = os.getenv("LLM_PROMPT_CACHE", "1") not in ("0", "false", "False", "")
+LLM_RECENT_CALLS = int(os.getenv("LLM_RECENT_CALLS", "50"))
+
+# Cache prognoz LLM (sekundy); katalog opcjonalny — przeżywa restart
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "21600"))
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR", "")
+
+# Rozgrzewka po starcie: "background" (serwer przyjmuje żądania od razu, klienci LLM, indeks RAG
+# i parser HTML powstają w tle), "blocking" (przed pierwszym żądaniem), "off" (przy pierwszym użyciu)
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background")
+
+# Klienci asynchroniczni tworzeni przy pierwszym użyciu — import config nie ładuje SDK.
+# Ponowienia robi llm_providers, więc SDK ich nie powtarza.
+_clients: Dict[str, object] = {}
+_clients_lock = threading.Lock()
+
+def _sdk_installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def _build_anthropic():
+    from anthropic import AsyncAnthropic
+    return AsyncAnthropic(api_key=ANTHROPIC_API_KEY, timeout=LLM_TIMEOUT, max_retries=0)
+
+def _build_openai():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT, max_retries=0)
+
+def _client(name: str, key: str, build):
+    if name not in _clients:
+        with _clients_lock:
+            if name not in _clients:
+                client = None
+                if key:
+                    try:
+                        client = build()
+                    except Exception:
+                        client = None
+                _clients[name] = client
+    return _clients[name]
+
+def get_anthropic_client():
+    return _client("anthropic", ANTHROPIC_API_KEY, _build_anthropic)
+
+def get_openai_client():
+    return _client("openai", OPENAI_API_KEY, _build_openai)
 
 def get_llm_diagnostics() -> Dict:
     return {
         "provider": LLM_PROVIDER,
         "model": LLM_MODEL,
-        "anthropic_ready": bool(anthropic_client),
+        "anthropic_ready": bool(get_anthropic_client()),
         "anthropic_key_present": bool(ANTHROPIC_API_KEY),
-        "anthropic_sdk_installed": Anthropic is not None,
-        "openai_ready": bool(openai_client),
+        "anthropic_sdk_installed": _sdk_installed("anthropic"),
+        "openai_ready": bool(get_openai_client()),
         "openai_key_present": bool(OPENAI_API_KEY),
-        "openai_sdk_installed": OpenAI is not None,
+        "openai_sdk_installed": _sdk_installed("openai"),
     }
\ No newline at end of file
@@ -0,0 +1,208 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config import HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_COMPRESS
+from http_client import fetch
+from metrics import HTTP_CACHE_REQUESTS
+
+
+class CachedPage:
+    __slots__ = ("url", "etag", "last_modified", "body_hash", "body_path", "meta_path", "stored_at")
+
+    def __init__(self, url: str, etag: Optional[str], last_modified: Optional[str], body_hash: str,
+                 body_path: str, meta_path: str, stored_at: float):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+        self.body_path = body_path
+        self.meta_path = meta_path
+        self.stored_at = stored_at
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+# Trwały cache HTTP: na URL plik meta (walidatory, hash treści) i plik treści (gzip opcjonalnie).
+# Zapisy atomowe (tmp + replace), więc katalog może być współdzielony przez kilka procesów.
+# Rozmiar ograniczony do max_bytes — usuwane najdawniej używane wpisy (mtime odświeżany przy trafieniu).
+class HttpCache:
+    def __init__(self, directory: str, max_bytes: int = HTTP_CACHE_MAX_BYTES, compress: bool = HTTP_CACHE_COMPRESS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compress = compress
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # klucz -> (rozmiar na dysku, ostatnie użycie); liczone leniwie skanem katalogu
+        self._usage: Optional[Dict[str, Tuple[int, float]]] = None
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        body = os.path.join(self.directory, key + (".body.gz" if self.compress else ".body"))
+        return os.path.join(self.directory, key + ".meta.json"), body
+
+    def _files(self, key: str) -> Tuple[str, ...]:
+        # Wszystkie pliki wpisu, także treść zapisana przy innym ustawieniu kompresji
+        return tuple(os.path.join(self.directory, key + ext) for ext in (".meta.json", ".body.gz", ".body"))
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        meta_path, _ = self._paths(self._key(url))
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        body_path = os.path.join(self.directory, meta.get("body", ""))
+        if meta.get("url") != url or not os.path.exists(body_path):
+            return None
+        return CachedPage(url, meta.get("etag"), meta.get("last_modified"), meta.get("body_hash", ""),
+                          body_path, meta_path, float(meta.get("stored_at", 0)))
+
+    def read(self, page: CachedPage) -> Optional[str]:
+        try:
+            with open(page.body_path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        if page.body_path.endswith(".gz"):
+            raw = gzip.decompress(raw)
+        self.touch(page)
+        return raw.decode("utf-8")
+
+    def touch(self, page: CachedPage) -> None:
+        now = time.time()
+        try:
+            os.utime(page.meta_path, (now, now))
+        except OSError:
+            return
+        with self._lock:
+            if self._usage is not None:
+                key = os.path.basename(page.meta_path)[: -len(".meta.json")]
+                size = self._usage.get(key, (0, now))[0]
+                self._usage[key] = (size, now)
+
+    def store(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str]) -> CachedPage:
+        key = self._key(url)
+        meta_path, body_path = self._paths(key)
+        raw = text.encode("utf-8")
+        body_hash = hashlib.sha1(raw).hexdigest()
+        data = gzip.compress(raw, compresslevel=6) if self.compress else raw
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(body_path + suffix, "wb") as f:
+            f.write(data)
+        os.replace(body_path + suffix, body_path)
+        now = time.time()
+        meta = {
+            "url": url, "etag": etag, "last_modified": last_modified, "body_hash": body_hash,
+            "body": os.path.basename(body_path), "stored_at": now, "size": len(data),
+        }
+        # Meta po treści — czytelnik nie zobaczy walidatorów bez odpowiadającego im pliku
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_path + suffix, meta_path)
+        # Treść zapisana przy innym ustawieniu kompresji nie jest już wskazywana przez meta — usuwamy ją,
+        # inaczej leżałaby na dysku poza licznikiem rozmiaru
+        for path in self._files(key)[1:]:
+            if path != body_path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        with self._lock:
+            usage = self._scan()
+            usage[key] = (len(data) + os.path.getsize(meta_path), now)
+        self._evict()
+        return CachedPage(url, etag, last_modified, body_hash, body_path, meta_path, now)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for size, _ in self._scan().values())
+
+    def _scan(self) -> Dict[str, Tuple[int, float]]:
+        # Wywoływane pod blokadą
+        if self._usage is None:
+            usage: Dict[str, Tuple[int, float]] = {}
+            for name in os.listdir(self.directory):
+                if not name.endswith(".meta.json"):
+                    continue
+                key = name[: -len(".meta.json")]
+                try:
+                    mtime = os.stat(os.path.join(self.directory, name)).st_mtime
+                except OSError:
+                    continue
+                usage[key] = (sum(os.path.getsize(p) for p in self._files(key) if os.path.exists(p)), mtime)
+            self._usage = usage
+        return self._usage
+
+    def _evict(self) -> None:
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            usage = self._scan()
+            total = sum(size for size, _ in usage.values())
+            if total <= self.max_bytes:
+                return
+            for key, (size, _) in sorted(usage.items(), key=lambda kv: kv[1][1]):
+                if total <= self.max_bytes:
+                    break
+                for path in self._files(key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                del usage[key]
+                total -= size
+
+
+_cache: Optional[HttpCache] = None
+
+def get_http_cache() -> Optional[HttpCache]:
+    global _cache
+    if _cache is None and HTTP_CACHE_DIR:
+        _cache = HttpCache(HTTP_CACHE_DIR)
+    return _cache
+
+def set_http_cache(cache: Optional[HttpCache]) -> None:
+    global _cache
+    _cache = cache
+
+async def fetch_text(url: str, timeout: Optional[float] = None) -> Optional[str]:
+    # GET z rewalidacją: 304 = treść z dysku bez transferu; błąd sieci albo 5xx = ostatnia zapisana wersja
+    cache = get_http_cache()
+    page = await asyncio.to_thread(cache.lookup, url) if cache is not None else None
+    try:
+        resp = await fetch(url, headers=page.validators() if page else None, timeout=timeout)
+    except Exception:
+        if page is not None:
+            HTTP_CACHE_REQUESTS.inc(result="stale_on_error")
+            return await asyncio.to_thread(cache.read, page)
+        return None
+    if resp.status_code == 304 and page is not None:
+        HTTP_CACHE_REQUESTS.inc(result="not_modified")
+        return await asyncio.to_thread(cache.read, page)
+    if resp.status_code >= 500 and page is not None:
+        HTTP_CACHE_REQUESTS.inc(result="stale_on_error")
+        return await asyncio.to_thread(cache.read, page)
+    if resp.status_code != 200:
+        return None
+    text = resp.text
+    if cache is not None:
+        HTTP_CACHE_REQUESTS.inc(result="miss" if page is None else "modified")
+        try:
+            await asyncio.to_thread(cache.store, url, text, resp.headers.get("etag"), resp.headers.get("last-modified"))
+        except OSError:
+            pass
+    return text
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+from urllib.parse import urlsplit
+
+from config import (
+    HTTP_TIMEOUT, HTTP_CONNECT_TIMEOUT, HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY, HTTP_PER_HOST_LIMIT, HTTP_USER_AGENT,
+)
+from metrics import UPSTREAM_FETCH_SECONDS
+
+# httpx ładowany przy pierwszym pobraniu (albo w rozgrzewce), nie przy imporcie aplikacji
+if TYPE_CHECKING:
+    import httpx
+
+_client: Optional["httpx.AsyncClient"] = None
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+
+def get_client() -> "httpx.AsyncClient":
+    # Jeden współdzielony klient = pula połączeń z keep-alive dla całego procesu
+    global _client
+    import httpx
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            headers={"User-Agent": HTTP_USER_AGENT},
+            follow_redirects=True,
+        )
+    return _client
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_limits.clear()
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc.lower()
+    sem = _host_limits.get(host)
+    if sem is None:
+        sem = _host_limits[host] = asyncio.Semaphore(HTTP_PER_HOST_LIMIT)
+    return sem
+
+async def fetch(
+    url: str,
+    params: Optional[Dict] = None,
+    headers: Optional[Dict] = None,
+    timeout: Optional[float] = None,
+) -> "httpx.Response":
+    import httpx
+    request_timeout = timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+    host = urlsplit(url).netloc.lower()
+    async with _host_semaphore(url):
+        # Czas liczony bez oczekiwania na semafor hosta — mierzymy upstream, nie kolejkę
+        start = time.perf_counter()
+        status = "error"
+        try:
+            resp = await get_client().get(url, params=params, headers=headers, timeout=request_timeout)
+            status = str(resp.status_code)
+            return resp
+        finally:
+            UPSTREAM_FETCH_SECONDS.observe(time.perf_counter() - start, host=host, status=status)
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from config import (
+    INGEST_URLS, INGEST_INTERVAL, INGEST_BATCH_SIZE, INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP, INGEST_STATE_PATH,
+    SHARED_LEASE_TTL,
+)
+from metrics import RAG_INDEX_RELOADS
+from rag import add_documents, get_index, reload_index, remove_documents
+from shared_state import is_leader
+from utils.html import make_soup
+from web import fetch_html
+
+# Elementy nawigacyjne i techniczne, które nie niosą treści strony
+BOILERPLATE_TAGS = ["script", "style", "noscript", "template", "header", "footer", "nav", "aside", "form", "iframe", "svg"]
+BOILERPLATE_ATTR = re.compile(r"menu|navigation|navbar|footer|sidebar|cookie|breadcrumb|share|social|widget|newsletter", re.I)
+
+_WS = re.compile(r"\s")
+
+_state: Optional[Dict[str, Dict]] = None
+_known_hashes: Optional[Set[str]] = None
+
+def strip_boilerplate(html: str) -> str:
+    soup = make_soup(html)
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(True):
+        if tag.decomposed or tag.attrs is None:
+            continue
+        marker = " ".join(tag.get("class") or []) + " " + (tag.get("id") or "")
+        if marker.strip() and BOILERPLATE_ATTR.search(marker):
+            tag.decompose()
+    container = soup.find(class_="entry-content") or soup.find("article") or soup.find("main") or soup.body or soup
+    lines = (re.sub(r"\s+", " ", line).strip() for line in container.get_text("\n").splitlines())
+    return "\n".join(line for line in lines if line)
+
+def chunk_text(text: str, size: int = INGEST_CHUNK_SIZE, overlap: int = INGEST_CHUNK_OVERLAP) -> Iterator[str]:
+    # Okna po ~size znaków z zakładką; cięcie na granicy słowa
+    text = text.strip()
+    if not text:
+        return
+    step = max(1, size - overlap)
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            cut = max(text.rfind(" ", start + step, end), text.rfind("\n", start + step, end))
+            if cut > start:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            yield chunk
+        if end >= len(text):
+            break
+        nxt = _WS.search(text, start + step, end)
+        start = nxt.end() if nxt else start + step
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(re.sub(r"\s+", " ", text).strip().lower().encode("utf-8")).hexdigest()
+
+def _load_state() -> Dict[str, Dict]:
+    global _state
+    if _state is None:
+        _state = {}
+        if INGEST_STATE_PATH and os.path.exists(INGEST_STATE_PATH):
+            try:
+                with open(INGEST_STATE_PATH, encoding="utf-8") as f:
+                    _state = json.load(f)
+            except (OSError, ValueError):
+                _state = {}
+    return _state
+
+def _save_state() -> None:
+    if not INGEST_STATE_PATH:
+        return
+    os.makedirs(os.path.dirname(INGEST_STATE_PATH) or ".", exist_ok=True)
+    tmp = INGEST_STATE_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_state, f, ensure_ascii=False)
+    os.replace(tmp, INGEST_STATE_PATH)
+
+def _hashes() -> Set[str]:
+    global _known_hashes
+    if _known_hashes is None:
+        index = get_index()
+        _known_hashes = {m.get("hash") for i, m in enumerate(index.meta) if m.get("hash") and i not in index.deleted}
+    return _known_hashes
+
+async def _fetch_changed(url: str) -> Tuple[Optional[str], Optional[Dict]]:
+    # HTML z tych samych pobrań co web.py (trwały cache HTTP z rewalidacją 304); zwracany tylko,
+    # gdy zmienił się hash treści
+    html = await fetch_html(url)
+    if html is None:
+        return None, None
+    body_hash = hashlib.sha1(html.encode("utf-8")).hexdigest()
+    new_state = {"content_hash": body_hash}
+    if body_hash == _load_state().get(url, {}).get("content_hash"):
+        return None, new_state
+    return html, new_state
+
+def _outdated_rows(url: str, current: Set[str]) -> List[int]:
+    # Fragmenty poprzedniej wersji strony, których nie ma w bieżącej
+    index = get_index()
+    return [
+        i for i, m in enumerate(index.meta)
+        if m.get("source") == url and m.get("hash") not in current and i not in index.deleted
+    ]
+
+def _retire(url: str, current: Set[str]) -> int:
+    index = get_index()
+    rows = _outdated_rows(url, current)
+    hashes = {index.meta[i].get("hash") for i in rows}
+    removed = remove_documents(rows)
+    _hashes().difference_update(hashes)
+    return removed
+
+async def _flush(batch: List[str], metas: List[Dict]) -> int:
+    if not batch:
+        return 0
+    added = await asyncio.to_thread(add_documents, list(batch), list(metas))
+    _hashes().update(m["hash"] for m in metas)
+    batch.clear()
+    metas.clear()
+    return added
+
+async def ingest(urls: List[str]) -> int:
+    known = _hashes()
+    pending: Set[str] = set()
+    batch: List[str] = []
+    metas: List[Dict] = []
+    added = 0
+    seen_states: Dict[str, Dict] = {}
+    current: Dict[str, Set[str]] = {}
+    for url in urls:
+        html, page_state = await _fetch_changed(url)
+        if page_state is not None:
+            seen_states[url] = page_state
+        if html is None:
+            continue
+        text = await asyncio.to_thread(strip_boilerplate, html)
+        hashes = current[url] = set()
+        for i, chunk in enumerate(chunk_text(text)):
+            h = content_hash(chunk)
+            hashes.add(h)
+            if h in known or h in pending:
+                continue
+            pending.add(h)
+            batch.append(chunk)
+            metas.append({"source": url, "chunk": i, "hash": h})
+            if len(batch) >= INGEST_BATCH_SIZE:
+                added += await _flush(batch, metas)
+    added += await _flush(batch, metas)
+    # Stara treść zmienionych stron usuwana dopiero po dodaniu nowej — /ask nie zostaje bez fragmentów strony
+    for url, hashes in current.items():
+        await asyncio.to_thread(_retire, url, hashes)
+    # Stan stron zapisujemy dopiero po dodaniu wszystkich fragmentów do indeksu
+    _load_state().update(seen_states)
+    await asyncio.to_thread(_save_state)
+    return added
+
+async def run_ingestion_loop(urls: Optional[List[str]] = None, interval: float = INGEST_INTERVAL) -> None:
+    # Ingestuje tylko lider (jeden piszący do RAG_INDEX_DIR); pozostałe procesy wczytują jego segmenty
+    global _state, _known_hashes
+    urls = urls or INGEST_URLS
+    while True:
+        if not is_leader():
+            try:
+                if await asyncio.to_thread(reload_index):
+                    RAG_INDEX_RELOADS.inc(outcome="reloaded")
+                    # Lider zmienił indeks i stan stron — przeliczane od nowa, gdy ten proces przejmie ingestię
+                    _state, _known_hashes = None, None
+            except Exception:
+                # Zostajemy przy poprzednim indeksie; kolejna próba w następnym przebiegu
+                RAG_INDEX_RELOADS.inc(outcome="error")
+            await asyncio.sleep(min(interval, SHARED_LEASE_TTL / 3))
+            continue
+        try:
+            await ingest(urls)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        await asyncio.sleep(interval)
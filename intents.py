@@ -0,0 +1,135 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence
+
+from config import INTENT_NN_THRESHOLD
+from utils.text import normalize_text
+
+# Słowa kluczowe po normalizacji (małe litery, bez polskich znaków). Tematy słów zamiast
+# pełnych form, żeby łapać odmianę: "uczestni" → uczestnicy/uczestników/uczestniczy.
+INTENT_KEYWORDS: Dict[str, List[str]] = {
+    "participants": ["uczestni", "biora udzial", "bierze udzial", "participant", "contestant", "lista pianistow"],
+    "jury": ["jury", "juror", "sedziow", "sedzia", "komisja konkurs"],
+    "history": ["histor", "przeszle edycj", "poprzednie edycj", "archiw", "laureaci poprzednich"],
+    "winner": ["kto wygra", "zwyciez", "winner", "kto bedzie najlepszy", "faworyt", "kto ma szanse"],
+    "video": ["youtube", "wideo", "video", "film", "nagrani"],
+}
+# Kolejność jak w dawnym łańcuchu if-ów w ask(); "video" to tylko modyfikator odpowiedzi RAG
+INTENT_PRIORITY = ["participants", "jury", "history", "winner"]
+DEFAULT_INTENT = "rag"
+
+# Przykładowe pytania dla dopasowania najbliższego sąsiada (literówki, parafrazy)
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "participants": ["kto startuje w konkursie", "ucestnicy konkursu", "pokaz liste startujacych", "kto gra w konkursie"],
+    "jury": ["kto ocenia pianistow", "sklad jurry", "kto bedzie oceniac"],
+    "history": ["poprzednie konkursy", "jak bylo w 2022", "wczesniejsze edycje konkursu"],
+    "winner": ["kto wygrywa", "kto zdobedzie pierwsza nagrode", "typ na zwyciezce", "kto wygra konkurs"],
+}
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    score: float
+    keyword: Optional[str]
+    video: bool
+
+
+def normalize_query(query: str) -> str:
+    return normalize_text((query or "").lower().strip(), ascii_fallback=True)
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    # Słowa → trie → jedno wyrażenie z zagnieżdżonymi alternatywami (wspólne prefiksy raz);
+    # cały tekst skanowany jest jednym przebiegiem silnika re zamiast osobnego `in` na słowo.
+    trie: Dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node: Dict) -> str:
+        end = node.get("") is True
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            body = "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+def _trigrams(text: str) -> FrozenSet[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class IntentRouter:
+    def __init__(
+        self,
+        keywords: Dict[str, Sequence[str]] = INTENT_KEYWORDS,
+        priority: Sequence[str] = INTENT_PRIORITY,
+        examples: Optional[Dict[str, Sequence[str]]] = INTENT_EXAMPLES,
+        nn_threshold: float = INTENT_NN_THRESHOLD,
+    ):
+        self._intent_of: Dict[str, str] = {}
+        for intent, words in keywords.items():
+            for w in words:
+                self._intent_of[normalize_query(w)] = intent
+        self._pattern = re.compile(_trie_pattern(self._intent_of))
+        self._rank = {intent: i for i, intent in enumerate(priority)}
+        # Odwrócony indeks trigram → przykłady: liczymy tylko przykłady mające wspólny trigram
+        self._example_intents: List[str] = []
+        self._example_sizes: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+        for intent, qs in (examples or {}).items():
+            for q in qs:
+                grams = _trigrams(normalize_query(q))
+                idx = len(self._example_intents)
+                self._example_intents.append(intent)
+                self._example_sizes.append(len(grams))
+                for g in grams:
+                    self._postings.setdefault(g, []).append(idx)
+        self.nn_threshold = nn_threshold
+
+    def classify(self, query: str) -> IntentMatch:
+        q = normalize_query(query)
+        best: Optional[str] = None
+        best_kw: Optional[str] = None
+        video = False
+        for m in self._pattern.finditer(q):
+            kw = m.group(0)
+            intent = self._intent_of.get(kw)
+            if intent == "video":
+                video = True
+            elif intent in self._rank and (best is None or self._rank[intent] < self._rank[best]):
+                best, best_kw = intent, kw
+        if best is not None:
+            return IntentMatch(best, 1.0, best_kw, video)
+        intent, score = self.nearest(q)
+        if intent is not None and score >= self.nn_threshold:
+            return IntentMatch(intent, score, None, video)
+        return IntentMatch(DEFAULT_INTENT, 0.0, None, video)
+
+    def nearest(self, normalized_query: str):
+        # Podobieństwo Jaccarda trigramów znakowych do przykładowych pytań
+        grams = _trigrams(normalized_query)
+        overlap: Dict[int, int] = {}
+        postings = self._postings
+        for g in grams:
+            for idx in postings.get(g, ()):
+                overlap[idx] = overlap.get(idx, 0) + 1
+        best_intent, best_score = None, 0.0
+        for idx, inter in overlap.items():
+            score = inter / (len(grams) + self._example_sizes[idx] - inter)
+            if score > best_score:
+                best_intent, best_score = self._example_intents[idx], score
+        return best_intent, best_score
+
+
+_default_router: Optional[IntentRouter] = None
+
+def classify_intent(query: str) -> IntentMatch:
+    global _default_router
+    if _default_router is None:
+        _default_router = IntentRouter()
+    return _default_router.classify(query)
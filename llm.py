@@ -1,103 +1,222 @@
-from typing import Dict, List
-from config import LLM_PROVIDER, LLM_MODEL, anthropic_client, openai_client
-from utils.text import build_user_text, normalize_text, resolve_llm_model, safe_parse_llm_json
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-def llm_predict_winner(participants: List[Dict]) -> Dict:
+from cache import JsonFileStore, TTLCache
+from config import LLM_MODEL, LLM_PREDICTION_MAX_TOKENS, PREDICTION_CACHE_TTL, PREDICTION_CACHE_DIR
+from llm_providers import LLMProvider, complete_with_retries, get_provider, stream_with_retries
+from metrics import LLM_ASCII_RETRIES
+from prompts import PREDICTION_OUTPUT, build_prediction_prompt
+from shared_state import shared_store
+from utils.text import CandidateStreamParser, resolve_llm_model, safe_parse_llm_json
+
+PREDICTION_PROMPT = (
+    "Jesteś analitykiem konkursu pianistycznego Paderewski 2025. "
+    "Na podstawie listy uczestników i typowego programu (etudy, sonaty, Paderewski, recital z Herdzinem i Mozartem, finałowy koncert), "
+    "zaproponuj 3 kandydatów do zwycięstwa. "
+    "Zwróć JSON: {top_candidates: [{name, probability, rationale}], note}. "
+    "Prawdopodobieństwa w sumie ≤ 1. Używaj wyłącznie nazw z listy."
+)
+
+# Magazyn współdzielony przez procesy ma pierwszeństwo przed katalogiem JSON
+_prediction_cache = TTLCache(
+    "prediction",
+    store=shared_store("prediction") or (JsonFileStore(PREDICTION_CACHE_DIR) if PREDICTION_CACHE_DIR else None),
+)
+
+def prediction_cache_key(provider: str, model_id: str, prompt: str, names: List[str]) -> str:
+    names_hash = hashlib.sha256("\n".join(names).encode("utf-8")).hexdigest()
+    raw = json.dumps([provider, model_id, prompt, names_hash], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+async def llm_predict_winner(participants: List[Dict]) -> Dict:
     names = [p.get("name", "") for p in participants if p.get("name")]
     if not names:
         return {"prediction": None, "confidence": 0.0, "rationale": "Brak listy uczestników (nie udało się pobrać)."}
+    provider = get_provider()
+    if provider is None:
+        return _fallback_prediction(participants)
+
+    # Identyczne równoległe zapytania czekają na jedno wywołanie LLM (także strumieniowe); błędów nie cache'ujemy
+    key, loader, ttl, cache_if = _prediction_job(provider, names)
+    flight = _stream_flights.get(key)
+    if flight is not None:
+        return await asyncio.shield(flight.task)
+    return await _prediction_cache.get(key, loader, ttl, cache_if)
+
+async def prewarm_prediction(participants: List[Dict], horizon: float) -> bool:
+    # Odświeżenie z wyprzedzeniem: LLM wołany tylko, gdy wpisu dla tej listy brak
+    # albo wygaśnie w ciągu `horizon` sekund (zmiana listy = nowy klucz)
+    names = [p.get("name", "") for p in participants if p.get("name")]
+    provider = get_provider()
+    if not names or provider is None:
+        return bool(names)
+    key, loader, ttl, cache_if = _prediction_job(provider, names)
+    if await _prediction_cache.remaining(key, ttl) > horizon:
+        return True
+    return await _prediction_cache.refresh(key, loader, ttl, cache_if)
+
+def _prediction_job(provider: LLMProvider, names: List[str]):
+    model_id = resolve_llm_model(provider.name, LLM_MODEL)
+    key = prediction_cache_key(provider.name, model_id, PREDICTION_PROMPT, names)
+    return key, lambda: _predict_with_llm(provider, names, model_id), PREDICTION_CACHE_TTL, lambda r: bool(r.get("prediction"))
+
+def _prediction_from(data: Dict) -> Optional[Dict]:
+    top = data.get("top_candidates", [])
+    if not top:
+        return None
+    best = max(top, key=lambda x: float(x.get("probability", 0.0)))
+    return {
+        "prediction": best.get("name"),
+        "confidence": float(best.get("probability", 0.0)),
+        "rationale": (best.get("rationale") or "") + (" " + (data.get("note") or "")),
+        "top_candidates": top,
+    }
+
+SYSTEM_PROMPT = "Jesteś precyzyjnym analitykiem konkursowym, który zwraca ściśle sformatowany JSON."
+SYSTEM_PROMPT_ASCII = "You are a precise competition analyst that outputs strict JSON."
+
+def _invalid_prediction(data: Dict) -> Dict:
+    return {"prediction": None, "confidence": 0.0, "rationale": data.get("note", "Nieprawidłowy format odpowiedzi LLM (brak poprawnego JSON).")}
+
+def _llm_error(provider: LLMProvider, e: Exception) -> Dict:
+    return {"prediction": None, "confidence": 0.0, "rationale": f"Błąd LLM ({provider.label}): {e or type(e).__name__}"}
 
-    prompt = (
-        "Jesteś analitykiem konkursu pianistycznego Paderewski 2025. "
-        "Na podstawie listy uczestników i typowego programu (etudy, sonaty, Paderewski, recital z Herdzinem i Mozartem, finałowy koncert), "
-        "zaproponuj 3 kandydatów do zwycięstwa. "
-        "Zwróć JSON: {top_candidates: [{name, probability, rationale}], note}. "
-        "Prawdopodobieństwa w sumie ≤ 1. Używaj wyłącznie nazw z listy."
+def _prediction_call(names: List[str], ascii_fallback: bool = False) -> Dict:
+    # Argumenty complete/stream_with_retries: stała część promptu osobno (cache dostawcy),
+    # limit tokenów odpowiedzi i wymuszony schemat JSON
+    prompt = build_prediction_prompt(
+        SYSTEM_PROMPT_ASCII if ascii_fallback else SYSTEM_PROMPT, PREDICTION_PROMPT, names, ascii_fallback,
     )
+    return {
+        "system": prompt.system,
+        "prefix": prompt.prefix,
+        "user_text": prompt.body,
+        "max_tokens": LLM_PREDICTION_MAX_TOKENS,
+        "output": PREDICTION_OUTPUT,
+    }
 
-    model_id = resolve_llm_model(LLM_PROVIDER, LLM_MODEL)
+async def _predict_ascii(provider: LLMProvider, names: List[str], model_id: str) -> Tuple[Optional[Dict], Dict]:
+    # Retry z ASCII jeśli brak JSON (przy wymuszonym schemacie rzadkie)
+    result = await complete_with_retries(provider, model_id, **_prediction_call(names, ascii_fallback=True))
+    data = safe_parse_llm_json(result.text)
+    return _prediction_from(data), data
 
-    if LLM_PROVIDER == "anthropic" and anthropic_client:
-        try:
-            user_text = build_user_text(prompt, names, ascii_fallback=False)
-            resp = anthropic_client.messages.create(
-                model=model_id,
-                max_tokens=1024,
-                temperature=0.4,
-                system=normalize_text("Jesteś precyzyjnym analitykiem konkursowym, który zwraca ściśle sformatowany JSON."),
-                messages=[{"role": "user", "content": [{"type": "text", "text": user_text}]}],
-            )
-            content_text = ""
-            for block in (resp.content or []):
-                if getattr(block, "type", "") == "text":
-                    content_text += getattr(block, "text", "")
-            data = safe_parse_llm_json(content_text)
-            top = data.get("top_candidates", [])
-            if top:
-                best = max(top, key=lambda x: float(x.get("probability", 0.0)))
-                return {
-                    "prediction": best.get("name"),
-                    "confidence": float(best.get("probability", 0.0)),
-                    "rationale": (best.get("rationale") or "") + (" " + (data.get("note") or "")),
-                    "top_candidates": top,
-                }
-            # Retry z ASCII jeśli brak JSON
-            if not top:
-                user_text = build_user_text(prompt, names, ascii_fallback=True)
-                resp = anthropic_client.messages.create(
-                    model=model_id,
-                    max_tokens=1024,
-                    temperature=0.4,
-                    system=normalize_text("You are a precise competition analyst that outputs strict JSON.", ascii_fallback=True),
-                    messages=[{"role": "user", "content": [{"type": "text", "text": user_text}]}],
-                )
-                content_text = ""
-                for block in (resp.content or []):
-                    if getattr(block, "type", "") == "text":
-                        content_text += getattr(block, "text", "")
-                data = safe_parse_llm_json(content_text)
-                top = data.get("top_candidates", [])
-                if top:
-                    best = max(top, key=lambda x: float(x.get("probability", 0.0)))
-                    return {
-                        "prediction": best.get("name"),
-                        "confidence": float(best.get("probability", 0.0)),
-                        "rationale": (best.get("rationale") or "") + (" " + (data.get("note") or "")),
-                        "top_candidates": top,
-                    }
-            return {"prediction": None, "confidence": 0.0, "rationale": data.get("note", "Nieprawidłowy format odpowiedzi LLM (brak poprawnego JSON).")}
-        except Exception as e:
-            return {"prediction": None, "confidence": 0.0, "rationale": f"Błąd LLM (Anthropic): {e}"}
-
-    if LLM_PROVIDER == "openai" and openai_client:
+async def _predict_with_llm(provider: LLMProvider, names: List[str], model_id: str) -> Dict:
+    try:
+        result = await complete_with_retries(provider, model_id, **_prediction_call(names))
+        data = safe_parse_llm_json(result.text)
+        prediction = _prediction_from(data)
+        if prediction:
+            return prediction
+        if provider.ascii_retry:
+            LLM_ASCII_RETRIES.inc(provider=provider.name)
+            prediction, data = await _predict_ascii(provider, names, model_id)
+            if prediction:
+                return prediction
+        return _invalid_prediction(data)
+    except Exception as e:
+        return _llm_error(provider, e)
+
+# Jedno strumieniowe wywołanie LLM na klucz prognozy, rozsyłane do wszystkich klientów.
+# Zadanie czyta strumień dostawcy we własnym tempie i zapisuje zdarzenia; klient, który dołączy
+# później, dostaje najpierw dotychczasowe zdarzenia, potem kolejne na bieżąco. Rozłączenie klienta
+# nie przerywa wywołania — wynik i tak trafia do cache prognoz.
+class _StreamFlight:
+    def __init__(self, source: AsyncIterator[Tuple[str, Any]]):
+        self.events: List[Tuple[str, Any]] = []
+        self.done = False
+        self._changed = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self._run(source))
+
+    async def _run(self, source: AsyncIterator[Tuple[str, Any]]) -> Dict:
+        result: Dict = {}
         try:
-            user_text = build_user_text(prompt, names, ascii_fallback=False)
-            completion = openai_client.chat.completions.create(
-                model=model_id,
-                messages=[
-                    {"role": "system", "content": normalize_text("Jesteś precyzyjnym analitykiem konkursowym, który zwraca ściśle sformatowany JSON.")},
-                    {"role": "user", "content": user_text},
-                ],
-                temperature=0.4,
-            )
-            data = safe_parse_llm_json(completion.choices[0].message.content)
-            top = data.get("top_candidates", [])
-            if top:
-                best = max(top, key=lambda x: float(x.get("probability", 0.0)))
-                return {
-                    "prediction": best.get("name"),
-                    "confidence": float(best.get("probability", 0.0)),
-                    "rationale": (best.get("rationale") or "") + (" " + (data.get("note") or "")),
-                    "top_candidates": top,
-                }
-            return {"prediction": None, "confidence": 0.0, "rationale": data.get("note", "Nieprawidłowy format odpowiedzi LLM (brak poprawnego JSON).")}
-        except Exception as e:
-            return {"prediction": None, "confidence": 0.0, "rationale": f"Błąd LLM (OpenAI): {e}"}
+            async for event, data in source:
+                self.events.append((event, data))
+                if event == "result":
+                    result = data
+                self._changed.set()
+                self._changed = asyncio.Event()
+        finally:
+            self.done = True
+            self._changed.set()
+        return result
+
+    async def subscribe(self) -> AsyncIterator[Tuple[str, Any]]:
+        i = 0
+        while True:
+            while i < len(self.events):
+                yield self.events[i]
+                i += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+_stream_flights: Dict[str, _StreamFlight] = {}
+
+def _start_stream_flight(key: str, provider: LLMProvider, names: List[str], model_id: str) -> _StreamFlight:
+    flight = _StreamFlight(_stream_prediction(key, provider, names, model_id))
+    _stream_flights[key] = flight
+    flight.task.add_done_callback(lambda t: _stream_flights.pop(key, None) if _stream_flights.get(key) is flight else None)
+    return flight
+
+async def llm_predict_winner_stream(participants: List[Dict]) -> AsyncIterator[Tuple[str, Any]]:
+    # Zdarzenia: ("token", tekst), ("candidate", dict) dla każdego domkniętego kandydata, na końcu ("result", dict)
+    names = [p.get("name", "") for p in participants if p.get("name")]
+    provider = get_provider()
+    if not names or provider is None:
+        yield "result", await llm_predict_winner(participants)
+        return
+
+    model_id = resolve_llm_model(provider.name, LLM_MODEL)
+    key = prediction_cache_key(provider.name, model_id, PREDICTION_PROMPT, names)
+    cached = await _prediction_cache.lookup(key, PREDICTION_CACHE_TTL)
+    flight = _stream_flights.get(key)
+    if cached is None and flight is None and _prediction_cache.in_flight(key):
+        # Ktoś już pyta LLM o to samo bez strumienia — dołączamy zamiast wołać drugi raz
+        cached = await llm_predict_winner(participants)
+    if cached is not None:
+        for candidate in cached.get("top_candidates") or []:
+            yield "candidate", candidate
+        yield "result", cached
+        return
+
+    if flight is None:
+        flight = _start_stream_flight(key, provider, names, model_id)
+    async for event in flight.subscribe():
+        yield event
+
+async def _stream_prediction(key: str, provider: LLMProvider, names: List[str], model_id: str) -> AsyncIterator[Tuple[str, Any]]:
+    parser = CandidateStreamParser()
+    try:
+        async for text in stream_with_retries(provider, model_id, **_prediction_call(names)):
+            yield "token", text
+            for candidate in parser.feed(text):
+                yield "candidate", candidate
+        data = safe_parse_llm_json(parser.text)
+        prediction = _prediction_from(data)
+        if not prediction and provider.ascii_retry:
+            LLM_ASCII_RETRIES.inc(provider=provider.name)
+            prediction, data = await _predict_ascii(provider, names, model_id)
+            if prediction:
+                for candidate in prediction["top_candidates"]:
+                    yield "candidate", candidate
+    except Exception as e:
+        yield "result", _llm_error(provider, e)
+        return
+    if prediction:
+        await _prediction_cache.set(key, prediction, PREDICTION_CACHE_TTL)
+        yield "result", prediction
+    else:
+        yield "result", _invalid_prediction(data)
 
+def _fallback_prediction(participants: List[Dict]) -> Dict:
     import random
     candidate = random.choice(participants) if participants else {}
     return {
         "prediction": candidate.get("name"),
         "confidence": 0.15 if candidate else 0.0,
         "rationale": "Fallback bez LLM (losowy wybór z listy uczestników)." if candidate else "Brak uczestników do predykcji."
-    }
\ No newline at end of file
+    }
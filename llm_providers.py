@@ -0,0 +1,399 @@
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Union
+
+from config import (
+    LLM_PROVIDER, get_anthropic_client, get_openai_client,
+    LLM_TIMEOUT, LLM_DEADLINE, LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_MAX_CONCURRENCY,
+    LLM_PROMPT_CACHE, LLM_RECENT_CALLS,
+)
+from metrics import LLM_FIRST_TOKEN_SECONDS, LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_TOKENS
+from prompts import StructuredOutput
+
+# Statusy HTTP, po których warto ponowić (limit, przeciążenie, chwilowe błędy serwera)
+TRANSIENT_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+TRANSIENT_ERRORS = frozenset({"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError", "OverloadedError"})
+
+EPHEMERAL = {"type": "ephemeral"}
+
+
+# input_tokens: tokeny wejścia policzone normalnie (Anthropic: bez odczytów z cache;
+# OpenAI: prompt_tokens, w tym z cache), cache_read/cache_write: tokeny z cache / zapisane do cache
+class LLMResult:
+    __slots__ = ("text", "input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+
+    def __init__(self, text: str, input_tokens: int = 0, output_tokens: int = 0,
+                 cache_read_tokens: int = 0, cache_write_tokens: int = 0):
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_read_tokens = cache_read_tokens
+        self.cache_write_tokens = cache_write_tokens
+
+
+# Dostawca dostaje prompt w częściach: `system` i `prefix` (stała instrukcja) mogą być
+# cache'owane po stronie dostawcy, `user_text` jest zmienny. `output` wymusza format JSON.
+# stream() zwraca fragmenty tekstu, a na końcu może oddać LLMResult z samym zużyciem tokenów
+# (stream_with_retries go przechwytuje i nie przekazuje dalej).
+class LLMProvider:
+    name = "base"
+    label = "LLM"
+    # Ponowienie z tekstem ASCII, gdy model nie zwrócił poprawnego JSON
+    ascii_retry = False
+
+    async def complete(self, model: str, system: str, user_text: str, max_tokens: int, temperature: float,
+                       prefix: str = "", output: Optional[StructuredOutput] = None) -> LLMResult:
+        raise NotImplementedError
+
+    async def stream(self, model: str, system: str, user_text: str, max_tokens: int, temperature: float,
+                     prefix: str = "", output: Optional[StructuredOutput] = None) -> AsyncIterator[Union[str, LLMResult]]:
+        # Domyślnie bez strumieniowania: cała odpowiedź jako jeden fragment
+        result = await self.complete(model, system, user_text, max_tokens, temperature, prefix, output)
+        yield result.text
+        yield LLMResult("", result.input_tokens, result.output_tokens, result.cache_read_tokens, result.cache_write_tokens)
+
+
+def _anthropic_usage(text: str, usage) -> LLMResult:
+    return LLMResult(
+        text,
+        getattr(usage, "input_tokens", 0) or 0,
+        getattr(usage, "output_tokens", 0) or 0,
+        getattr(usage, "cache_read_input_tokens", 0) or 0,
+        getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    )
+
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+    label = "Anthropic"
+    ascii_retry = True
+
+    def __init__(self, client, prompt_cache: bool = LLM_PROMPT_CACHE):
+        self.client = client
+        self.prompt_cache = prompt_cache
+
+    def _request(self, model, system, user_text, max_tokens, temperature, prefix, output) -> Dict:
+        # Kolejność prefiksu cache: narzędzia → system → wiadomości. Znacznik na ostatnim stałym
+        # bloku (instrukcja albo system) obejmuje schemat narzędzia, system i instrukcję.
+        # Krótszy prefiks niż minimum dostawcy (ok. 1024 tokenów) jest po prostu pomijany — znacznik nic nie kosztuje.
+        system_block = {"type": "text", "text": system}
+        content = []
+        if prefix:
+            content.append({"type": "text", "text": prefix})
+        content.append({"type": "text", "text": user_text})
+        if self.prompt_cache:
+            (content[0] if prefix else system_block)["cache_control"] = EPHEMERAL
+        req = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "system": [system_block],
+            "messages": [{"role": "user", "content": content}],
+        }
+        if output is not None:
+            req["tools"] = [{"name": output.name, "description": output.description, "input_schema": output.schema}]
+            req["tool_choice"] = {"type": "tool", "name": output.name}
+        return req
+
+    async def complete(self, model, system, user_text, max_tokens, temperature, prefix="", output=None) -> LLMResult:
+        resp = await self.client.messages.create(**self._request(model, system, user_text, max_tokens, temperature, prefix, output))
+        text = ""
+        for block in resp.content or []:
+            kind = getattr(block, "type", "")
+            if kind == "tool_use":
+                # Argumenty wywołania narzędzia to już obiekt zgodny ze schematem
+                text = json.dumps(getattr(block, "input", {}) or {}, ensure_ascii=False)
+                break
+            if kind == "text":
+                text += getattr(block, "text", "")
+        return _anthropic_usage(text, getattr(resp, "usage", None))
+
+    async def stream(self, model, system, user_text, max_tokens, temperature, prefix="", output=None):
+        async with self.client.messages.stream(
+            **self._request(model, system, user_text, max_tokens, temperature, prefix, output)
+        ) as s:
+            async for event in s:
+                if getattr(event, "type", "") != "content_block_delta":
+                    continue
+                delta = event.delta
+                if delta.type == "text_delta":
+                    yield delta.text
+                elif delta.type == "input_json_delta":
+                    yield delta.partial_json
+            final = await s.get_final_message()
+        yield _anthropic_usage("", getattr(final, "usage", None))
+
+
+def _openai_usage(text: str, usage) -> LLMResult:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return LLMResult(
+        text,
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+        getattr(details, "cached_tokens", 0) or 0,
+    )
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+    label = "OpenAI"
+
+    def __init__(self, client):
+        self.client = client
+
+    def _request(self, model, system, user_text, max_tokens, temperature, prefix, output) -> Dict:
+        # OpenAI cache'uje najdłuższy wspólny prefiks sam — wystarczy, że stała część idzie pierwsza
+        req = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": f"{prefix}\n\n{user_text}" if prefix else user_text},
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if output is not None:
+            req["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": output.name, "schema": output.schema, "strict": True},
+            }
+        return req
+
+    async def complete(self, model, system, user_text, max_tokens, temperature, prefix="", output=None) -> LLMResult:
+        completion = await self.client.chat.completions.create(
+            **self._request(model, system, user_text, max_tokens, temperature, prefix, output)
+        )
+        return _openai_usage(completion.choices[0].message.content or "", getattr(completion, "usage", None))
+
+    async def stream(self, model, system, user_text, max_tokens, temperature, prefix="", output=None):
+        chunks = await self.client.chat.completions.create(
+            **self._request(model, system, user_text, max_tokens, temperature, prefix, output),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        usage = None
+        async for chunk in chunks:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+        if usage is not None:
+            yield _openai_usage("", usage)
+
+
+class FakeProvider(LLMProvider):
+    # Dostawca do testów i benchmarków: stałe odpowiedzi (lub funkcja), opcjonalne opóźnienie i błędy
+    name = "fake"
+    label = "Fake"
+
+    def __init__(
+        self,
+        responses: Union[str, List[str], Callable[[str, str], str]] = "{}",
+        delay: float = 0.0,
+        errors: Optional[List[BaseException]] = None,
+        ascii_retry: bool = True,
+        chunk_size: int = 16,
+        chunk_delay: float = 0.0,
+    ):
+        self.responses = responses
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.errors = list(errors or [])
+        self.ascii_retry = ascii_retry
+        self.calls: List[dict] = []
+
+    async def complete(self, model, system, user_text, max_tokens, temperature, prefix="", output=None) -> LLMResult:
+        # Drugie i kolejne wywołanie z tym samym prefiksem liczone jak odczyt z cache
+        cached = any(c["system"] == system and c["prefix"] == prefix for c in self.calls)
+        self.calls.append({"model": model, "system": system, "prefix": prefix, "user_text": user_text, "output": output})
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        if callable(self.responses):
+            text = self.responses(system, f"{prefix}\n\n{user_text}" if prefix else user_text)
+        elif isinstance(self.responses, list):
+            text = self.responses[min(len(self.calls), len(self.responses)) - 1]
+        else:
+            text = self.responses
+        static = (len(system) + len(prefix)) // 4
+        return LLMResult(
+            text, len(user_text) // 4 + (0 if cached else static), len(text) // 4,
+            static if cached else 0, 0 if cached else static,
+        )
+
+    async def stream(self, model, system, user_text, max_tokens, temperature, prefix="", output=None):
+        result = await self.complete(model, system, user_text, max_tokens, temperature, prefix, output)
+        for i in range(0, len(result.text), self.chunk_size):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield result.text[i:i + self.chunk_size]
+        yield LLMResult("", result.input_tokens, result.output_tokens, result.cache_read_tokens, result.cache_write_tokens)
+
+
+def is_transient(e: BaseException) -> bool:
+    if isinstance(e, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if getattr(e, "status_code", None) in TRANSIENT_STATUS:
+        return True
+    return type(e).__name__ in TRANSIENT_ERRORS
+
+
+_provider: Optional[LLMProvider] = None
+_provider_resolved = False
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_provider() -> Optional[LLMProvider]:
+    global _provider, _provider_resolved
+    if not _provider_resolved:
+        # Klient (i import SDK) dopiero tutaj — przy pierwszym wywołaniu LLM albo w rozgrzewce
+        if LLM_PROVIDER == "anthropic" and get_anthropic_client():
+            _provider = AnthropicProvider(get_anthropic_client())
+        elif LLM_PROVIDER == "openai" and get_openai_client():
+            _provider = OpenAIProvider(get_openai_client())
+        _provider_resolved = True
+    return _provider
+
+def set_provider(provider: Optional[LLMProvider]) -> None:
+    global _provider, _provider_resolved
+    _provider = provider
+    _provider_resolved = True
+
+def _outcome(e: BaseException) -> str:
+    return "timeout" if isinstance(e, (asyncio.TimeoutError, TimeoutError)) else "error"
+
+# Ostatnie wywołania (zużycie tokenów, trafienia w cache promptu) dla /debug_llm
+_recent: Deque[Dict] = deque(maxlen=max(1, LLM_RECENT_CALLS))
+
+def _record_usage(provider: LLMProvider, model: str, result: LLMResult, mode: str = "complete") -> None:
+    LLM_TOKENS.inc(result.input_tokens, provider=provider.name, model=model, direction="input")
+    LLM_TOKENS.inc(result.output_tokens, provider=provider.name, model=model, direction="output")
+    LLM_TOKENS.inc(result.cache_read_tokens, provider=provider.name, model=model, direction="cache_read")
+    LLM_TOKENS.inc(result.cache_write_tokens, provider=provider.name, model=model, direction="cache_write")
+    _recent.append({
+        "at": round(time.time(), 3),
+        "provider": provider.name,
+        "model": model,
+        "mode": mode,
+        "input_tokens": result.input_tokens,
+        "output_tokens": result.output_tokens,
+        "cache_read_tokens": result.cache_read_tokens,
+        "cache_write_tokens": result.cache_write_tokens,
+    })
+
+def recent_calls() -> List[Dict]:
+    return list(_recent)
+
+def _llm_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+async def complete_with_retries(
+    provider: LLMProvider,
+    model: str,
+    system: str,
+    user_text: str,
+    max_tokens: int = 1024,
+    temperature: float = 0.4,
+    prefix: str = "",
+    output: Optional[StructuredOutput] = None,
+) -> LLMResult:
+    # Termin obejmuje wszystkie próby; między próbami backoff z pełnym jitterem (bez trzymania semafora)
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + LLM_DEADLINE
+    attempt = 0
+    while True:
+        remaining = deadline_at - loop.time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError("Przekroczono termin wywołania LLM")
+        try:
+            async with _llm_semaphore():
+                start = time.perf_counter()
+                try:
+                    result = await asyncio.wait_for(
+                        provider.complete(model, system, user_text, max_tokens, temperature, prefix, output),
+                        timeout=min(LLM_TIMEOUT, remaining),
+                    )
+                except Exception as e:
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=provider.name, model=model, mode="complete", outcome=_outcome(e))
+                    raise
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=provider.name, model=model, mode="complete", outcome="ok")
+                _record_usage(provider, model, result)
+                return result
+        except Exception as e:
+            if attempt >= LLM_MAX_RETRIES or not is_transient(e):
+                raise
+            LLM_RETRIES.inc(provider=provider.name)
+            delay = random.uniform(0, LLM_RETRY_BASE_DELAY * (2 ** attempt))
+            attempt += 1
+            if loop.time() + delay >= deadline_at:
+                raise
+            await asyncio.sleep(delay)
+
+async def stream_with_retries(
+    provider: LLMProvider,
+    model: str,
+    system: str,
+    user_text: str,
+    max_tokens: int = 1024,
+    temperature: float = 0.4,
+    prefix: str = "",
+    output: Optional[StructuredOutput] = None,
+) -> AsyncIterator[str]:
+    # Ponawiamy tylko zanim dotarł pierwszy fragment — potem klient już coś wyświetlił.
+    # Termin obejmuje tylko odczyty z dostawcy (wait_for na kolejny fragment), nigdy kod
+    # konsumenta między fragmentami — anulowanie nie trafi w zapis SSE ani inny kod wołającego.
+    # Semafor trzymany przez cały strumień: otwarte połączenie to trwające wywołanie dostawcy,
+    # zwolnienie między fragmentami pozwoliłoby otworzyć więcej strumieni niż LLM_MAX_CONCURRENCY.
+    # Dlatego konsument powinien czytać bez zwłoki (llm.py czyta w osobnym zadaniu, nie w tempie klienta).
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + LLM_DEADLINE
+    attempt = 0
+    while True:
+        started = False
+        outcome = "error"
+        try:
+            async with _llm_semaphore():
+                start = time.perf_counter()
+                chunks = provider.stream(model, system, user_text, max_tokens, temperature, prefix, output).__aiter__()
+                try:
+                    while True:
+                        remaining = deadline_at - loop.time()
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError("Przekroczono termin wywołania LLM")
+                        try:
+                            text = await asyncio.wait_for(anext(chunks), timeout=remaining)
+                        except StopAsyncIteration:
+                            break
+                        if isinstance(text, LLMResult):
+                            _record_usage(provider, model, text, mode="stream")
+                            continue
+                        if not started:
+                            LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start, provider=provider.name, model=model)
+                        started = True
+                        yield text
+                    outcome = "ok"
+                except Exception as e:
+                    outcome = _outcome(e)
+                    raise
+                finally:
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=provider.name, model=model, mode="stream", outcome=outcome)
+                    aclose = getattr(chunks, "aclose", None)
+                    if aclose is not None:
+                        await aclose()
+            return
+        except Exception as e:
+            if started or attempt >= LLM_MAX_RETRIES or not is_transient(e):
+                raise
+            LLM_RETRIES.inc(provider=provider.name)
+            delay = random.uniform(0, LLM_RETRY_BASE_DELAY * (2 ** attempt))
+            attempt += 1
+            if loop.time() + delay >= deadline_at:
+                raise
+            await asyncio.sleep(delay)
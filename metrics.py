@@ -0,0 +1,238 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Minimalny rejestr metryk w formacie tekstowym Prometheusa (bez zależności zewnętrznych).
+# Liczniki i histogramy z etykietami; bezpieczne wątkowo, bo część pracy idzie przez to_thread.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: LabelKey, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_num(v)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # klucz -> [liczniki kubełków (bez +Inf), suma, liczba]
+        self._series: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[Dict[str, str]]:
+        # Etykiety można uzupełnić w bloku (np. status znany dopiero po wywołaniu)
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (counts, total, n) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, c in zip(self.buckets, counts):
+                    cumulative += c
+                    le = 'le="%s"' % _num(bound)
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                inf = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, inf)} {n}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.setdefault(metric.name, metric)
+        return self._metrics[metric.name]
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- metryki aplikacji ------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "app_http_request_seconds", "Czas obsługi żądania (do wysłania całej odpowiedzi)", ["method", "route", "status"],
+)
+UPSTREAM_FETCH_SECONDS = REGISTRY.histogram(
+    "app_upstream_fetch_seconds", "Pobrania stron i API zewnętrznych", ["host", "status"],
+)
+HTTP_CACHE_REQUESTS = REGISTRY.counter(
+    "app_http_cache_requests_total", "Trwały cache stron: miss, not_modified (304), modified, stale_on_error", ["result"],
+)
+HTML_PARSE_SECONDS = REGISTRY.histogram(
+    "app_html_parse_seconds", "Budowa drzewa BeautifulSoup", ["parser"],
+)
+EXTRACT_NAMES_SECONDS = REGISTRY.histogram(
+    "app_extract_names_seconds", "Wyciąganie nazwisk z tekstu strony",
+)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "app_llm_request_seconds", "Pojedyncze wywołanie LLM (próba)", ["provider", "model", "mode", "outcome"], buckets=LLM_BUCKETS,
+)
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "app_llm_first_token_seconds", "Czas do pierwszego fragmentu strumienia LLM", ["provider", "model"], buckets=LLM_BUCKETS,
+)
+LLM_TOKENS = REGISTRY.counter(
+    "app_llm_tokens_total", "Tokeny zużyte przez LLM (direction: input, output, cache_read, cache_write)", ["provider", "model", "direction"],
+)
+LLM_RETRIES = REGISTRY.counter(
+    "app_llm_retries_total", "Ponowienia wywołań LLM po błędzie przejściowym", ["provider"],
+)
+LLM_ASCII_RETRIES = REGISTRY.counter(
+    "app_llm_ascii_retries_total", "Ponowienia z promptem ASCII po odpowiedzi bez poprawnego JSON", ["provider"],
+)
+RAG_INDEX_RELOADS = REGISTRY.counter(
+    "app_rag_index_reloads_total", "Wczytania indeksu RAG zapisanego przez lidera (reloaded, error)", ["outcome"],
+)
+RAG_RETRIEVAL_SECONDS = REGISTRY.histogram(
+    "app_rag_retrieval_seconds", "Wyszukiwanie w indeksie RAG", ["mode"],
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "app_cache_requests_total", "Odczyty cache (hit, stale, miss)", ["cache", "result"],
+)
+YOUTUBE_REQUESTS = REGISTRY.counter(
+    "app_youtube_requests_total", "Wywołania YouTube search.list wg statusu (quota_local = zablokowane lokalnie)", ["status"],
+)
+YOUTUBE_QUOTA_UNITS = REGISTRY.counter(
+    "app_youtube_quota_units_total", "Zużyte jednostki limitu YouTube API",
+)
+RESPONSE_SNAPSHOTS = REGISTRY.counter(
+    "app_response_snapshots_total", "Gotowe odpowiedzi: rebuild, not_modified (304), identity, gzip, br", ["snapshot", "result"],
+)
+WARMUP_SECONDS = REGISTRY.histogram(
+    "app_warmup_seconds", "Rozgrzewka po starcie: tworzenie klientów, indeksu RAG i parsera", ["component", "outcome"],
+)
+ANSWER_CACHE = REGISTRY.counter(
+    "app_answer_cache_total", "Cache odpowiedzi /ask: exact, similar (parafraza), miss, stale (zmiana źródeł), skip", ["result"],
+)
+SHARED_LOADS = REGISTRY.counter(
+    "app_shared_loads_total", "Ładowania przy stanie współdzielonym: claimed (ten proces), peer (wynik innego), timeout", ["cache", "result"],
+)
+SCHEDULER_RUNS = REGISTRY.counter(
+    "app_scheduler_runs_total", "Przebiegi zadań harmonogramu", ["job", "outcome"],
+)
+
+
+# Middleware ASGI: czas całej odpowiedzi (także strumieni SSE) per szablon ścieżki,
+# żeby parametry w URL nie mnożyły serii
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "<unmatched>"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method=scope.get("method", ""), route=path, status=str(status["code"]),
+            )
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
\ No newline at end of file
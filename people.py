@@ -0,0 +1,210 @@
+import hashlib
+import json
+import re
+import unicodedata
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from config import PEOPLE_CHANGELOG_MAX
+from utils.text import normalize_text
+
+
+def person_key(text: str) -> str:
+    # Klucz wyszukiwania: bez wielkości liter i znaków diakrytycznych (także spoza polskiego alfabetu)
+    folded = unicodedata.normalize("NFKD", normalize_text(text or "", ascii_fallback=True))
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return " ".join(folded.lower().replace(".", " ").split())
+
+
+# Funkcje w jury (tekst bez polskich znaków) -> nazwa kanoniczna; formy żeńskie, mnogie
+# i angielskie sprowadzane do jednej. Kolejność ma znaczenie: "wice…" przed "przewodnicząc…".
+ROLE_PATTERNS: Tuple[Tuple[str, str], ...] = (
+    (r"wice-?\s?przewodniczac\w*|vice[- ]?(?:chair\w*|president)", "wiceprzewodniczący"),
+    (r"przewodniczac\w*|chair(?:man|woman|person)?|president", "przewodniczący"),
+    (r"sekretarz\w*|secretary", "sekretarz"),
+    (r"czlon(?:ek|kini|kowie|kinie)\w*|members?", "członek"),
+)
+ROLE_RE = re.compile("|".join(f"\\b(?:{p})\\b" for p, _ in ROLE_PATTERNS), re.IGNORECASE)
+_ROLE_RES = tuple((re.compile(f"^(?:{p})$", re.IGNORECASE), role) for p, role in ROLE_PATTERNS)
+
+# Kraj -> klucz kanoniczny (polska nazwa po person_key): strony podają nazwy po polsku,
+# klienci API często po angielsku — "Poland" i "Polska" trafiają w ten sam wpis indeksu
+COUNTRY_ALIASES: Dict[str, str] = {
+    "poland": "polska", "japan": "japonia", "china": "chiny", "south korea": "korea pld",
+    "korea": "korea pld", "republic of korea": "korea pld", "korea poludniowa": "korea pld",
+    "usa": "usa", "united states": "usa", "stany zjednoczone": "usa", "us": "usa",
+    "germany": "niemcy", "france": "francja", "italy": "wlochy", "ukraine": "ukraina",
+    "russia": "rosja", "canada": "kanada", "united kingdom": "wielka brytania", "uk": "wielka brytania",
+    "great britain": "wielka brytania", "spain": "hiszpania", "czech republic": "czechy", "czechia": "czechy",
+    "hungary": "wegry", "switzerland": "szwajcaria", "lithuania": "litwa", "latvia": "lotwa",
+    "slovakia": "slowacja", "israel": "izrael", "taiwan": "tajwan", "vietnam": "wietnam",
+    "kazakhstan": "kazachstan", "georgia": "gruzja", "belarus": "bialorus", "norway": "norwegia",
+    "sweden": "szwecja", "finland": "finlandia", "denmark": "dania", "netherlands": "holandia",
+    "belgium": "belgia", "brazil": "brazylia", "argentina": "argentyna", "mexico": "meksyk",
+    "new zealand": "nowa zelandia", "turkey": "turcja", "romania": "rumunia", "bulgaria": "bulgaria",
+    "croatia": "chorwacja", "slovenia": "slowenia", "greece": "grecja", "ireland": "irlandia",
+    "singapore": "singapur", "india": "indie", "hong kong": "hongkong", "hongkong": "hongkong",
+}
+
+
+def canonical_role(text: str) -> Optional[str]:
+    # Pierwsza rozpoznana funkcja w tekście ("Anna Nowak — przewodnicząca jury" -> "przewodniczący")
+    m = ROLE_RE.search(normalize_text(text or "", ascii_fallback=True))
+    if m is None:
+        return None
+    for pattern, role in _ROLE_RES:
+        if pattern.match(m.group(0)):
+            return role
+    return None
+
+def role_key(role: str) -> str:
+    return person_key(canonical_role(role) or role)
+
+def country_key(country: str) -> str:
+    key = person_key(country)
+    return COUNTRY_ALIASES.get(key, key)
+
+def content_version(people: Iterable["Person"]) -> str:
+    # Wersja listy = skrót jej treści (niezależny od kolejności): ta sama lista daje tę samą
+    # wersję w każdym procesie, więc `since` z jednego workera jest ważne w innym
+    digest = hashlib.sha256()
+    for fields in sorted(p.fields() for p in people):
+        digest.update(json.dumps(fields, ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()[:16]
+
+
+class Person:
+    __slots__ = ("name", "country", "bio", "role", "key")
+
+    def __init__(self, name: str, country: str = "", bio: str = "", role: Optional[str] = None):
+        self.name = name
+        self.country = country or ""
+        self.bio = bio or ""
+        self.role = role
+        self.key = person_key(name)
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Person":
+        return cls(d.get("name", ""), d.get("country", ""), d.get("bio", ""), d.get("role"))
+
+    def fields(self) -> Tuple:
+        return (self.name, self.country, self.bio, self.role or "")
+
+    def to_dict(self, with_role: bool = False) -> Dict:
+        d = {"name": self.name, "country": self.country, "bio": self.bio}
+        if with_role:
+            d["role"] = self.role
+        return d
+
+
+# Magazyn osób (uczestnicy albo jury) przebudowywany raz na odświeżenie listy.
+# Indeksy: pełne imię i nazwisko, pojedyncze człony nazwiska, kraj, rola — wszystko po person_key.
+# Każda zmiana listy daje nową wersję (skrót treści) i trafia do ograniczonego dziennika zmian,
+# więc klient może pobrać tylko różnice od swojej ostatniej wersji. Dziennik jest lokalny
+# dla procesu: wersja, której ten proces nie widział, dostaje pełną listę.
+class PeopleStore:
+    def __init__(self, kind: str, with_role: bool = False, changelog_max: int = PEOPLE_CHANGELOG_MAX):
+        self.kind = kind
+        self.with_role = with_role
+        self.version = content_version(())
+        self._people: List[Person] = []
+        self._by_key: Dict[str, Person] = {}
+        self._by_token: Dict[str, List[Person]] = {}
+        self._by_country: Dict[str, List[Person]] = {}
+        self._by_role: Dict[str, List[Person]] = {}
+        self._dicts: List[Dict] = []
+        self._source: Optional[List[Dict]] = None
+        # Lokalny numer kolejny zmiany i numer, od którego obowiązuje dana wersja
+        self._seq = 0
+        self._seq_of: Dict[str, int] = {}
+        # (numer, wersja, operacja, osoba jako dict)
+        self._changelog: Deque[Tuple[int, str, str, Dict]] = deque(maxlen=changelog_max)
+        # Najstarszy numer, od którego dziennik zawiera komplet zmian
+        self._min_seq = 1
+
+    def __len__(self) -> int:
+        return len(self._people)
+
+    def sync(self, records: List[Dict]) -> bool:
+        # Wołane przy każdym odczycie: ta sama lista z cache = nic do zrobienia
+        if records is self._source:
+            return False
+        self._source = records
+        return self.replace(Person.from_dict(r) for r in records if r.get("name"))
+
+    def replace(self, people: Iterable[Person]) -> bool:
+        new_by_key: Dict[str, Person] = {}
+        for p in people:
+            new_by_key.setdefault(p.key, p)
+        changes: List[Tuple[str, Person]] = []
+        for key, p in new_by_key.items():
+            old = self._by_key.get(key)
+            if old is None:
+                changes.append(("add", p))
+            elif old.fields() != p.fields():
+                changes.append(("update", p))
+        changes.extend(("remove", old) for key, old in self._by_key.items() if key not in new_by_key)
+        if not changes:
+            return False
+        self._seq_of[self.version] = self._seq
+        self._seq += 1
+        self.version = content_version(new_by_key.values())
+        for op, p in changes:
+            if len(self._changelog) == self._changelog.maxlen:
+                # Wypada wpis tej zmiany — klienci sprzed niej dostaną pełną listę
+                self._min_seq = max(self._min_seq, self._changelog[0][0] + 1)
+            self._changelog.append((self._seq, self.version, op, p.to_dict(self.with_role)))
+        self._seq_of = {v: n for v, n in self._seq_of.items() if n >= self._min_seq - 1}
+        self._rebuild(list(new_by_key.values()))
+        return True
+
+    def _rebuild(self, people: List[Person]) -> None:
+        by_token: Dict[str, List[Person]] = {}
+        by_country: Dict[str, List[Person]] = {}
+        by_role: Dict[str, List[Person]] = {}
+        for p in people:
+            for token in set(p.key.split()):
+                by_token.setdefault(token, []).append(p)
+            if p.country:
+                by_country.setdefault(country_key(p.country), []).append(p)
+            if p.role:
+                by_role.setdefault(role_key(p.role), []).append(p)
+        # Podmiana całych struktur naraz — czytelnicy widzą stary albo nowy stan, nigdy mieszany
+        self._people = people
+        self._by_key = {p.key: p for p in people}
+        self._by_token, self._by_country, self._by_role = by_token, by_country, by_role
+        self._dicts = [p.to_dict(self.with_role) for p in people]
+
+    def all(self) -> List[Dict]:
+        return self._dicts
+
+    def get(self, name: str) -> Optional[Person]:
+        return self._by_key.get(person_key(name))
+
+    def find(self, name: str) -> List[Person]:
+        # Pełne imię i nazwisko albo pojedynczy człon ("Kowalski")
+        key = person_key(name)
+        exact = self._by_key.get(key)
+        if exact is not None:
+            return [exact]
+        return list(self._by_token.get(key, ()))
+
+    def by_country(self, country: str) -> List[Person]:
+        # Nazwa polska albo angielska ("Polska", "Poland"), bez znaczenia wielkość liter i diakrytyki
+        return list(self._by_country.get(country_key(country), ()))
+
+    def by_role(self, role: str) -> List[Person]:
+        # Dowolna forma funkcji: "przewodnicząca", "przewodniczacy", "chair"
+        return list(self._by_role.get(role_key(role), ()))
+
+    def changes_since(self, version: str) -> Dict:
+        if version == self.version:
+            return {"version": self.version, "full": False, "changes": []}
+        # Klient startuje od zera, dziennik nie sięga tak daleko albo tej wersji nie widział
+        # ten proces (inny worker, poprzedni start) — pełna lista
+        seq = self._seq_of.get(version)
+        if seq is None or seq < self._min_seq - 1:
+            return {"version": self.version, "full": True, "people": self._dicts}
+        changes = [{"version": v, "op": op, "person": d} for n, v, op, d in self._changelog if n > seq]
+        return {"version": self.version, "full": False, "changes": changes}
@@ -0,0 +1,85 @@
+import math
+from typing import Dict, List, NamedTuple
+
+from config import LLM_CHARS_PER_TOKEN, LLM_PROMPT_MAX_TOKENS
+from utils.text import normalize_text
+
+
+# Wymuszony format odpowiedzi: Anthropic — narzędzie z input_schema i tool_choice,
+# OpenAI — response_format json_schema (strict). Schemat w podzbiorze wspólnym dla obu.
+class StructuredOutput(NamedTuple):
+    name: str
+    description: str
+    schema: Dict
+
+
+PREDICTION_OUTPUT = StructuredOutput(
+    "submit_prediction",
+    "Zwraca trzech kandydatów do zwycięstwa z prawdopodobieństwem i uzasadnieniem.",
+    {
+        "type": "object",
+        "properties": {
+            "top_candidates": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string"},
+                        "probability": {"type": "number"},
+                        "rationale": {"type": "string"},
+                    },
+                    "required": ["name", "probability", "rationale"],
+                    "additionalProperties": False,
+                },
+            },
+            "note": {"type": "string"},
+        },
+        "required": ["top_candidates", "note"],
+        "additionalProperties": False,
+    },
+)
+
+
+# Prompt w częściach: `system` i `prefix` są stałe między wywołaniami (dostawca może je
+# cache'ować), `body` zmienia się razem z listą uczestników.
+class Prompt(NamedTuple):
+    system: str
+    prefix: str
+    body: str
+    names_used: int
+    names_total: int
+    estimated_tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    # Przybliżenie bez tokenizera: polski tekst z diakrytykami to ok. 3 znaki na token
+    return math.ceil(len(text or "") / max(0.5, LLM_CHARS_PER_TOKEN))
+
+def build_prediction_prompt(
+    system: str,
+    instruction: str,
+    names: List[str],
+    ascii_fallback: bool = False,
+    max_input_tokens: int = LLM_PROMPT_MAX_TOKENS,
+) -> Prompt:
+    system = normalize_text(system, ascii_fallback)
+    prefix = normalize_text(instruction, ascii_fallback)
+    header = "Uczestnicy:\n"
+    budget = max_input_tokens - estimate_tokens(system) - estimate_tokens(prefix) - estimate_tokens(header)
+    lines: List[str] = []
+    used = 0
+    for name in names:
+        line = normalize_text(name, ascii_fallback)
+        cost = estimate_tokens(line + "\n")
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    body = header + "\n".join(lines)
+    if len(lines) < len(names):
+        # Model wie, że lista jest niepełna — nie zgaduje nazwisk spoza niej
+        body += "\n" + normalize_text(f"(pominięto {len(names) - len(lines)} dalszych pozycji — limit długości promptu)", ascii_fallback)
+    return Prompt(
+        system, prefix, body, len(lines), len(names),
+        estimate_tokens(system) + estimate_tokens(prefix) + estimate_tokens(body),
+    )
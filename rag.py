@@ -1,7 +1,12 @@
-from typing import List
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from config import RAG_INDEX_DIR, RAG_MAX_SEGMENTS, RAG_BATCH_CHUNK
+from metrics import RAG_RETRIEVAL_SECONDS
+from shared_state import is_leader
+
+if TYPE_CHECKING:
+    from vector_index import VectorIndex
 
 documents = [
     "The 13th International Ignacy Jan Paderewski Piano Competition is held in Bydgoszcz, Poland, from November 9 to 23, 2025.",
@@ -9,16 +14,53 @@ documents = [
     "Prizes: 1st €40,000; 2nd €25,000; 3rd €15,000; 4th €10,000; 5th €5,000.",
     "Repertoire: Preliminary (Etudes, sonata), Stage I (style diversity), Stage II (Paderewski + free), Semi-Final (Herdzin piece + Mozart concerto), Final (major concerto).",
 ]
-_vectorizer = TfidfVectorizer()
-_doc_vectors = _vectorizer.fit_transform(documents)
+
+_index: Optional["VectorIndex"] = None
+_index_lock = threading.Lock()
+
+def get_index() -> "VectorIndex":
+    # Indeks (i numpy/scipy) powstaje przy pierwszym użyciu albo w rozgrzewce, nie przy imporcie;
+    # wczytywany z RAG_INDEX_DIR (mmap), pusty dostaje dokumenty bazowe
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                from vector_index import VectorIndex
+                index = VectorIndex(RAG_INDEX_DIR, max_segments=RAG_MAX_SEGMENTS)
+                if not len(index):
+                    # Na dysk zapisuje tylko lider — przy kilku procesach jeden katalog ma jednego piszącego
+                    index.add(documents, [{"source": "seed"} for _ in documents], persist=is_leader())
+                _index = index
+    return _index
+
+def reload_index() -> bool:
+    # Dla procesów, które nie ingestują: podchwycenie segmentów dopisanych przez lidera
+    return _index is not None and _index.reload_if_changed()
+
+def add_documents(texts: Sequence[str], metas: Optional[Sequence[Dict]] = None) -> int:
+    return get_index().add(texts, metas)
+
+def remove_documents(rows: Sequence[int]) -> int:
+    return get_index().remove(rows)
 
 def retrieve_relevant_docs(query: str, top_k: int = 3) -> List[str]:
-    qv = _vectorizer.transform([query])
-    sims = cosine_similarity(qv, _doc_vectors).flatten()
-    top_idx = np.argsort(sims)[-top_k:][::-1]
-    return [documents[i] for i in top_idx]
+    index = get_index()
+    with RAG_RETRIEVAL_SECONDS.time(mode="single"):
+        return [index.texts[i] for i, _ in index.search(query, top_k)]
+
+def retrieve_relevant_docs_batch(queries: Sequence[str], top_k: int = 3) -> List[List[str]]:
+    # Jedna transformacja i jeden iloczyn macierzy na paczkę zapytań; paczki po RAG_BATCH_CHUNK,
+    # bo macierz podobieństw (n_docs x nq) jest gęsta
+    index = get_index()
+    out: List[List[str]] = []
+    step = max(1, RAG_BATCH_CHUNK)
+    for start in range(0, len(queries), step):
+        with RAG_RETRIEVAL_SECONDS.time(mode="batch"):
+            hits = index.search_many(queries[start:start + step], top_k)
+        out.extend([index.texts[i] for i, _ in h] for h in hits)
+    return out
 
 def generate_response(query: str, relevant_docs: List[str]) -> str:
     cleaned = [d for d in relevant_docs if "predictions:" not in d.lower() and "prognoza:" not in d.lower()]
     context = "\n".join(cleaned) if cleaned else "Brak dopasowanego kontekstu."
-    return f"Informacje z kontekstu RAG:\n{context}"
\ No newline at end of file
+    return f"Informacje z kontekstu RAG:\n{context}"
@@ -1,37 +1,150 @@
-from fastapi import APIRouter
-from fastapi.responses import HTMLResponse
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from config import PADEREWSKI_BASE_URL, get_llm_diagnostics
-from schemas import QueryRequest
-from services.web import get_dynamic_participants, get_dynamic_jury, fetch_web_info, fetch_youtube_videos
-from services.llm import llm_predict_winner
-from services.rag import retrieve_relevant_docs, generate_response
+from fastapi import APIRouter, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
+
+from answer_cache import get_answer_cache
+from config import (
+    INDEX_MAX_AGE, PADEREWSKI_BASE_URL, RESPONSE_MAX_AGE, RESPONSE_STALE_WHILE_REVALIDATE, STARTUP_WARMUP,
+    get_llm_diagnostics,
+)
+from intents import DEFAULT_INTENT, classify_intent
+from metrics import CONTENT_TYPE, render_latest
+from schemas import BatchQueryRequest, QueryRequest
+from scheduler import get_scheduler
+from snapshots import Snapshot, SnapshotCache
+from warmup import warmup_status
+from web import get_dynamic_participants, get_dynamic_jury, get_history_excerpt, get_people_store, get_youtube_videos
+from llm import llm_predict_winner, llm_predict_winner_stream
+from llm_providers import recent_calls
+from rag import get_index, retrieve_relevant_docs, retrieve_relevant_docs_batch, generate_response
 
 router = APIRouter()
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _event_stream(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    async def body():
+        # Pierwsze zdarzenie od razu — przeglądarka dostaje nagłówki i pierwszy bajt bez czekania na LLM
+        yield _sse("start", {})
+        async for event, data in events:
+            yield _sse(event, data)
+        yield _sse("done", {})
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _format_prediction(pred: Dict) -> str:
+    if pred.get("prediction"):
+        return f"Prognoza (LLM): {pred['prediction']}\nPewność: {(pred['confidence']*100):.1f}%\n{pred.get('rationale','')}"
+    return f"Brak predykcji — {pred.get('rationale','')}"
+
 @router.get("/debug_llm")
 async def debug_llm():
-    return get_llm_diagnostics()
+    return {**get_llm_diagnostics(), "recent_calls": recent_calls()}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_latest(), media_type=CONTENT_TYPE)
+
+@router.get("/debug_scheduler")
+async def debug_scheduler():
+    return get_scheduler().status()
+
+@router.get("/debug_startup")
+async def debug_startup():
+    return {"warmup": STARTUP_WARMUP, "components": warmup_status()}
+
+def _people_response(store, since: Optional[str], country: Optional[str], role: Optional[str] = None):
+    # since = wersja z poprzedniego odpytania -> tylko zmiany; country/role -> filtr z indeksu
+    if since is not None:
+        return store.changes_since(since)
+    if country or role:
+        matches = store.by_country(country) if country else store.by_role(role)
+        if country and role:
+            wanted = {id(p) for p in store.by_role(role)}
+            matches = [p for p in matches if id(p) in wanted]
+        return [p.to_dict(store.with_role) for p in matches]
+    return store.all()
+
+# Pełne listy i historia jako gotowe bajty z ETag; zapytania z filtrem idą zwykłą ścieżką
+_snapshots = SnapshotCache()
+_LIST_CACHE_CONTROL = f"public, max-age={RESPONSE_MAX_AGE}, stale-while-revalidate={RESPONSE_STALE_WHILE_REVALIDATE}"
+
+async def _store_snapshot(request: Request, store) -> Response:
+    snapshot = await _snapshots.get(store.kind, store.version, store.all(), _LIST_CACHE_CONTROL)
+    return snapshot.respond(request, store.kind)
 
 @router.get("/participants")
-async def participants():
-    people = get_dynamic_participants()
-    return people or []
+async def participants(request: Request, since: Optional[str] = None, country: Optional[str] = None):
+    store = await get_people_store("participants")
+    if since is None and not country:
+        return await _store_snapshot(request, store)
+    return _people_response(store, since, country)
 
 @router.get("/jury")
-async def jury():
-    people = get_dynamic_jury()
-    return people or []
+async def jury(request: Request, since: Optional[str] = None, country: Optional[str] = None, role: Optional[str] = None):
+    store = await get_people_store("jury")
+    if since is None and not country and not role:
+        return await _store_snapshot(request, store)
+    return _people_response(store, since, country, role)
+
+@router.get("/people/lookup")
+async def people_lookup(name: str):
+    # "Kto to jest X?" — pełne imię i nazwisko albo samo nazwisko, bez znaczenia wielkość liter i diakrytyki
+    out = {}
+    for kind in ("participants", "jury"):
+        store = await get_people_store(kind)
+        out[kind] = [p.to_dict(store.with_role) for p in store.find(name)]
+    return out
 
 @router.get("/history")
-async def history():
-    text = fetch_web_info(PADEREWSKI_BASE_URL)
-    return {"source": PADEREWSKI_BASE_URL, "excerpt": text}
+async def history(request: Request):
+    text = await get_history_excerpt()
+    # Wersją jest sam tekst z cache: ten sam obiekt do odświeżenia źródła
+    snapshot = await _snapshots.get("history", text, {"source": PADEREWSKI_BASE_URL, "excerpt": text}, _LIST_CACHE_CONTROL)
+    return snapshot.respond(request, "history")
 
 @router.get("/predict_winner")
 async def predict_winner():
-    people = get_dynamic_participants()
-    return llm_predict_winner(people)
+    people = await get_dynamic_participants()
+    return await llm_predict_winner(people)
+
+@router.get("/predict_winner/stream")
+async def predict_winner_stream():
+    people = await get_dynamic_participants()
+    return _event_stream(llm_predict_winner_stream(people))
+
+def _participants_answer(people: List[Dict]) -> str:
+    lines = [f"- {p.get('name','')}" + (f" ({p.get('country')})" if p.get('country') else "") for p in people]
+    return "Uczestnicy:\n" + ("\n".join(lines) if lines else "Brak danych.")
+
+def _jury_answer(people: List[Dict]) -> str:
+    def label(j):
+        role = f" — {j.get('role')}" if j.get('role') else ""
+        country = f" ({j.get('country')})" if j.get('country') else ""
+        return f"- {j.get('name','')}{role}{country}"
+    lines = [label(j) for j in people]
+    return "Jury:\n" + ("\n".join(lines) if lines else "Brak danych.")
+
+def _history_answer(excerpt: str) -> str:
+    return f"Historia — skrót:\n{excerpt}\n\nŹródło: {PADEREWSKI_BASE_URL}"
+
+def _rag_answer(query: str, docs: List[str], vids: Optional[List[tuple]]) -> str:
+    response = generate_response(query, docs)
+    if vids is not None:
+        response += "\nYouTube:\n" + "\n".join([f"{t}: {u}" for t, u in vids])
+    return response
+
+def _retrieve(query: str) -> Tuple[int, List[str]]:
+    # Wersja odczytana przed wyszukiwaniem: wpis cache nigdy nie dostanie nowszej wersji niż jego dokumenty
+    version = get_index().version
+    return version, retrieve_relevant_docs(query)
 
 @router.post("/ask")
 async def ask(req: QueryRequest):
@@ -39,48 +152,110 @@ async def ask(req: QueryRequest):
     if not q:
         return {"response": "Brak pytania."}
 
-    participants_keywords = ["uczestnicy", "uczestnik", "biorą udział", "bierze udział", "lista uczestników", "kto bierze udzial", "kto bierze udział"]
-    jury_keywords = ["jury", "juror", "jurorzy", "lista jury"]
-    history_keywords = ["historia", "przeszłe edycje", "archiwum", "historyczne"]
-    winner_keywords = ["kto wygra", "zwycięzca", "winner", "kto będzie najlepszy", "kto bedzie najlepszy"]
-
-    if any(k in q for k in participants_keywords):
-        people = get_dynamic_participants()
-        lines = [f"- {p.get('name','')}" + (f" ({p.get('country')})" if p.get('country') else "") for p in people]
-        return {"response": "Uczestnicy:\n" + ("\n".join(lines) if lines else "Brak danych.")}
-
-    if any(k in q for k in jury_keywords):
-        people = get_dynamic_jury()
-        def label(j):
-            role = f" — {j.get('role')}" if j.get('role') else ""
-            country = f" ({j.get('country')})" if j.get('country') else ""
-            return f"- {j.get('name','')}{role}{country}"
-        lines = [label(j) for j in people]
-        return {"response": "Jury:\n" + ("\n".join(lines) if lines else "Brak danych.")}
-
-    if any(k in q for k in history_keywords):
-        excerpt = fetch_web_info(PADEREWSKI_BASE_URL)
-        return {"response": f"Historia — skrót:\n{excerpt}\n\nŹródło: {PADEREWSKI_BASE_URL}"}
-
-    if any(k in q for k in winner_keywords):
-        people = get_dynamic_participants()
-        pred = llm_predict_winner(people)
-        if pred.get("prediction"):
-            return {"response": f"Prognoza (LLM): {pred['prediction']}\nPewność: {(pred['confidence']*100):.1f}%\n{pred.get('rationale','')}"}
-        return {"response": f"Brak predykcji — {pred.get('rationale','')}"}
-
-    docs = retrieve_relevant_docs(req.query)
-    response = generate_response(req.query, docs)
-
-    if any(k in q for k in ["youtube", "wideo", "video", "film"]):
-        vids = fetch_youtube_videos()
-        response += "\nYouTube:\n" + "\n".join([f"{t}: {u}" for t, u in vids])
+    match = classify_intent(q)
 
-    return {"response": response}
+    if match.intent == "winner":
+        people = await get_dynamic_participants()
+        pred = await llm_predict_winner(people)
+        return {"response": _format_prediction(pred)}
 
-@router.get("/", response_class=HTMLResponse)
-async def index():
-    return """
+    # Odpowiedzi list i historii nie zależą od treści pytania — jeden wpis na intencję;
+    # RAG po pytaniu (także parafrazie). Prognoza i wyniki YouTube mają własne cache.
+    answers = get_answer_cache()
+    key = req.query if match.intent == DEFAULT_INTENT else None
+    cacheable = not (match.video and match.intent == DEFAULT_INTENT)
+    if cacheable:
+        cached = await asyncio.to_thread(answers.lookup, match.intent, key)
+        if cached is not None:
+            return {"response": cached}
+
+    if match.intent == "participants":
+        people = await get_dynamic_participants()
+        text, deps = _participants_answer(people), {"participants": people}
+    elif match.intent == "jury":
+        people = await get_dynamic_jury()
+        text, deps = _jury_answer(people), {"jury": people}
+    elif match.intent == "history":
+        excerpt = await get_history_excerpt()
+        text, deps = _history_answer(excerpt), {"history": excerpt}
+    else:
+        # Pierwsze wywołanie może wczytać lub zbudować indeks — poza pętlą zdarzeń
+        version, docs = await asyncio.to_thread(_retrieve, req.query)
+        vids = await get_youtube_videos() if match.video else None
+        text, deps = _rag_answer(req.query, docs, vids), {"rag": version}
+    if cacheable:
+        await asyncio.to_thread(answers.put, match.intent, key, text, deps)
+    return {"response": text}
+
+@router.post("/ask/batch")
+async def ask_batch(req: BatchQueryRequest):
+    # Pytania grupowane po intencji: każde źródło pobierane najwyżej raz na paczkę,
+    # wszystkie pytania RAG wektoryzowane razem
+    queries = [(item.query or "").lower().strip() for item in req.queries]
+    matches = [classify_intent(q) if q else None for q in queries]
+    intents = {m.intent for m in matches if m}
+    video = any(m.video for m in matches if m and m.intent == DEFAULT_INTENT)
+
+    # Uczestnicy potrzebni i liście uczestników, i prognozie — jedno pobranie na paczkę
+    participants = None
+    if intents & {"participants", "winner"}:
+        participants = asyncio.ensure_future(get_dynamic_participants())
+
+    async def winner():
+        return await llm_predict_winner(await participants)
+
+    loaders = {
+        "participants": lambda: participants,
+        "jury": get_dynamic_jury,
+        "history": get_history_excerpt,
+        "winner": winner,
+    }
+    needed = [name for name in loaders if name in intents]
+    tasks = [loaders[name]() for name in needed]
+    if video:
+        needed.append("video")
+        tasks.append(get_youtube_videos())
+    sources = dict(zip(needed, await asyncio.gather(*tasks)))
+
+    rag_pos = [i for i, m in enumerate(matches) if m and m.intent == DEFAULT_INTENT]
+    rag_docs = await asyncio.to_thread(retrieve_relevant_docs_batch, [req.queries[i].query for i in rag_pos])
+    docs_at = dict(zip(rag_pos, rag_docs))
+
+    responses = []
+    for i, m in enumerate(matches):
+        if m is None:
+            text = "Brak pytania."
+        elif m.intent == "participants":
+            text = _participants_answer(sources["participants"])
+        elif m.intent == "jury":
+            text = _jury_answer(sources["jury"])
+        elif m.intent == "history":
+            text = _history_answer(sources["history"])
+        elif m.intent == "winner":
+            text = _format_prediction(sources["winner"])
+        else:
+            text = _rag_answer(req.queries[i].query, docs_at[i], sources.get("video") if m.video else None)
+        responses.append({"response": text})
+    return {"responses": responses}
+
+async def _ask_events(req: QueryRequest) -> AsyncIterator[Tuple[str, Any]]:
+    q = (req.query or "").lower().strip()
+    if q and classify_intent(q).intent == "winner":
+        people = await get_dynamic_participants()
+        async for event, data in llm_predict_winner_stream(people):
+            if event == "result":
+                yield "result", {"response": _format_prediction(data)}
+            else:
+                yield event, data
+        return
+    # Pozostałe intencje nie wołają LLM — jedna odpowiedź w całości
+    yield "result", await ask(req)
+
+@router.post("/ask/stream")
+async def ask_stream(req: QueryRequest):
+    return _event_stream(_ask_events(req))
+
+_INDEX_HTML = """
 <!doctype html>
 <html lang="pl">
 <head>
@@ -135,30 +310,82 @@ async function fetchJSON(url, opts = {}) {
   if (!res.ok) throw new Error('HTTP ' + res.status);
   return res.json();
 }
+// Czyta odpowiedź text/event-stream (działa też dla POST, w przeciwieństwie do EventSource)
+async function streamSSE(url, opts, onEvent) {
+  const res = await fetch(url, opts);
+  if (!res.ok || !res.body) throw new Error('HTTP ' + res.status);
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let idx;
+    while ((idx = buf.indexOf('\n\n')) !== -1) {
+      const frame = buf.slice(0, idx);
+      buf = buf.slice(idx + 2);
+      let event = 'message', data = '';
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      onEvent(event, data ? JSON.parse(data) : null);
+    }
+  }
+}
+function candidateLine(c) {
+  const prob = (typeof c.probability === 'number') ? ' — ' + (c.probability * 100).toFixed(1) + '%' : '';
+  return '• ' + (c.name || '') + prob + (c.rationale ? '\n  ' + c.rationale : '');
+}
 async function ask() {
   const q = document.getElementById('query').value;
+  const out = document.getElementById('answer');
+  out.textContent = 'Myślę…';
+  const candidates = [];
+  let chars = 0;
   try {
-    const data = await fetchJSON('/ask', {
+    await streamSSE('/ask/stream', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ query: q })
+    }, (event, data) => {
+      if (event === 'token') {
+        chars += data.length;
+        if (!candidates.length) out.textContent = 'Generowanie… (' + chars + ' zn.)';
+      } else if (event === 'candidate') {
+        candidates.push(candidateLine(data));
+        out.textContent = 'Kandydaci:\n' + candidates.join('\n');
+      } else if (event === 'result') {
+        out.textContent = data.response || JSON.stringify(data, null, 2);
+        if (candidates.length) out.textContent += '\n\nKandydaci:\n' + candidates.join('\n');
+      }
     });
-    document.getElementById('answer').textContent = data.response || JSON.stringify(data, null, 2);
   } catch (e) {
-    document.getElementById('answer').textContent = 'Błąd: ' + e.message;
+    out.textContent = 'Błąd: ' + e.message;
   }
 }
 async function loadPrediction() {
+  const out = document.getElementById('prediction');
+  out.textContent = 'Ładowanie…';
+  const candidates = [];
   try {
-    const data = await fetchJSON('/predict_winner');
-    const predictionText = data.prediction ? ('Prognoza: ' + data.prediction + '\\n') : 'Brak predykcji\\n';
-    const confidenceText = (typeof data.confidence === 'number')
-      ? ('Pewność: ' + (data.confidence * 100).toFixed(1) + '%\\n\\n')
-      : '';
-    const rationaleText = data.rationale || '';
-    document.getElementById('prediction').textContent = predictionText + confidenceText + rationaleText;
+    await streamSSE('/predict_winner/stream', {}, (event, data) => {
+      if (event === 'candidate') {
+        candidates.push(candidateLine(data));
+        out.textContent = 'Kandydaci:\n' + candidates.join('\n');
+      } else if (event === 'result') {
+        const predictionText = data.prediction ? ('Prognoza: ' + data.prediction + '\n') : 'Brak predykcji\n';
+        const confidenceText = (typeof data.confidence === 'number')
+          ? ('Pewność: ' + (data.confidence * 100).toFixed(1) + '%\n\n')
+          : '';
+        const rationaleText = data.rationale || '';
+        const list = candidates.length ? '\n\nKandydaci:\n' + candidates.join('\n') : '';
+        out.textContent = predictionText + confidenceText + rationaleText + list;
+      }
+    });
   } catch (e) {
-    document.getElementById('prediction').textContent = 'Błąd: ' + e.message;
+    out.textContent = 'Błąd: ' + e.message;
   }
 }
 async function loadParticipants() {
@@ -202,4 +429,14 @@ loadParticipants();
 loadJury();
 </script>
 </body></html>
-"""
\ No newline at end of file
+"""
+
+_index_snapshot: Optional[Snapshot] = None
+
+@router.get("/", response_class=HTMLResponse)
+async def index(request: Request):
+    # Strona statyczna — bajty, ETag i warianty skompresowane liczone raz na proces
+    global _index_snapshot
+    if _index_snapshot is None:
+        _index_snapshot = Snapshot.html(_INDEX_HTML, f"public, max-age={INDEX_MAX_AGE}")
+    return _index_snapshot.respond(request, "index")
@@ -0,0 +1,172 @@
+import asyncio
+import random
+import time
+from datetime import date, datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import (
+    JURY_CACHE_TTL, PARTICIPANTS_CACHE_TTL, HISTORY_CACHE_TTL, YOUTUBE_CACHE_TTL, YOUTUBE_API_KEY, YOUTUBE_DEFAULT_QUERY,
+    SCHEDULER_STAGE_DAYS, SCHEDULER_TIMEZONE, SCHEDULER_STAGE_INTERVAL, SCHEDULER_PREDICTION_INTERVAL,
+    SCHEDULER_RETRY_BASE, SCHEDULER_RETRY_MAX, SHARED_LEASE_TTL,
+)
+from llm import prewarm_prediction
+from metrics import SCHEDULER_RUNS
+from shared_state import is_leader
+from web import get_dynamic_participants, refresh_source
+from youtube import get_youtube_client
+
+
+def parse_stage_days(spec: str) -> List[Tuple[date, date]]:
+    # "2025-11-10/2025-11-13,2025-11-18" -> [(od, do), ...]; pojedyncza data = jeden dzień
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("/")
+        first = date.fromisoformat(start.strip())
+        ranges.append((first, date.fromisoformat(end.strip()) if end.strip() else first))
+    return ranges
+
+def _tz():
+    # Brak bazy stref czasowych (np. minimalny obraz Windows/Docker) — UTC
+    try:
+        return ZoneInfo(SCHEDULER_TIMEZONE)
+    except Exception:
+        return timezone.utc
+
+
+# Zadanie odświeżające: `run` zwraca True przy sukcesie, False (lub wyjątek) oznacza błąd
+class Job:
+    def __init__(self, name: str, run: Callable[[], Awaitable[bool]], interval: float, stage_interval: float):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self.stage_interval = min(interval, stage_interval)
+        self.failures = 0
+        self.runs = 0
+        self.last_ok: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.next_run: Optional[float] = None
+
+
+# Harmonogram w procesie: każde zadanie ma własną pętlę. Odstęp zależy od dnia (etap konkursu
+# czy nie), a po błędzie rośnie wykładniczo (z jitterem) do SCHEDULER_RETRY_MAX.
+# Przy kilku procesach zadania wykonuje tylko lider (`leader()`); pozostali co `follower_poll`
+# sprawdzają, czy nie przejęli dzierżawy.
+class Scheduler:
+    def __init__(
+        self,
+        jobs: List[Job],
+        stage_days: List[Tuple[date, date]],
+        retry_base: float = SCHEDULER_RETRY_BASE,
+        retry_max: float = SCHEDULER_RETRY_MAX,
+        clock: Callable[[], datetime] = lambda: datetime.now(_tz()),
+        leader: Callable[[], bool] = lambda: True,
+        follower_poll: float = SHARED_LEASE_TTL / 3,
+    ):
+        self.jobs = [j for j in jobs if j.interval > 0]
+        self.stage_days = stage_days
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.clock = clock
+        self.leader = leader
+        self.follower_poll = follower_poll
+        self._tasks: List[asyncio.Task] = []
+
+    def is_stage_day(self, day: Optional[date] = None) -> bool:
+        day = day or self.clock().date()
+        return any(first <= day <= last for first, last in self.stage_days)
+
+    def delay_for(self, job: Job) -> float:
+        if job.failures:
+            cap = min(self.retry_max, self.retry_base * 2 ** (job.failures - 1))
+            return random.uniform(cap / 2, cap)
+        return job.stage_interval if self.is_stage_day() else job.interval
+
+    async def run_once(self, job: Job) -> bool:
+        job.runs += 1
+        try:
+            ok = bool(await job.run())
+            job.last_error = None if ok else "pusty wynik"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            ok = False
+            job.last_error = f"{type(e).__name__}: {e}"
+        SCHEDULER_RUNS.inc(job=job.name, outcome="ok" if ok else "error")
+        if ok:
+            job.failures = 0
+            job.last_ok = time.time()
+        else:
+            job.failures += 1
+        return ok
+
+    async def _loop(self, job: Job) -> None:
+        while True:
+            if not self.leader():
+                job.next_run = None
+                await asyncio.sleep(self.follower_poll)
+                continue
+            await self.run_once(job)
+            delay = self.delay_for(job)
+            job.next_run = time.time() + delay
+            await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._loop(job), name=f"scheduler:{job.name}") for job in self.jobs]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def status(self) -> Dict:
+        return {
+            "stage_day": self.is_stage_day(),
+            "leader": self.leader(),
+            "jobs": {
+                j.name: {
+                    "runs": j.runs,
+                    "failures": j.failures,
+                    "last_ok": j.last_ok,
+                    "last_error": j.last_error,
+                    "next_run": j.next_run,
+                }
+                for j in self.jobs
+            },
+        }
+
+
+async def _prewarm_winner() -> bool:
+    # Lista z cache (odświeżana przez zadanie "participants"); LLM tylko przy zmianie listy
+    # albo gdy prognoza wygaśnie przed następnym przebiegiem
+    people = await get_dynamic_participants()
+    return await prewarm_prediction(people, horizon=2 * SCHEDULER_PREDICTION_INTERVAL)
+
+def default_jobs() -> List[Job]:
+    def source(name: str) -> Callable[[], Awaitable[bool]]:
+        return lambda: refresh_source(name)
+    jobs = [
+        Job("participants", source("participants"), PARTICIPANTS_CACHE_TTL, SCHEDULER_STAGE_INTERVAL),
+        Job("jury", source("jury"), JURY_CACHE_TTL, SCHEDULER_STAGE_INTERVAL),
+        Job("history", source("history"), HISTORY_CACHE_TTL, SCHEDULER_STAGE_INTERVAL),
+        Job("prediction", _prewarm_winner, SCHEDULER_PREDICTION_INTERVAL, SCHEDULER_STAGE_INTERVAL),
+    ]
+    # Bez klucza API każde wywołanie kończy się błędem — nie ma czego odświeżać
+    if YOUTUBE_API_KEY:
+        # Odświeżenie tylko wygasającej strony — każde wywołanie search.list to 100 jednostek limitu
+        prewarm = lambda: get_youtube_client().prewarm(YOUTUBE_DEFAULT_QUERY, horizon=SCHEDULER_STAGE_INTERVAL)
+        jobs.append(Job("youtube", prewarm, YOUTUBE_CACHE_TTL, SCHEDULER_STAGE_INTERVAL))
+    return jobs
+
+_scheduler: Optional[Scheduler] = None
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(default_jobs(), parse_stage_days(SCHEDULER_STAGE_DAYS), leader=is_leader)
+    return _scheduler
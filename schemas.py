@@ -1,4 +1,11 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from config import ASK_BATCH_MAX
 
 class QueryRequest(BaseModel):
-    query: str
\ No newline at end of file
+    query: str
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryRequest] = Field(..., max_length=ASK_BATCH_MAX)
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Hashable, Optional, Tuple
+
+from config import SHARED_STATE_PATH, SHARED_LEASE_TTL, SHARED_MMAP_BYTES
+
+# Identyfikator procesu w dzierżawach (host:pid:losowy sufiks — pid może wrócić po restarcie)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    ns TEXT NOT NULL, key TEXT NOT NULL, stored_at REAL NOT NULL, value TEXT NOT NULL,
+    PRIMARY KEY (ns, key)
+);
+CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, period TEXT NOT NULL, used INTEGER NOT NULL);
+"""
+
+
+# Baza SQLite współdzielona przez procesy jednego hosta. WAL: czytelnicy nie blokują piszącego
+# i odwrotnie; mmap_size — odczyty stron bazy bez kopiowania przez read().
+# Połączenie per wątek (część wywołań idzie przez to_thread), autocommit.
+class SharedDb:
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(SHARED_MMAP_BYTES)}")
+            self._local.conn = conn
+        return conn
+
+    def load(self, ns: str, key: str, newer_than: float = 0.0) -> Optional[Tuple[str, float]]:
+        return self._conn().execute(
+            "SELECT value, stored_at FROM entries WHERE ns = ? AND key = ? AND stored_at > ?", (ns, key, newer_than),
+        ).fetchone()
+
+    def save(self, ns: str, key: str, value: str) -> None:
+        self._conn().execute(
+            "INSERT INTO entries (ns, key, stored_at, value) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (ns, key) DO UPDATE SET stored_at = excluded.stored_at, value = excluded.value",
+            (ns, key, time.time(), value),
+        )
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        # Nowa dzierżawa albo przedłużenie własnej; cudzą można przejąć dopiero po wygaśnięciu
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+            (name, owner, now + ttl, now),
+        )
+        return cur.rowcount > 0
+
+    def release(self, name: str, owner: str) -> None:
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def counter(self, name: str, period: str) -> int:
+        row = self._conn().execute("SELECT used FROM counters WHERE name = ? AND period = ?", (name, period)).fetchone()
+        return int(row[0]) if row else 0
+
+    def spend(self, name: str, period: str, units: int, limit: int) -> bool:
+        # Atomowe "dodaj, jeśli nie przekroczy limitu"; nowy okres (np. doba) zaczyna od zera
+        if units > limit:
+            return False
+        cur = self._conn().execute(
+            "INSERT INTO counters (name, period, used) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET "
+            "used = CASE WHEN counters.period = excluded.period THEN counters.used + excluded.used ELSE excluded.used END, "
+            "period = excluded.period "
+            "WHERE counters.period <> excluded.period OR counters.used + excluded.used <= ?",
+            (name, period, units, limit),
+        )
+        return cur.rowcount > 0
+
+    def exhaust(self, name: str, period: str, limit: int) -> None:
+        self._conn().execute(
+            "INSERT INTO counters (name, period, used) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET "
+            "used = CASE WHEN counters.period = excluded.period THEN MAX(counters.used, excluded.used) ELSE excluded.used END, "
+            "period = excluded.period",
+            (name, period, limit),
+        )
+
+
+# Magazyn dla TTLCache (ten sam interfejs co JsonFileStore) z przestrzenią nazw per cache.
+# shared = True: TTLCache sprawdza, czy inny proces nie zapisał nowszej wartości, i sprzęga
+# ładowania między procesami przez claim/release.
+class SqliteStore:
+    shared = True
+
+    def __init__(self, db: SharedDb, namespace: str, owner: str = WORKER_ID):
+        self.db = db
+        self.namespace = namespace
+        self.owner = owner
+
+    def load(self, key: Hashable, newer_than: float = 0.0) -> Optional[Tuple[Any, float]]:
+        try:
+            row = self.db.load(self.namespace, str(key), newer_than)
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0]), float(row[1])
+        except ValueError:
+            return None
+
+    def save(self, key: Hashable, value: Any) -> None:
+        try:
+            self.db.save(self.namespace, str(key), json.dumps(value, ensure_ascii=False))
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+    def claim(self, key: Hashable, ttl: float) -> bool:
+        # Błąd bazy = ładujemy sami (jak bez stanu współdzielonego)
+        try:
+            return self.db.acquire(f"load:{self.namespace}:{key}", self.owner, ttl)
+        except sqlite3.Error:
+            return True
+
+    def release(self, key: Hashable) -> None:
+        try:
+            self.db.release(f"load:{self.namespace}:{key}", self.owner)
+        except sqlite3.Error:
+            pass
+
+
+# Wybór lidera przez dzierżawę w bazie: proces, który ją trzyma, odświeża dane w tle
+# (harmonogram, ingestia); przedłuża ją co ttl/3. Po śmierci lidera przejmuje ją inny proces.
+class LeaderElection:
+    def __init__(self, db: SharedDb, name: str = "refresh", ttl: float = SHARED_LEASE_TTL, owner: str = WORKER_ID):
+        self.db = db
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner
+        self.leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    def try_acquire(self) -> bool:
+        try:
+            self.leader = self.db.acquire(self.name, self.owner, self.ttl)
+        except sqlite3.Error:
+            self.leader = False
+        return self.leader
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            await asyncio.to_thread(self.try_acquire)
+
+    async def start(self) -> None:
+        # Pierwsza próba przed startem zadań w tle — od razu wiadomo, kto odświeża
+        await asyncio.to_thread(self.try_acquire)
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="leader-election")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.leader:
+            # Zwolnienie od razu — następca nie czeka na wygaśnięcie dzierżawy
+            await asyncio.to_thread(self.db.release, self.name, self.owner)
+            self.leader = False
+
+
+_db: Optional[SharedDb] = None
+_election: Optional[LeaderElection] = None
+
+def get_shared_db() -> Optional[SharedDb]:
+    global _db
+    if _db is None and SHARED_STATE_PATH:
+        _db = SharedDb(SHARED_STATE_PATH)
+    return _db
+
+def shared_store(namespace: str) -> Optional[SqliteStore]:
+    db = get_shared_db()
+    return SqliteStore(db, namespace) if db is not None else None
+
+def get_election() -> Optional[LeaderElection]:
+    global _election
+    if _election is None and get_shared_db() is not None:
+        _election = LeaderElection(get_shared_db())
+    return _election
+
+def is_leader() -> bool:
+    # Bez stanu współdzielonego każdy proces sam odświeża swoje dane
+    election = get_election()
+    return True if election is None else election.leader
@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from config import SNAPSHOT_MIN_COMPRESS
+from metrics import RESPONSE_SNAPSHOTS
+
+try:
+    import brotli
+except Exception:
+    brotli = None
+
+# Kolejność preferencji przy negocjacji Accept-Encoding
+_ENCODINGS = ("br", "gzip")
+
+
+def _dumps(value: Any) -> bytes:
+    # Te same ustawienia co JSONResponse FastAPI — klient dostaje identyczne bajty
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def _accepted(header: str) -> Dict[str, float]:
+    # "gzip;q=0.8, br" -> {"gzip": 0.8, "br": 1.0}
+    out = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[name] = q
+    return out
+
+
+# Gotowa odpowiedź: bajty treści, silny ETag i warianty skompresowane, liczone raz na zmianę danych.
+# Warianty mają własne ETagi (sufiks kodowania), ale If-None-Match pasuje do każdego z nich.
+class Snapshot:
+    __slots__ = ("body", "etag", "media_type", "cache_control", "encoded", "_etags")
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str, min_compress: int = SNAPSHOT_MIN_COMPRESS):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.encoded: Dict[str, Tuple[bytes, str]] = {}
+        if len(body) >= min_compress:
+            # mtime=0 — te same dane dają te same bajty (i ETag) w każdym procesie
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                self.encoded["gzip"] = (gz, f'"{digest}-gzip"')
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+                if len(br) < len(body):
+                    self.encoded["br"] = (br, f'"{digest}-br"')
+        self._etags = {self.etag} | {etag for _, etag in self.encoded.values()}
+
+    @classmethod
+    def json(cls, value: Any, cache_control: str) -> "Snapshot":
+        return cls(_dumps(value), "application/json", cache_control)
+
+    @classmethod
+    def html(cls, text: str, cache_control: str) -> "Snapshot":
+        return cls(text.encode("utf-8"), "text/html; charset=utf-8", cache_control)
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            # If-None-Match porównuje słabo: W/"x" pasuje do "x"
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in self._etags:
+                return True
+        return False
+
+    def choose(self, accept_encoding: str) -> Optional[str]:
+        if not self.encoded or not accept_encoding:
+            return None
+        accepted = _accepted(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = None, 0.0
+        for enc in _ENCODINGS:
+            q = accepted.get(enc, wildcard)
+            if enc in self.encoded and q > best_q:
+                best, best_q = enc, q
+        return best
+
+    def respond(self, request: Request, name: str) -> Response:
+        headers = {"Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        encoding = self.choose(request.headers.get("accept-encoding", ""))
+        body, etag = self.encoded[encoding] if encoding else (self.body, self.etag)
+        headers["ETag"] = etag
+        if self.matches(request.headers.get("if-none-match")):
+            RESPONSE_SNAPSHOTS.inc(snapshot=name, result="not_modified")
+            return Response(status_code=304, headers=headers)
+        RESPONSE_SNAPSHOTS.inc(snapshot=name, result=encoding or "identity")
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+# Migawki per nazwa, przebudowywane tylko, gdy zmieni się wersja danych
+# (numer wersji magazynu albo sam obiekt z cache — porównanie po ==, więc najpierw tożsamość).
+class SnapshotCache:
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[Any, Snapshot]] = {}
+
+    async def get(self, name: Hashable, version: Any, value: Any, cache_control: str) -> Snapshot:
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        RESPONSE_SNAPSHOTS.inc(snapshot=str(name), result="rebuild")
+        # Serializacja i kompresja (brotli q=11) to praca CPU — poza pętlą zdarzeń
+        snapshot = await asyncio.to_thread(Snapshot.json, value, cache_control)
+        self._entries[name] = (version, snapshot)
+        return snapshot
+
+    def invalidate(self, name: Optional[Hashable] = None) -> None:
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Moduły aplikacji leżą w katalogu głównym repozytorium, stuby benchmarków w bench/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
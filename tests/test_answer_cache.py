@@ -0,0 +1,28 @@
+import pytest
+
+from answer_cache import AnswerCache, query_terms
+
+
+def _cache():
+    # Stałe źródła i jednakowe wagi termów — liczy się tylko zbiór słów pytania; domyślny próg podobieństwa
+    return AnswerCache(lambda name: 1, lambda terms: [1.0] * len(terms))
+
+
+@pytest.mark.parametrize("first, second", [
+    ("kto wygra konkurs?", "co wygra konkurs?"),
+    ("jak dojechać do filharmonii?", "gdzie dojechać do filharmonii?"),
+    ("jaki utwór gra finalista?", "który utwór gra finalista?"),
+    ("what is the prize?", "which is the prize?"),
+])
+def test_question_word_separates_answers(first, second):
+    cache = _cache()
+    cache.put("rag", first, "odpowiedź 1", {"rag": 1})
+    assert cache.lookup("rag", first) == "odpowiedź 1"
+    assert cache.lookup("rag", second) is None
+
+
+def test_paraphrase_with_stopwords_shares_answer():
+    cache = _cache()
+    cache.put("rag", "Jakie są nagrody?", "nagrody", {"rag": 1})
+    assert cache.lookup("rag", "nagrody jakie sa") == "nagrody"
+    assert query_terms("Kto jest w jury?") == ["kto", "jury"]
@@ -0,0 +1,52 @@
+import asyncio
+import os
+
+import pytest
+
+import http_cache
+from http_cache import HttpCache, fetch_text
+
+URL = "https://example.test/jury/"
+
+
+class Response:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+def test_toggling_compression_leaves_one_body_file(tmp_path):
+    HttpCache(str(tmp_path), compress=True).store(URL, "<p>jury</p>" * 100, '"v1"', None)
+    cache = HttpCache(str(tmp_path), compress=False)
+    page = cache.store(URL, "<p>jury</p>" * 200, '"v2"', None)
+    files = sorted(os.listdir(tmp_path))
+    assert [f for f in files if ".body" in f] == [os.path.basename(page.body_path)]
+    assert cache.total_bytes() == sum(os.path.getsize(tmp_path / f) for f in files)
+    assert cache.read(cache.lookup(URL)) == "<p>jury</p>" * 200
+
+
+@pytest.mark.parametrize("status", [500, 503])
+def test_stale_copy_served_on_upstream_5xx(tmp_path, monkeypatch, status):
+    cache = HttpCache(str(tmp_path))
+    cache.store(URL, "<p>zapisana wersja</p>", '"v1"', None)
+    monkeypatch.setattr(http_cache, "_cache", cache)
+
+    async def fetch(url, headers=None, timeout=None):
+        assert headers == {"If-None-Match": '"v1"'}
+        return Response(status, "błąd serwera")
+
+    monkeypatch.setattr(http_cache, "fetch", fetch)
+    assert asyncio.run(fetch_text(URL)) == "<p>zapisana wersja</p>"
+
+
+def test_client_error_is_not_masked_by_stale_copy(tmp_path, monkeypatch):
+    cache = HttpCache(str(tmp_path))
+    cache.store(URL, "<p>zapisana wersja</p>", None, None)
+    monkeypatch.setattr(http_cache, "_cache", cache)
+
+    async def fetch(url, headers=None, timeout=None):
+        return Response(404)
+
+    monkeypatch.setattr(http_cache, "fetch", fetch)
+    assert asyncio.run(fetch_text(URL)) is None
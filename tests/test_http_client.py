@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+import http_client
+from http_client import close_client, fetch, get_client
+from stubs import StubServer
+
+LATENCY = 0.2
+
+
+@pytest.fixture
+def stub():
+    with StubServer(latency=LATENCY) as server:
+        yield server
+
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close_client()
+    return asyncio.run(main())
+
+
+def test_concurrent_fetches_overlap(stub):
+    async def run():
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(fetch(f"{stub.url}/pages/jury.html") for _ in range(5)))
+        return responses, time.perf_counter() - start
+
+    responses, elapsed = _run(run())
+    assert [r.status_code for r in responses] == [200] * 5
+    # Szeregowo byłoby 5 x LATENCY
+    assert elapsed < 3 * LATENCY
+
+
+def test_per_host_limit_queues_requests(stub, monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_PER_HOST_LIMIT", 2)
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*(fetch(f"{stub.url}/pages/jury.html") for _ in range(4)))
+        return time.perf_counter() - start
+
+    assert _run(run()) >= 2 * LATENCY
+
+
+def test_client_is_shared_and_reopened_after_close(stub):
+    async def run():
+        first = get_client()
+        assert get_client() is first
+        await close_client()
+        second = get_client()
+        resp = await fetch(f"{stub.url}/pages/missing.html")
+        return first, second, resp
+
+    first, second, resp = _run(run())
+    assert first is not second and first.is_closed
+    assert resp.status_code == 404
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+import ingest
+import rag
+from vector_index import VectorIndex
+
+URL = "https://example.test/aktualnosci/"
+
+OLD = "Przesłuchania drugiego etapu odbędą się w sali kameralnej filharmonii."
+NEW = "Przesłuchania drugiego etapu przeniesiono do auli akademii muzycznej."
+
+
+def _page(text):
+    return f"<html><body><nav>menu</nav><main><p>{text}</p></main></body></html>"
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    index = VectorIndex(str(tmp_path))
+    index.add(rag.documents, [{"source": "seed"} for _ in rag.documents])
+    monkeypatch.setattr(rag, "_index", index)
+    monkeypatch.setattr(ingest, "INGEST_STATE_PATH", "")
+    monkeypatch.setattr(ingest, "_state", None)
+    monkeypatch.setattr(ingest, "_known_hashes", None)
+    return index
+
+
+def test_reingest_of_changed_page_retires_old_chunks(monkeypatch, index):
+    pages = {URL: _page(OLD)}
+
+    async def fetch_html(url, timeout=None):
+        return pages.get(url)
+
+    monkeypatch.setattr(ingest, "fetch_html", fetch_html)
+
+    assert asyncio.run(ingest.ingest([URL])) == 1
+    assert OLD in rag.retrieve_relevant_docs("sala kameralna filharmonii", top_k=len(index))
+
+    # Ta sama treść: nic nowego, nic usuniętego
+    assert asyncio.run(ingest.ingest([URL])) == 0
+    assert OLD in rag.retrieve_relevant_docs("sala kameralna filharmonii", top_k=len(index))
+
+    pages[URL] = _page(NEW)
+    assert asyncio.run(ingest.ingest([URL])) == 1
+    docs = rag.retrieve_relevant_docs("przesłuchania drugiego etapu sala kameralna", top_k=len(index))
+    assert NEW in docs and OLD not in docs
+
+    # Usunięcie przeżywa ponowne wczytanie z dysku
+    reloaded = VectorIndex(index.directory)
+    hits = [reloaded.texts[i] for i, _ in reloaded.search("filharmonii", top_k=len(reloaded))]
+    assert OLD not in hits and NEW in hits
+
+
+def test_removed_rows_do_not_count_in_idf(index):
+    fresh = VectorIndex()
+    fresh.add(rag.documents)
+    index.add(["zupełnie inny dokument o filharmonii"])
+    index.remove([len(index) - 1])
+    assert index.term_idf(["competition", "filharmonii"]) == fresh.term_idf(["competition", "filharmonii"])
@@ -0,0 +1,35 @@
+import json
+import os
+
+import pytest
+
+from intents import IntentRouter
+
+LABELLED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "data", "intents_labelled.jsonl")
+
+# Obecna trafność routera na zbiorze oznaczonym to ok. 96% (2 pomyłki na 56); próg z zapasem
+MIN_ACCURACY = 0.94
+
+
+def _labelled():
+    with open(LABELLED, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_router_accuracy_on_labelled_set():
+    router = IntentRouter()
+    rows = _labelled()
+    predicted = [(r["query"], r["intent"], router.classify(r["query"]).intent) for r in rows]
+    misses = [p for p in predicted if p[1] != p[2]]
+    accuracy = 1 - len(misses) / len(rows)
+    assert accuracy >= MIN_ACCURACY, misses
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("Kto jest w jury?", "jury"),
+    ("lista uczestnikow", "participants"),
+    ("Kto wygrał konkurs?", "winner"),
+    ("kiedy jest finał", "rag"),
+])
+def test_router_spot_checks(query, intent):
+    assert IntentRouter().classify(query).intent == intent
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+
+import llm_providers
+from llm_providers import AnthropicProvider, FakeProvider, complete_with_retries, stream_with_retries
+
+
+class Unavailable(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+@pytest.fixture(autouse=True)
+def llm_limits(monkeypatch):
+    # Bez backoffu; semafor tworzony od nowa, bo wiąże się z pętlą zdarzeń danego testu
+    monkeypatch.setattr(llm_providers, "LLM_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(llm_providers, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(llm_providers, "LLM_DEADLINE", 5.0)
+    monkeypatch.setattr(llm_providers, "_semaphore", None)
+
+
+def _complete(provider):
+    return asyncio.run(complete_with_retries(provider, "m", "system", "pytanie"))
+
+
+def _stream(provider):
+    async def run():
+        return [chunk async for chunk in stream_with_retries(provider, "m", "system", "pytanie")]
+    return asyncio.run(run())
+
+
+def test_transient_errors_are_retried():
+    provider = FakeProvider("ok", errors=[ConnectionError("reset"), Unavailable("503")])
+    assert _complete(provider).text == "ok"
+    assert len(provider.calls) == 3
+
+
+def test_permanent_error_is_not_retried():
+    provider = FakeProvider("ok", errors=[BadRequest("400")])
+    with pytest.raises(BadRequest):
+        _complete(provider)
+    assert len(provider.calls) == 1
+
+
+def test_retries_stop_after_limit():
+    provider = FakeProvider("ok", errors=[Unavailable("503")] * 5)
+    with pytest.raises(Unavailable):
+        _complete(provider)
+    assert len(provider.calls) == 3
+
+
+def test_deadline_covers_all_attempts(monkeypatch):
+    monkeypatch.setattr(llm_providers, "LLM_DEADLINE", 0.2)
+    provider = FakeProvider("ok", delay=0.15, errors=[Unavailable("503")] * 5)
+    start = time.perf_counter()
+    with pytest.raises((asyncio.TimeoutError, Unavailable)):
+        _complete(provider)
+    assert time.perf_counter() - start < 0.5
+    assert len(provider.calls) <= 2
+
+
+def test_slow_call_times_out(monkeypatch):
+    monkeypatch.setattr(llm_providers, "LLM_DEADLINE", 0.1)
+    with pytest.raises(asyncio.TimeoutError):
+        _complete(FakeProvider("ok", delay=1.0))
+
+
+def test_concurrency_is_capped(monkeypatch):
+    monkeypatch.setattr(llm_providers, "LLM_MAX_CONCURRENCY", 2)
+    active = peak = 0
+
+    class Counting(FakeProvider):
+        async def complete(self, *args, **kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            try:
+                return await super().complete(*args, **kwargs)
+            finally:
+                active -= 1
+
+    provider = Counting("ok", delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(complete_with_retries(provider, "m", "system", str(i)) for i in range(6)))
+
+    assert [r.text for r in asyncio.run(run())] == ["ok"] * 6
+    assert peak == 2
+
+
+def test_stream_retries_before_first_chunk():
+    provider = FakeProvider("abcdefgh", chunk_size=3, errors=[Unavailable("503")])
+    assert "".join(_stream(provider)) == "abcdefgh"
+    assert len(provider.calls) == 2
+
+
+def test_stream_is_not_retried_after_first_chunk(monkeypatch):
+    monkeypatch.setattr(llm_providers, "LLM_DEADLINE", 0.2)
+    provider = FakeProvider("x" * 40, chunk_size=4, chunk_delay=0.05)
+    chunks = []
+
+    async def run():
+        async for chunk in stream_with_retries(provider, "m", "system", "pytanie"):
+            chunks.append(chunk)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert chunks and len(provider.calls) == 1
+
+
+def test_anthropic_marks_last_static_block_for_cache():
+    req = AnthropicProvider(None)._request("m", "system", "pytanie", 100, 0.4, "instrukcja", None)
+    prefix_block, user_block = req["messages"][0]["content"]
+    assert prefix_block["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in user_block and "cache_control" not in req["system"][0]
+
+    req = AnthropicProvider(None)._request("m", "system", "pytanie", 100, 0.4, "", None)
+    assert req["system"][0]["cache_control"] == {"type": "ephemeral"}
+
+    req = AnthropicProvider(None, prompt_cache=False)._request("m", "system", "pytanie", 100, 0.4, "instrukcja", None)
+    assert all("cache_control" not in b for b in req["system"] + req["messages"][0]["content"])
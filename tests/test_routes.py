@@ -0,0 +1,28 @@
+import asyncio
+
+import routes
+from schemas import BatchQueryRequest
+
+
+def test_batch_fetches_participants_once_for_list_and_prediction(monkeypatch):
+    calls = []
+    people = [{"name": "Jan Kowalski", "country": "Polska"}]
+
+    async def participants():
+        calls.append("participants")
+        await asyncio.sleep(0.01)
+        return people
+
+    async def predict(given):
+        assert given is people
+        return {"candidates": [], "model": "fake"}
+
+    monkeypatch.setattr(routes, "get_dynamic_participants", participants)
+    monkeypatch.setattr(routes, "llm_predict_winner", predict)
+    monkeypatch.setattr(routes, "_format_prediction", lambda pred: "prognoza")
+
+    req = BatchQueryRequest(queries=[{"query": "lista uczestników"}, {"query": "kto wygra?"}])
+    out = asyncio.run(routes.ask_batch(req))
+    assert calls == ["participants"]
+    assert out["responses"][0]["response"].startswith("Uczestnicy:")
+    assert out["responses"][1]["response"] == "prognoza"
@@ -0,0 +1,51 @@
+import asyncio
+import unicodedata
+
+import pytest
+
+import web
+
+
+@pytest.fixture(autouse=True)
+def no_remembered_urls(monkeypatch):
+    monkeypatch.setattr(web, "_resolved_urls", {})
+
+
+def test_primary_url_wins_over_remembered_fallback(monkeypatch):
+    pages = {"primary": None}
+    fallback_calls = []
+
+    async def fetch_html(url):
+        return pages[url]
+
+    async def people_from_url(url, with_role=False):
+        fallback_calls.append(url)
+        return [{"name": "Strona Główna"}]
+
+    async def probe(urls, deadline, with_role=False):
+        return "fallback", await people_from_url("fallback", with_role)
+
+    monkeypatch.setattr(web, "fetch_html", fetch_html)
+    monkeypatch.setattr(web, "_people_from_url", people_from_url)
+    monkeypatch.setattr(web, "probe_candidates", probe)
+    parser = lambda html: [{"name": html}]
+
+    def load():
+        return asyncio.run(web._load_people("participants", "primary", parser, ["/"], False))
+
+    # Chwilowa awaria adresu głównego: zapas zapamiętany, potem używany bez sondowania
+    assert load() == [{"name": "Strona Główna"}]
+    assert web._resolved_urls == {"participants": "fallback"}
+    assert load() == [{"name": "Strona Główna"}]
+
+    # Adres główny wrócił — ma pierwszeństwo, zapas zapomniany
+    pages["primary"] = "Jan Kowalski"
+    fallback_calls.clear()
+    assert load() == [{"name": "Jan Kowalski"}]
+    assert fallback_calls == [] and web._resolved_urls == {}
+
+
+@pytest.mark.parametrize("form", ["NFC", "NFD"])
+def test_role_words_are_cut_at_the_right_offsets(form):
+    block = unicodedata.normalize(form, "Żaneta Kowalska przewodnicząca")
+    assert web._people_from_blocks([block]) == [("Żaneta Kowalska", "", "przewodniczący")]
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+import youtube
+from http_client import close_client
+from stubs import StubServer
+from youtube import QuotaExceeded, QuotaTracker, YouTubeClient
+
+QUERY = "Paderewski Piano Competition 2025"
+
+
+@pytest.fixture
+def stub():
+    with StubServer(latency=0.05, videos_per_query=12) as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def local_cache(monkeypatch):
+    # Cache tylko w pamięci, nawet gdy środowisko ustawia SHARED_STATE_PATH
+    monkeypatch.setattr(youtube, "shared_store", lambda namespace: None)
+
+
+def _client(stub, daily_limit=10_000):
+    quota = QuotaTracker(daily_limit=daily_limit, path="")
+    return YouTubeClient(api_key="stub", base_url=f"{stub.url}/youtube/v3", quota=quota,
+                         ttl=60, stale_ttl=0, cache_dir="", max_qps=0)
+
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close_client()
+    return asyncio.run(main())
+
+
+def test_cached_search_costs_no_quota(stub):
+    client = _client(stub)
+
+    async def run():
+        first = await client.search(QUERY)
+        used = client.quota.used
+        for _ in range(5):
+            assert await client.search(QUERY) == first
+        return first, used
+
+    first, used = _run(run())
+    assert len(first) == 5
+    assert used == client.search_cost == client.quota.used
+    assert stub.stats["search_200"] == 1
+
+
+def test_concurrent_identical_searches_share_one_call(stub):
+    client = _client(stub)
+
+    async def run():
+        return await asyncio.gather(*(client.search(QUERY) for _ in range(8)))
+
+    results = _run(run())
+    assert all(r == results[0] for r in results)
+    assert stub.stats["search_200"] == 1
+
+
+def test_pagination_is_lazy(stub):
+    client = _client(stub)
+
+    async def run():
+        await client.search(QUERY, max_results=5)
+        calls = stub.stats["search_200"]
+        videos = [v async for v in client.iter_videos(QUERY, page_size=5)]
+        return calls, videos
+
+    calls, videos = _run(run())
+    assert calls == 1
+    assert len(videos) == 12 and len(set(videos)) == 12
+    assert stub.stats["search_200"] == 3
+
+
+def test_local_quota_blocks_api_calls(stub):
+    client = _client(stub, daily_limit=150)
+
+    async def run():
+        await client.search(QUERY)
+        with pytest.raises(QuotaExceeded):
+            await client.search("finał konkursu")
+
+    _run(run())
+    assert stub.stats["search_200"] == 1
+    assert client.quota.remaining() == 50
+
+
+def test_upstream_quota_error_exhausts_local_quota(stub):
+    stub.quota_limit = stub.search_cost
+    client = _client(stub)
+
+    async def run():
+        await client.search(QUERY)
+        with pytest.raises(QuotaExceeded):
+            await client.search("finał konkursu")
+        with pytest.raises(QuotaExceeded):
+            await client.search("etap I")
+
+    _run(run())
+    assert stub.stats["search_403"] == 1
+    assert client.quota.remaining() == 0
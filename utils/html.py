@@ -0,0 +1,68 @@
+import importlib.util
+from typing import TYPE_CHECKING, Dict, Iterator, List
+
+from config import HTML_PARSER
+from metrics import HTML_PARSE_SECONDS
+
+# bs4 importowany przy pierwszym parsowaniu (albo w rozgrzewce), nie przy imporcie aplikacji
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
+
+# Elementy, z których zbieramy tekst. Blokowe tworzą osobny fragment,
+# inline (a, span, strong) dołączają do najbliższego bloku nad sobą.
+BLOCK_TAGS = frozenset({"ul", "ol", "li", "p", "h2", "h3"})
+INLINE_TAGS = frozenset({"a", "span", "strong"})
+SKIP_TAGS = frozenset({"script", "style", "noscript", "template"})
+
+_parser_name = None
+
+def html_parser() -> str:
+    # lxml (C) jeśli zainstalowany, inaczej wbudowany html.parser
+    global _parser_name
+    if _parser_name is None:
+        if HTML_PARSER:
+            _parser_name = HTML_PARSER
+        elif importlib.util.find_spec("lxml") is not None:
+            _parser_name = "lxml"
+        else:
+            _parser_name = "html.parser"
+    return _parser_name
+
+def make_soup(html: str) -> "BeautifulSoup":
+    from bs4 import BeautifulSoup
+    parser = html_parser()
+    with HTML_PARSE_SECONDS.time(parser=parser):
+        return BeautifulSoup(html or "", parser)
+
+def select_container(soup: "BeautifulSoup") -> "Tag":
+    return soup.find(class_="entry-content") or soup.find("article") or soup
+
+def iter_text_blocks(container: "Tag") -> Iterator[str]:
+    # Jedno przejście po drzewie: każdy węzeł tekstowy trafia do dokładnie jednego fragmentu,
+    # fragment jest zwracany, gdy zamyka się jego element.
+    from bs4 import NavigableString
+    from bs4.element import PreformattedString
+    parts: Dict[int, List[str]] = {}
+    stack = [(container, None, False)]
+    while stack:
+        node, group, closing = stack.pop()
+        if closing:
+            text = " ".join(parts.pop(id(node), ()))
+            if text:
+                yield text
+            continue
+        if isinstance(node, NavigableString):
+            if group is not None and not isinstance(node, PreformattedString):
+                t = node.strip()
+                if t:
+                    parts.setdefault(id(group), []).append(t)
+            continue
+        name = node.name
+        if node is not container:
+            if name in SKIP_TAGS:
+                continue
+            if name in BLOCK_TAGS or (name in INLINE_TAGS and group is None):
+                group = node
+                stack.append((node, None, True))
+        for child in reversed(node.contents):
+            stack.append((child, group, False))
@@ -1,19 +1,67 @@
+import re
 import unicodedata
-from typing import List, Dict
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Union
+
+NAME_PATTERN = re.compile(r"\b([A-ZŁŚĆŹŻ][a-ząćęłńóśźż]+(?:\s[A-Z][a-ząćęłńóśźż]+){0,3})\b")
+DEFAULT_NAME_BLACKLIST = frozenset({
+    "Schedule", "Jury", "Prizes", "Repertoire", "International", "Ignacy", "Paderewski", "Konkurs", "Międzynarodowy",
+})
+# Słowa, których obecność w kandydacie wyklucza go jako imię i nazwisko
+DEFAULT_NAME_STOP_TOKENS = frozenset({
+    "Konkurs", "Konkursu", "Międzynarodowy", "Międzynarodowego", "Pianistyczny", "Pianistycznego",
+    "Filharmonia", "Filharmonii",
+})
+
+_ASCII_FOLD = str.maketrans({
+    "ą":"a","ć":"c","ę":"e","ł":"l","ń":"n","ó":"o","ś":"s","ź":"z","ż":"z",
+    "Ą":"A","Ć":"C","Ę":"E","Ł":"L","Ń":"N","Ó":"O","Ś":"S","Ź":"Z","Ż":"Z",
+})
 
 def normalize_text(s: str, ascii_fallback: bool = False) -> str:
     s = unicodedata.normalize("NFC", s or "")
     if not ascii_fallback:
         return s
-    mapping = {
-        "ą":"a","ć":"c","ę":"e","ł":"l","ń":"n","ó":"o","ś":"s","ź":"z","ż":"z",
-        "Ą":"A","Ć":"C","Ę":"E","Ł":"L","Ń":"N","Ó":"O","Ś":"S","Ź":"Z","Ż":"Z",
-    }
-    return "".join(mapping.get(ch, ch) for ch in s)
+    return s.translate(_ASCII_FOLD)
+
+class NameExtractor:
+    __slots__ = ("pattern", "blacklist", "stop_tokens", "min_words")
+
+    def __init__(
+        self,
+        blacklist: Iterable[str] = DEFAULT_NAME_BLACKLIST,
+        stop_tokens: Iterable[str] = DEFAULT_NAME_STOP_TOKENS,
+        min_words: int = 2,
+        pattern: "re.Pattern[str]" = NAME_PATTERN,
+    ):
+        self.pattern = pattern
+        self.blacklist: FrozenSet[str] = frozenset(blacklist)
+        self.stop_tokens: FrozenSet[str] = frozenset(stop_tokens)
+        self.min_words = min_words
+
+    def _accept(self, candidate: str) -> bool:
+        if candidate in self.blacklist:
+            return False
+        parts = candidate.split()
+        if len(parts) < self.min_words:
+            return False
+        return not any(p in self.stop_tokens for p in parts)
 
-def build_user_text(prompt: str, names: List[str], ascii_fallback: bool = False) -> str:
-    body = prompt + "\n\nUczestnicy:\n" + "\n".join(names)
-    return normalize_text(body, ascii_fallback)
+    def iter_names(self, chunks: Iterable[str]) -> Iterator[str]:
+        # Jedno przejście: filtr i deduplikacja razem; odrzuceni też trafiają do `seen`
+        seen = set()
+        findall = self.pattern.findall
+        accept = self._accept
+        for chunk in chunks:
+            for c in findall(chunk):
+                if c in seen:
+                    continue
+                seen.add(c)
+                if accept(c):
+                    yield c
+
+    def extract(self, text: Union[str, Iterable[str]]) -> List[str]:
+        chunks = (text,) if isinstance(text, str) else text
+        return list(self.iter_names(chunks))
 
 def resolve_llm_model(provider: str, model_name: str) -> str:
     if provider == "anthropic":
@@ -59,4 +107,64 @@ def safe_parse_llm_json(raw_text: str) -> Dict:
             return json.loads(candidate)
         except Exception:
             return {}
-    return {}
\ No newline at end of file
+    return {}
+
+
+class CandidateStreamParser:
+    # Przyrostowy parser odpowiedzi LLM: zwraca każdy element `top_candidates`,
+    # gdy tylko jego obiekt JSON się domknie, bez czekania na całą odpowiedź.
+    _ARRAY_START = re.compile(r'"?top_candidates"?\s*:\s*\[')
+
+    def __init__(self):
+        self.text = ""
+        self._pos = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj_start = -1
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Dict]:
+        import json
+        self.text += chunk
+        out: List[Dict] = []
+        if self.done:
+            return out
+        if self._pos < 0:
+            m = self._ARRAY_START.search(self.text)
+            if not m:
+                return out
+            self._pos = m.end()
+        text = self.text
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start >= 0:
+                    candidate = re.sub(r",\s*}$", "}", text[self._obj_start:i + 1])
+                    try:
+                        out.append(json.loads(candidate))
+                    except ValueError:
+                        pass
+                    self._obj_start = -1
+            elif ch == "]" and self._depth == 0:
+                self.done = True
+                i += 1
+                break
+            i += 1
+        self._pos = i
+        return out
@@ -0,0 +1,355 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# Ten sam tokenizer co domyślny TfidfVectorizer (lowercase, słowa ≥ 2 znaki)
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or "").lower())
+
+
+# Przyrostowy indeks TF-IDF. Macierz liczności termów trzymana jest w segmentach CSR
+# (każde add() dokłada jeden), więc dodawanie nie wymaga ponownego dopasowania całości.
+# IDF i normy dokumentów liczone są leniwie z df przy pierwszym zapytaniu po zmianie —
+# wynik jest identyczny z TfidfVectorizer(norm="l2", smooth_idf=True) + cosine_similarity.
+# Na dysku: manifest.json, vocab.json, df.npy, docs.jsonl i pliki segmentów .npy (mmap przy starcie).
+class VectorIndex:
+    def __init__(self, directory: str = "", max_segments: int = 16):
+        self.directory = directory
+        self.max_segments = max_segments
+        self.vocab: Dict[str, int] = {}
+        self.texts: List[str] = []
+        self.meta: List[Dict] = []
+        self.version = 0
+        self.deleted: Set[int] = set()
+        self._terms: List[str] = []
+        self._df = np.zeros(0, dtype=np.int64)
+        self._segments: List[sparse.csr_matrix] = []
+        self._segment_names: List[str] = []
+        # Segmenty sprzed ostatniej kompakcji: usuwane dopiero przy następnej, bo proces
+        # czytający mógł właśnie wczytać manifest, który na nie wskazuje
+        self._retired: List[str] = []
+        # Długość zatwierdzonej (wskazanej w manifeście) części docs.jsonl w bajtach
+        self._docs_bytes = 0
+        self._idf: Optional[np.ndarray] = None
+        self._norms: Optional[List[np.ndarray]] = None
+        self._lock = threading.RLock()
+        if directory and os.path.exists(os.path.join(directory, "manifest.json")):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    # --- budowa -----------------------------------------------------------
+
+    def _rows(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        df_new: Counter = Counter()
+        for text in texts:
+            counts = Counter(tokenize(text))
+            for term, n in counts.items():
+                idx = self.vocab.get(term)
+                if idx is None:
+                    idx = self.vocab[term] = len(self._terms)
+                    self._terms.append(term)
+                indices.append(idx)
+                data.append(n)
+                df_new[idx] += 1
+            indptr.append(len(indices))
+        if len(self._terms) > len(self._df):
+            self._df = np.concatenate([self._df, np.zeros(len(self._terms) - len(self._df), dtype=np.int64)])
+        if df_new:
+            ids = np.fromiter(df_new.keys(), dtype=np.int64, count=len(df_new))
+            self._df[ids] += np.fromiter(df_new.values(), dtype=np.int64, count=len(df_new))
+        # int32 w indptr — inaczej scipy rzutuje przy wczytaniu i mmap traci sens (kopia)
+        indptr_dtype = np.int32 if len(indices) < 2 ** 31 else np.int64
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=indptr_dtype)),
+            shape=(len(texts), len(self._terms)),
+        )
+
+    def add(self, texts: Sequence[str], metas: Optional[Sequence[Dict]] = None, persist: bool = True) -> int:
+        texts = list(texts)
+        if not texts:
+            return 0
+        metas = list(metas) if metas is not None else [{} for _ in texts]
+        with self._lock:
+            start = len(self.texts)
+            segment = self._rows(texts)
+            self._segments.append(segment)
+            self._segment_names.append(f"seg-{self.version + 1:06d}")
+            self.texts.extend(texts)
+            self.meta.extend(metas)
+            self.version += 1
+            self._idf = None
+            self._norms = None
+            if persist and self.directory:
+                self._write_segment(self._segment_names[-1], segment)
+                self._append_docs(start)
+                if len(self._segments) > self.max_segments:
+                    self._compact()
+                self._write_manifest()
+            elif len(self._segments) > self.max_segments:
+                # Bez zapisu na dysk (indeks w pamięci, seed procesu-obserwatora) scalamy tylko w pamięci
+                self._segments = [self._merged()]
+                self._segment_names = [f"seg-{self.version:06d}-c"]
+        return len(texts)
+
+    def remove(self, rows: Iterable[int], persist: bool = True) -> int:
+        with self._lock:
+            rows = sorted({r for r in rows if 0 <= r < len(self.texts) and r not in self.deleted})
+            if not rows:
+                return 0
+            for r in rows:
+                self._df[self._row_terms(r)] -= 1
+            self.deleted.update(rows)
+            self.version += 1
+            self._idf = None
+            self._norms = None
+            if persist and self.directory:
+                self._write_manifest()
+        return len(rows)
+
+    def _row_terms(self, row: int) -> np.ndarray:
+        for seg in self._segments:
+            if row < seg.shape[0]:
+                return np.asarray(seg.indices[seg.indptr[row]:seg.indptr[row + 1]], dtype=np.int64)
+            row -= seg.shape[0]
+        raise IndexError(row)
+
+    # --- zapytania --------------------------------------------------------
+
+    def _weights(self) -> Tuple[np.ndarray, List[np.ndarray]]:
+        # Wywoływane pod blokadą; wynik cache'owany do następnego add()
+        if self._idf is None or self._norms is None:
+            n = len(self.texts) - len(self.deleted)
+            idf = np.log((1.0 + n) / (1.0 + self._df)) + 1.0
+            idf2 = idf ** 2
+            norms = []
+            for seg in self._segments:
+                sq = sparse.csr_matrix(
+                    (np.square(seg.data, dtype=np.float64) * idf2[seg.indices], seg.indices, seg.indptr),
+                    shape=seg.shape,
+                )
+                norms.append(np.sqrt(np.asarray(sq.sum(axis=1)).ravel()))
+            self._idf, self._norms = idf, norms
+        return self._idf, self._norms
+
+    def transform(self, queries: Sequence[str]) -> sparse.csr_matrix:
+        # Zapytania jako macierz (nq x V) wag tf*idf², znormalizowana przez ||tf*idf|| zapytania
+        with self._lock:
+            idf, _ = self._weights()
+            vocab = self.vocab
+            n_terms = len(idf)
+            indptr = [0]
+            indices: List[int] = []
+            data: List[float] = []
+            for q in queries:
+                counts = Counter(t for t in tokenize(q) if t in vocab)
+                if counts:
+                    ids = np.fromiter((vocab[t] for t in counts), dtype=np.int64, count=len(counts))
+                    tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+                    w = tf * idf[ids]
+                    indices.extend(ids.tolist())
+                    data.extend((w * idf[ids] / np.linalg.norm(w)).tolist())
+                indptr.append(len(indices))
+            return sparse.csr_matrix((data, indices, indptr), shape=(len(queries), n_terms))
+
+    def scores(self, query_matrix: sparse.csr_matrix) -> np.ndarray:
+        # Podobieństwo kosinusowe (n_docs x nq) liczone segment po segmencie
+        with self._lock:
+            _, norms = self._weights()
+            qt = query_matrix.T.tocsr()
+            out = []
+            for seg, norm in zip(self._segments, norms):
+                part = (seg @ qt[:seg.shape[1]]).toarray()
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    part = np.where(norm[:, None] > 0, part / norm[:, None], 0.0)
+                out.append(part)
+            if not out:
+                return np.zeros((0, query_matrix.shape[0]))
+            return np.vstack(out)
+
+    def term_idf(self, terms: Sequence[str]) -> List[float]:
+        # Wagi IDF termów; term spoza słownika jak term bez dokumentów (najwyższa waga)
+        with self._lock:
+            idf, _ = self._weights()
+            unseen = math.log(1.0 + len(self.texts) - len(self.deleted)) + 1.0
+            return [float(idf[self.vocab[t]]) if t in self.vocab else unseen for t in terms]
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[int, float]]:
+        return self.search_many([query], top_k)[0]
+
+    def search_many(self, queries: Sequence[str], top_k: int = 3) -> List[List[Tuple[int, float]]]:
+        if not queries:
+            return []
+        with self._lock:
+            sims = self.scores(self.transform(queries))
+            if self.deleted:
+                sims[sorted(self.deleted), :] = -np.inf
+        return [[(i, s) for i, s in top_k_indices(sims[:, j], top_k) if s != -np.inf] for j in range(sims.shape[1])]
+
+    # --- dysk -------------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _write_segment(self, name: str, seg: sparse.csr_matrix) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        for part in ("data", "indices", "indptr"):
+            np.save(self._path(f"{name}.{part}.npy"), np.asarray(getattr(seg, part)))
+
+    def _open_segment(self, name: str, rows: int, cols: int) -> sparse.csr_matrix:
+        parts = tuple(np.load(self._path(f"{name}.{p}.npy"), mmap_mode="r") for p in ("data", "indices", "indptr"))
+        return sparse.csr_matrix(parts, shape=(rows, cols), copy=False)
+
+    def _append_docs(self, start: int) -> None:
+        # Dopisanie od końca zatwierdzonej części: linie po awarii sprzed zapisu manifestu
+        # (bez segmentu w manifeście) są nadpisywane, więc wiersze segmentów i dokumenty się nie rozjadą
+        path = self._path("docs.jsonl")
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.seek(self._docs_bytes)
+            f.truncate()
+            for text, meta in zip(self.texts[start:], self.meta[start:]):
+                f.write((json.dumps({"text": text, "meta": meta}, ensure_ascii=False) + "\n").encode("utf-8"))
+            self._docs_bytes = f.tell()
+
+    def _write_manifest(self) -> None:
+        with open(self._path("vocab.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(self._terms, f, ensure_ascii=False)
+        os.replace(self._path("vocab.json.tmp"), self._path("vocab.json"))
+        np.save(self._path("df.tmp.npy"), self._df)
+        os.replace(self._path("df.tmp.npy"), self._path("df.npy"))
+        manifest = {
+            "segments": [[name, seg.shape[0], seg.shape[1]] for name, seg in zip(self._segment_names, self._segments)],
+            "n_docs": len(self.texts),
+            "docs_bytes": self._docs_bytes,
+            "retired": self._retired,
+            "deleted": sorted(self.deleted),
+            "version": self.version,
+        }
+        # Manifest na końcu — dopiero on "zatwierdza" nowe segmenty
+        with open(self._path("manifest.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(self._path("manifest.json.tmp"), self._path("manifest.json"))
+
+    def _merged(self) -> sparse.csr_matrix:
+        n_terms = len(self._terms)
+        return sparse.vstack(
+            [sparse.csr_matrix((s.data, s.indices, s.indptr), shape=(s.shape[0], n_terms)) for s in self._segments],
+            format="csr",
+        )
+
+    def _compact(self) -> None:
+        merged = self._merged()
+        # Pliki sprzed poprzedniej kompakcji nie są już w żadnym manifeście — można je usunąć;
+        # bieżące segmenty czekają do następnej kompakcji
+        stale, self._retired = self._retired, list(self._segment_names)
+        name = f"seg-{self.version:06d}-c"
+        self._write_segment(name, merged)
+        self._segments = [self._open_segment(name, merged.shape[0], merged.shape[1])]
+        self._segment_names = [name]
+        self._write_manifest()
+        for old in stale:
+            for part in ("data", "indices", "indptr"):
+                try:
+                    os.remove(self._path(f"{old}.{part}.npy"))
+                except OSError:
+                    pass
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self._docs_bytes = 0
+            self._append_docs(0)
+            for name, seg in zip(self._segment_names, self._segments):
+                self._write_segment(name, seg)
+            self._write_manifest()
+
+    def reload_if_changed(self) -> bool:
+        # Segmenty dopisane przez inny proces (lider ingestii): wczytanie, gdy manifest ma nowszą wersję.
+        # Pliki segmentów są mapowane (mmap) — procesy dzielą te same strony pamięci.
+        if not self.directory:
+            return False
+        try:
+            with open(self._path("manifest.json"), encoding="utf-8") as f:
+                version = json.load(f).get("version", 0)
+        except (OSError, ValueError):
+            return False
+        if version <= self.version:
+            return False
+        self.load()
+        return True
+
+    def load(self, attempts: int = 3) -> None:
+        # Lider mógł między odczytem manifestu a otwarciem plików zapisać nowy manifest —
+        # wtedy czytamy go jeszcze raz
+        for attempt in range(attempts):
+            try:
+                return self._load()
+            except FileNotFoundError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+
+    def _load(self) -> None:
+        # Najpierw wszystko do zmiennych lokalnych — błąd w połowie nie zostawia indeksu
+        # złożonego z dwóch wersji
+        with open(self._path("manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        with open(self._path("vocab.json"), encoding="utf-8") as f:
+            terms = json.load(f)
+        df = np.load(self._path("df.npy"))
+        names = [name for name, _, _ in manifest["segments"]]
+        segments = [self._open_segment(name, rows, cols) for name, rows, cols in manifest["segments"]]
+        n_docs = manifest["n_docs"]
+        texts, meta = [], []
+        offset = 0
+        # Tylko zatwierdzona część pliku (docs_bytes; starsze manifesty: pierwsze n_docs linii)
+        limit = manifest.get("docs_bytes")
+        with open(self._path("docs.jsonl"), "rb") as f:
+            for line in f:
+                if len(texts) >= n_docs or (limit is not None and offset + len(line) > limit):
+                    break
+                offset += len(line)
+                rec = json.loads(line)
+                texts.append(rec["text"])
+                meta.append(rec.get("meta") or {})
+        if len(texts) < n_docs:
+            raise ValueError(f"docs.jsonl: {len(texts)} z {n_docs} dokumentów z manifestu")
+        with self._lock:
+            self._terms = terms
+            self.vocab = {t: i for i, t in enumerate(terms)}
+            self._df = df
+            self._segments, self._segment_names = segments, names
+            self.texts, self.meta = texts, meta
+            self._docs_bytes = offset
+            self._retired = list(manifest.get("retired", []))
+            self.deleted = set(manifest.get("deleted", []))
+            self.version = manifest.get("version", len(segments))
+            self._idf = None
+            self._norms = None
+
+def top_k_indices(scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    # argpartition: O(n) zamiast pełnego sortowania, sortujemy tylko k zwycięzców
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return []
+    k = min(k, n)
+    if k < n:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(n)
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    return [(int(i), float(scores[i])) for i in idx]
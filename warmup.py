@@ -0,0 +1,41 @@
+import importlib
+import time
+from typing import Callable, Dict, List, Tuple
+
+from metrics import WARMUP_SECONDS
+
+_timings: Dict[str, float] = {}
+
+
+def _components() -> List[Tuple[str, Callable[[], object]]]:
+    # Importy wewnątrz — sam import modułu warmup nie ładuje niczego ciężkiego
+    from intents import classify_intent
+    from llm_providers import get_provider
+    from rag import get_index
+    from utils.html import make_soup
+    return [
+        ("http_client", lambda: importlib.import_module("httpx")),
+        ("llm_client", get_provider),
+        ("rag_index", lambda: get_index().search("paderewski", 1)),
+        ("html_parser", lambda: make_soup("<p>Paderewski</p>")),
+        ("intent_router", lambda: classify_intent("kto wygra")),
+    ]
+
+def warm_up() -> Dict[str, float]:
+    # Synchroniczne (wołane przez to_thread): każdy składnik, który inaczej powstałby przy
+    # pierwszym żądaniu. Błąd jednego składnika nie zatrzymuje pozostałych — ten spróbuje
+    # ponownie przy pierwszym użyciu.
+    for name, build in _components():
+        start = time.perf_counter()
+        try:
+            build()
+            outcome = "ok"
+        except Exception:
+            outcome = "error"
+        elapsed = time.perf_counter() - start
+        WARMUP_SECONDS.observe(elapsed, component=name, outcome=outcome)
+        _timings[name] = elapsed
+    return dict(_timings)
+
+def warmup_status() -> Dict[str, float]:
+    return dict(_timings)
@@ -1,148 +1,239 @@
-from typing import Optional, List, Dict
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import hashlib
 import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, List, Dict, Tuple, Union
 
-from config import PADEREWSKI_BASE_URL, PARTICIPANTS_URL, JURY_URL, YOUTUBE_API_KEY
+from cache import TTLCache
+from config import (
+    PADEREWSKI_BASE_URL, PARTICIPANTS_URL, JURY_URL, YOUTUBE_DEFAULT_QUERY,
+    PARTICIPANTS_CACHE_TTL, JURY_CACHE_TTL, HISTORY_CACHE_TTL, SCRAPE_CACHE_STALE_TTL, FALLBACK_PROBE_DEADLINE,
+)
+from http_cache import fetch_text
+from metrics import EXTRACT_NAMES_SECONDS
+from people import ROLE_RE, PeopleStore, canonical_role
+from shared_state import shared_store
+from utils.html import iter_text_blocks, make_soup, select_container
+from utils.text import NameExtractor, normalize_text
+from youtube import get_youtube_client
 
-def fetch_html(url: str, timeout: int = 12) -> Optional[str]:
+# Ze SHARED_STATE_PATH listy i historia są wspólne dla wszystkich procesów uvicorn
+_scrape_cache = TTLCache("scrape", stale_ttl=SCRAPE_CACHE_STALE_TTL, store=shared_store("scrape"))
+
+async def fetch_html(url: str, timeout: Optional[float] = None) -> Optional[str]:
+    # Przez trwały cache HTTP (jeśli włączony): rewalidacja If-None-Match / If-Modified-Since
     try:
-        r = requests.get(url, timeout=timeout)
-        if r.status_code == 200:
-            return r.text
+        return await fetch_text(url, timeout=timeout)
     except Exception:
         return None
-    return None
-
-def fetch_web_info(url: str) -> str:
-    html = fetch_html(url) or ""
-    soup = BeautifulSoup(html, "html.parser")
-    return soup.get_text(separator="\n", strip=True)[:1500]
-
-def fetch_youtube_videos(query: str = "Paderewski Piano Competition 2025", max_results: int = 5) -> List[tuple]:
-    base_url = "https://www.googleapis.com/youtube/v3/search"
-    params = {
-        "part": "snippet",
-        "q": query,
-        "maxResults": max_results,
-        "order": "date",
-        "type": "video",
-        "key": YOUTUBE_API_KEY,
-    }
+
+# Wyniki parsowania per hash treści — strona bez zmian (np. 304) nie jest parsowana ponownie
+_PARSE_MEMO_SIZE = 32
+_parse_memo: "OrderedDict[Tuple[str, str], object]" = OrderedDict()
+_parse_memo_lock = threading.Lock()
+
+def _memo_parse(kind: str, html: str, parse: Callable[[str], object]):
+    key = (kind, hashlib.sha1(html.encode("utf-8")).hexdigest())
+    with _parse_memo_lock:
+        if key in _parse_memo:
+            _parse_memo.move_to_end(key)
+            return _parse_memo[key]
+    value = parse(html)
+    with _parse_memo_lock:
+        _parse_memo[key] = value
+        while len(_parse_memo) > _PARSE_MEMO_SIZE:
+            _parse_memo.popitem(last=False)
+    return value
+
+def _page_text(html: str) -> str:
+    return _memo_parse("text", html, lambda h: make_soup(h).get_text(separator="\n", strip=True)[:1500])
+
+async def fetch_web_info(url: str) -> str:
+    html = await fetch_html(url) or ""
+    # Parsowanie to praca CPU — poza pętlą zdarzeń
+    return await asyncio.to_thread(_page_text, html)
+
+async def fetch_youtube_videos(query: str = YOUTUBE_DEFAULT_QUERY, max_results: int = 5) -> List[tuple]:
+    # Klient z cache i limitem: trafienie w cache nie zużywa jednostek API ani sieci
     try:
-        resp = requests.get(base_url, params=params)
-        if resp.status_code == 200:
-            data = resp.json()
-            return [(it["snippet"]["title"], f"https://www.youtube.com/watch?v={it['id']['videoId']}") for it in data.get("items", [])]
-        return [("Error", resp.text)]
+        return [tuple(v) for v in await get_youtube_client().search(query, max_results)]
     except Exception as e:
         return [("Error", str(e))]
 
-def extract_names(text: str) -> List[str]:
-    pattern = r"\b([A-ZŁŚĆŹŻ][a-ząćęłńóśźż]+(?:\s[A-Z][a-ząćęłńóśźż]+){0,3})\b"
-    candidates = re.findall(pattern, text)
-    blacklist = {"Schedule", "Jury", "Prizes", "Repertoire", "International", "Ignacy", "Paderewski", "Konkurs", "Międzynarodowy"}
-    cleaned = []
-    for c in candidates:
-        if c in blacklist:
-            continue
-        parts = c.split()
-        if len(parts) >= 2:
-            cleaned.append(c)
+_name_extractor = NameExtractor()
+
+def extract_names(text: Union[str, Iterable[str]]) -> List[str]:
+    # Przy iteratorze bloków czas obejmuje też przejście po drzewie HTML
+    with EXTRACT_NAMES_SECONDS.time():
+        return _name_extractor.extract(text)
+
+# Kraj w nawiasie za nazwiskiem: "Anna Nowak (Polska)"
+_COUNTRY_RE = re.compile(r"\(([^()]{2,40})\)")
+
+# Blok bez nazwisk i nie dłuższy niż to traktujemy jak nagłówek sekcji
+_HEADING_MAX = 80
+
+def _people_from_blocks(blocks: Iterable[str]) -> List[Tuple[str, str, Optional[str]]]:
+    # Nawias wycinany przed szukaniem nazwisk (inaczej "Korea Płd" wygląda jak imię i nazwisko);
+    # kraj przypisujemy tylko, gdy blok zawiera jedną osobę. Funkcja w jury: z tego samego bloku
+    # ("Przewodnicząca: Anna Nowak", "Anna Nowak — sekretarz") albo z nagłówka sekcji
+    # ("Członkowie jury") dla kolejnych bloków — do następnego nagłówka.
+    out: List[Tuple[str, str, Optional[str]]] = []
     seen = set()
-    ordered = []
-    for c in cleaned:
-        if c not in seen:
-            seen.add(c)
-            ordered.append(c)
-    return ordered
+    section_role: Optional[str] = None
+    with EXTRACT_NAMES_SECONDS.time():
+        for block in blocks:
+            countries = _COUNTRY_RE.findall(block)
+            text = _COUNTRY_RE.sub(" ", block) if countries else block
+            role = canonical_role(text)
+            if role:
+                # Słowo funkcji poza tekstem dla ekstraktora ("Przewodniczący Jan Kowalski" to nie trzy człony nazwiska).
+                # Najpierw NFC (rozłożone "ą" to dwa znaki), potem zdjęcie diakrytyków znak na znak —
+                # pozycje dopasowań w `folded` pasują do tego samego `text`, który tniemy
+                text = normalize_text(text)
+                folded = normalize_text(text, ascii_fallback=True)
+                parts, last = [], 0
+                for m in ROLE_RE.finditer(folded):
+                    parts.append(text[last:m.start()])
+                    parts.append(" ; ")
+                    last = m.end()
+                text = "".join(parts) + text[last:]
+            names = _name_extractor.extract(text)
+            if not names:
+                if len(block) <= _HEADING_MAX:
+                    section_role = role
+                continue
+            country = countries[0].strip() if countries and len(names) == 1 else ""
+            for n in names:
+                if n not in seen:
+                    seen.add(n)
+                    out.append((n, country, role or section_role))
+    return out
 
-def parse_names_from_html(html: str) -> List[str]:
-    soup = BeautifulSoup(html, "html.parser")
-    container = soup.select_one(".entry-content") or soup.select_one("article") or soup
-    text_chunks = []
-    for sel in ["ul", "ol", "li", "p", "h2", "h3", "a", "span", "strong", ".wp-block-list li"]:
-        for el in container.select(sel):
-            t = el.get_text(" ", strip=True)
-            if t:
-                text_chunks.append(t)
-    big = "\n".join(text_chunks)
-    return extract_names(big)
-
-def build_people_dicts(names: List[str], with_role: bool = False) -> List[Dict]:
+def _parse_people(html: str) -> Tuple[Tuple[str, str, Optional[str]], ...]:
+    return tuple(_people_from_blocks(iter_text_blocks(select_container(make_soup(html)))))
+
+def parse_people_from_html(html: str, with_role: bool = False) -> List[Dict]:
     people = []
-    for n in names:
-        entry = {"name": n, "country": "", "bio": ""}
+    for name, country, role in _memo_parse("people", html, _parse_people):
+        entry = {"name": name, "country": country, "bio": ""}
         if with_role:
-            entry["role"] = None
+            entry["role"] = role
         people.append(entry)
     return people
 
+def parse_names_from_html(html: str) -> List[str]:
+    return [name for name, _, _ in _memo_parse("people", html, _parse_people)]
+
 def parse_participants_konkurspaderewskiego(html: str) -> List[Dict]:
-    soup = BeautifulSoup(html, "html.parser")
-    container = soup.select_one(".entry-content") or soup.select_one("article") or soup
-    text_chunks = []
-    for sel in ["ul", "ol", "li", "p", "h2", "h3", ".wp-block-list li", "strong", "a"]:
-        for el in container.select(sel):
-            t = el.get_text(" ", strip=True)
-            if t:
-                text_chunks.append(t)
-    names = extract_names("\n".join(text_chunks))
-    return build_people_dicts(names)
+    return parse_people_from_html(html)
 
 def parse_jury_paderewskicompetition(html: str) -> List[Dict]:
-    soup = BeautifulSoup(html, "html.parser")
-    container = soup.select_one(".entry-content") or soup.select_one("article") or soup
-    text_chunks = []
-    for sel in ["ul", "ol", "li", "p", "h2", "h3", "a", "strong", ".wp-block-list li"]:
-        for el in container.select(sel):
-            t = el.get_text(" ", strip=True)
-            if t:
-                text_chunks.append(t)
-    names = extract_names("\n".join(text_chunks))
-    people = build_people_dicts(names, with_role=True)
-    for p in people:
-        p["role"] = None
-    return people
+    return parse_people_from_html(html, with_role=True)
 
-def get_dynamic_participants() -> List[Dict]:
-    html = fetch_html(PARTICIPANTS_URL)
-    if html:
-        people = parse_participants_konkurspaderewskiego(html)
-        if people:
-            return people
-    candidates = []
-    bases = [PADEREWSKI_BASE_URL.rstrip("/"), "https://www.konkurspaderewskiego.pl"]
+# Indeksowane magazyny osób, przebudowywane tylko, gdy cache zwróci nową listę
+_stores = {"participants": PeopleStore("participants"), "jury": PeopleStore("jury", with_role=True)}
+
+async def get_people_store(kind: str) -> PeopleStore:
+    people = await (get_dynamic_participants() if kind == "participants" else get_dynamic_jury())
+    store = _stores[kind]
+    store.sync(people)
+    return store
+
+async def get_dynamic_participants() -> List[Dict]:
+    return await _scrape_cache.get("participants", *_sources()["participants"])
+
+async def get_dynamic_jury() -> List[Dict]:
+    return await _scrape_cache.get("jury", *_sources()["jury"])
+
+async def get_history_excerpt() -> str:
+    return await _scrape_cache.get("history", *_sources()["history"])
+
+async def get_youtube_videos() -> List[tuple]:
+    return await fetch_youtube_videos()
+
+async def refresh_source(name: str) -> bool:
+    # Wymuszone odświeżenie (harmonogram); False, gdy źródło zwróciło pusty wynik lub błąd
+    return await _scrape_cache.refresh(name, *_sources()[name])
+
+def cached_source(name: str) -> Any:
+    # Świeża wartość źródła z pamięci cache, bez ładowania i bez odczytu magazynu
+    # (None, gdy brak albo przeterminowana — wtedy odpowiedź budowana jest od nowa)
+    return _scrape_cache.fresh(name)
+
+def _sources() -> Dict[str, Tuple[Callable, float, Callable]]:
+    # nazwa -> (loader, ttl, cache_if)
+    return {
+        "participants": (_load_participants, PARTICIPANTS_CACHE_TTL, bool),
+        "jury": (_load_jury, JURY_CACHE_TTL, bool),
+        "history": (_load_history, HISTORY_CACHE_TTL, bool),
+    }
+
+async def _load_history() -> str:
+    return await fetch_web_info(PADEREWSKI_BASE_URL)
+
+async def _load_participants() -> List[Dict]:
     paths = ["/uczestnicy/", "/participants/", "/contestants/", "/list-of-participants/", "/"]
-    for base in bases:
-        for path in paths:
-            candidates.append(f"{base.rstrip('/')}{path}")
-    for url in candidates:
-        h = fetch_html(url)
-        if not h:
-            continue
-        names = parse_names_from_html(h)
-        if names:
-            return build_people_dicts(names)
-    return []
+    return await _load_people("participants", PARTICIPANTS_URL, parse_participants_konkurspaderewskiego, paths, with_role=False)
+
+async def _load_jury() -> List[Dict]:
+    paths = ["/jury-xiii-konkursu-2025/", "/jury/", "/jurors/", "/komisja/", "/"]
+    return await _load_people("jury", JURY_URL, parse_jury_paderewskicompetition, paths, with_role=True)
 
-def get_dynamic_jury() -> List[Dict]:
-    html = fetch_html(JURY_URL)
+# Zapamiętany adres zapasowy, który ostatnio zwrócił nazwiska (kind -> url). Używany dopiero,
+# gdy zawiedzie adres główny — oszczędza ponowne sondowanie, ale nie przypina aplikacji do zapasu.
+_resolved_urls: Dict[str, str] = {}
+
+def _candidate_urls(paths: List[str]) -> List[str]:
+    bases = [PADEREWSKI_BASE_URL.rstrip("/"), "https://www.konkurspaderewskiego.pl"]
+    return list(dict.fromkeys(f"{base.rstrip('/')}{path}" for base in bases for path in paths))
+
+async def _people_from_url(url: str, with_role: bool = False) -> List[Dict]:
+    h = await fetch_html(url)
+    if not h:
+        return []
+    return await asyncio.to_thread(parse_people_from_html, h, with_role)
+
+async def probe_candidates(urls: List[str], deadline: float, with_role: bool = False) -> Tuple[Optional[str], List[Dict]]:
+    # Wszystkie adresy pobierane równolegle; wygrywa pierwszy na liście, który dał nazwiska
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + deadline
+    tasks = [asyncio.create_task(_people_from_url(u, with_role)) for u in urls]
+    try:
+        for i, task in enumerate(tasks):
+            remaining = deadline_at - loop.time()
+            if remaining > 0:
+                await asyncio.wait({task}, timeout=remaining)
+            if not task.done():
+                # Po terminie bierzemy najlepszy z już zakończonych
+                for url, t in zip(urls[i:], tasks[i:]):
+                    if t.done() and not t.cancelled() and t.exception() is None and t.result():
+                        return url, t.result()
+                return None, []
+            if not task.cancelled() and task.exception() is None and task.result():
+                return urls[i], task.result()
+        return None, []
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+async def _load_people(kind: str, primary_url: str, primary_parser: Callable[[str], List[Dict]], paths: List[str], with_role: bool) -> List[Dict]:
+    html = await fetch_html(primary_url)
     if html:
-        people = parse_jury_paderewskicompetition(html)
+        people = await asyncio.to_thread(primary_parser, html)
         if people:
+            _resolved_urls.pop(kind, None)
             return people
-    candidates = []
-    bases = [PADEREWSKI_BASE_URL.rstrip("/"), "https://www.konkurspaderewskiego.pl"]
-    paths = ["/jury-xiii-konkursu-2025/", "/jury/", "/jurors/", "/komisja/", "/"]
-    for base in bases:
-        for path in paths:
-            candidates.append(f"{base.rstrip('/')}{path}")
-    for url in candidates:
-        h = fetch_html(url)
-        if not h:
-            continue
-        names = parse_names_from_html(h)
-        if names:
-            return build_people_dicts(names, with_role=True)
-    return []
\ No newline at end of file
+    remembered = _resolved_urls.get(kind)
+    if remembered:
+        people = await _people_from_url(remembered, with_role)
+        if people:
+            return people
+        _resolved_urls.pop(kind, None)
+    url, people = await probe_candidates(_candidate_urls(paths), FALLBACK_PROBE_DEADLINE, with_role)
+    if url:
+        _resolved_urls[kind] = url
+        return people
+    return []
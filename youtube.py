@@ -0,0 +1,259 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from cache import JsonFileStore, TTLCache
+from config import (
+    YOUTUBE_API_KEY, YOUTUBE_API_BASE, YOUTUBE_TIMEOUT, YOUTUBE_DAILY_QUOTA, YOUTUBE_SEARCH_COST, YOUTUBE_MAX_QPS,
+    YOUTUBE_CACHE_TTL, YOUTUBE_CACHE_STALE_TTL, YOUTUBE_CACHE_DIR, YOUTUBE_QUOTA_PATH,
+)
+from http_client import fetch
+from metrics import YOUTUBE_QUOTA_UNITS, YOUTUBE_REQUESTS
+from shared_state import SharedDb, get_shared_db, shared_store
+
+# Maksymalny rozmiar strony w search.list
+MAX_PAGE_SIZE = 50
+# Limit YouTube resetuje się o północy czasu pacyficznego
+QUOTA_TZ = "America/Los_Angeles"
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class YouTubeError(Exception):
+    pass
+
+
+# Dzienne zużycie jednostek API. Liczymy po swojej stronie (API nie zwraca stanu limitu);
+# odpowiedź 403 quotaExceeded oznacza limit jako wyczerpany do końca doby.
+# Ze stanem współdzielonym licznik jest w bazie (jeden limit dla wszystkich workerów),
+# bez niego — w pamięci procesu i opcjonalnie w pliku.
+class QuotaTracker:
+    def __init__(self, daily_limit: int = YOUTUBE_DAILY_QUOTA, path: str = YOUTUBE_QUOTA_PATH,
+                 db: Optional[SharedDb] = None, name: str = "youtube_quota"):
+        self.daily_limit = daily_limit
+        self.path = path
+        self.db = db
+        self.name = name
+        self.day = ""
+        self.used = 0
+        self._load()
+
+    def _today(self) -> str:
+        try:
+            return datetime.now(ZoneInfo(QUOTA_TZ)).date().isoformat()
+        except Exception:
+            return datetime.now(timezone.utc).date().isoformat()
+
+    def _roll(self) -> None:
+        today = self._today()
+        if today != self.day:
+            self.day, self.used = today, 0
+
+    def remaining(self) -> int:
+        self._roll()
+        if self.db is not None:
+            try:
+                self.used = self.db.counter(self.name, self.day)
+            except sqlite3.Error:
+                pass
+        return max(0, self.daily_limit - self.used)
+
+    def spend(self, units: int) -> bool:
+        self._roll()
+        if self.db is not None:
+            try:
+                if not self.db.spend(self.name, self.day, units, self.daily_limit):
+                    return False
+                self.used += units
+                YOUTUBE_QUOTA_UNITS.inc(units)
+                return True
+            except sqlite3.Error:
+                pass
+        if self.remaining() < units:
+            return False
+        self.used += units
+        YOUTUBE_QUOTA_UNITS.inc(units)
+        self._save()
+        return True
+
+    def exhaust(self) -> None:
+        self._roll()
+        self.used = max(self.used, self.daily_limit)
+        if self.db is not None:
+            try:
+                self.db.exhaust(self.name, self.day, self.daily_limit)
+                return
+            except sqlite3.Error:
+                pass
+        self._save()
+
+    def _load(self) -> None:
+        self._roll()
+        if self.db is not None or not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("day") == self.day:
+            self.used = int(state.get("used", 0))
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"day": self.day, "used": self.used}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+class _RateLimiter:
+    # Odstęp co najmniej 1/qps między kolejnymi wywołaniami API
+    def __init__(self, qps: float):
+        self.interval = 1.0 / qps if qps > 0 else 0.0
+        self._next = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+# Klient search.list: strony wyników cache'owane per (zapytanie, token strony, rozmiar) z TTL
+# i stale-while-revalidate; równoległe identyczne wyszukiwania sklejane w jedno wywołanie.
+# Po wygaśnięciu wpisu pytamy warunkowo (If-None-Match z ETag strony) — 304 nie wymaga
+# ponownego parsowania. Kolejne strony pobierane leniwie, dopiero gdy ktoś ich potrzebuje.
+class YouTubeClient:
+    def __init__(
+        self,
+        api_key: str = YOUTUBE_API_KEY,
+        base_url: str = YOUTUBE_API_BASE,
+        quota: Optional[QuotaTracker] = None,
+        ttl: float = YOUTUBE_CACHE_TTL,
+        stale_ttl: float = YOUTUBE_CACHE_STALE_TTL,
+        cache_dir: str = YOUTUBE_CACHE_DIR,
+        max_qps: float = YOUTUBE_MAX_QPS,
+        search_cost: int = YOUTUBE_SEARCH_COST,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.quota = quota if quota is not None else QuotaTracker(db=get_shared_db())
+        self.ttl = ttl
+        self.search_cost = search_cost
+        # Magazyn współdzielony przez procesy ma pierwszeństwo przed katalogiem JSON — jedno
+        # wywołanie API na stronę dla wszystkich workerów
+        self.cache = TTLCache(
+            "youtube",
+            stale_ttl=stale_ttl,
+            store=shared_store("youtube") or (JsonFileStore(cache_dir) if cache_dir else None),
+        )
+        self._limiter = _RateLimiter(max_qps)
+
+    @staticmethod
+    def _key(query: str, page_token: str, page_size: int) -> str:
+        return json.dumps([" ".join(query.lower().split()), page_token, page_size], ensure_ascii=False)
+
+    async def search_page(self, query: str, page_token: str = "", page_size: int = 5) -> Dict:
+        # {"items": [[tytuł, url], ...], "next": token lub None, "etag": ...}
+        page_size = max(1, min(MAX_PAGE_SIZE, page_size))
+        key = self._key(query, page_token, page_size)
+        return await self.cache.get(
+            key,
+            lambda: self._fetch_page(key, query, page_token, page_size),
+            ttl=self.ttl,
+        )
+
+    async def iter_videos(self, query: str, page_size: int = 5) -> AsyncIterator[Tuple[str, str]]:
+        token = ""
+        while True:
+            page = await self.search_page(query, token, page_size)
+            for title, url in page["items"]:
+                yield title, url
+            token = page.get("next") or ""
+            if not token:
+                return
+
+    async def search(self, query: str, max_results: int = 5) -> List[Tuple[str, str]]:
+        out: List[Tuple[str, str]] = []
+        async for video in self.iter_videos(query, page_size=min(max_results, MAX_PAGE_SIZE)):
+            out.append(video)
+            if len(out) >= max_results:
+                break
+        return out
+
+    async def prewarm(self, query: str, max_results: int = 5, horizon: float = 0.0) -> bool:
+        # Dla harmonogramu: pierwsza strona odświeżana tylko, gdy wygaśnie w ciągu `horizon` sekund
+        page_size = max(1, min(MAX_PAGE_SIZE, max_results))
+        key = self._key(query, "", page_size)
+        if await self.cache.remaining(key, self.ttl) > horizon:
+            return True
+        return await self.cache.refresh(key, lambda: self._fetch_page(key, query, "", page_size), ttl=self.ttl)
+
+    async def _fetch_page(self, key: str, query: str, page_token: str, page_size: int) -> Dict:
+        if not self.api_key:
+            raise YouTubeError("Brak YOUTUBE_API_KEY")
+        # Zużycie liczymy przed wywołaniem — nieudane wywołania API też obciążają limit
+        if not await asyncio.to_thread(self.quota.spend, self.search_cost):
+            YOUTUBE_REQUESTS.inc(status="quota_local")
+            raise QuotaExceeded("Wyczerpany dzienny limit YouTube API")
+        params = {
+            "part": "snippet",
+            "q": query,
+            "maxResults": page_size,
+            "order": "date",
+            "type": "video",
+            "key": self.api_key,
+        }
+        if page_token:
+            params["pageToken"] = page_token
+        previous = self.cache.peek(key)
+        headers = {"If-None-Match": previous["etag"]} if previous and previous.get("etag") else None
+        await self._limiter.wait()
+        resp = await fetch(f"{self.base_url}/search", params=params, headers=headers, timeout=YOUTUBE_TIMEOUT)
+        YOUTUBE_REQUESTS.inc(status=str(resp.status_code))
+        if resp.status_code == 304 and previous:
+            return previous
+        if resp.status_code == 403 and "quotaExceeded" in resp.text:
+            await asyncio.to_thread(self.quota.exhaust)
+            raise QuotaExceeded("YouTube API: quotaExceeded")
+        if resp.status_code != 200:
+            raise YouTubeError(f"YouTube API {resp.status_code}: {resp.text[:200]}")
+        data = resp.json()
+        items = [
+            [it["snippet"]["title"], f"https://www.youtube.com/watch?v={it['id']['videoId']}"]
+            for it in data.get("items", [])
+            if it.get("id", {}).get("videoId")
+        ]
+        return {"items": items, "next": data.get("nextPageToken"), "etag": resp.headers.get("etag") or data.get("etag")}
+
+
+_client: Optional[YouTubeClient] = None
+
+def get_youtube_client() -> YouTubeClient:
+    global _client
+    if _client is None:
+        _client = YouTubeClient()
+    return _client
+
+def set_youtube_client(client: Optional[YouTubeClient]) -> None:
+    global _client
+    _client = client